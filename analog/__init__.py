@@ -2,35 +2,71 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import logging
-from pkg_resources import get_distribution
+import sys
 
 # analog logger
 LOG = logging.getLogger('analog')
-LOG.addHandler(logging.NullHandler)
+LOG.addHandler(logging.NullHandler())
 
-from analog.analyzer import Analyzer, analyze  # noqa
+from analog.analyzer import Analyzer, analyze, build_index, follow  # noqa
 from analog.exceptions import (  # noqa
-    AnalogError, InvalidFormatExpressionError, MissingFormatError,
-    UnknownRendererError)
+    AnalogError, CorruptCompressionError, InvalidCacheError,
+    InvalidFollowError, InvalidFormatExpressionError, InvalidIndexError,
+    InvalidPathTemplateError, InvalidStateError, InvalidTimeWindowError,
+    MissingFormatError, UnknownBucketError, UnknownRendererError,
+    UnknownStatsBackendError, UnsupportedCompressionError)
 from analog.formats import LogFormat  # noqa
 from analog.main import main  # noqa
 from analog.report import Report  # noqa
 from analog.renderers import Renderer  # noqa
 
 
-__version__ = get_distribution('analog').version
+def _version(name):
+    """Read the version of distribution ``name`` from its metadata."""
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python < 3.8, pkg_resources is much slower
+        from pkg_resources import get_distribution
+        return get_distribution(name).version
+    return version(name)
+
+
+def __getattr__(name):
+    """Read ``__version__`` from the package metadata on first access."""
+    if name == '__version__':
+        global __version__
+        __version__ = _version('analog')
+        return __version__
+    raise AttributeError(
+        "module 'analog' has no attribute '{0}'".format(name))
+
+
+if sys.version_info < (3, 7):  # no module __getattr__
+    __version__ = _version('analog')
 
 
 __all__ = (
-    __version__,
-    AnalogError,
-    analyze,
-    Analyzer,
-    InvalidFormatExpressionError,
-    LogFormat,
-    main,
-    MissingFormatError,
-    Renderer,
-    Report,
-    UnknownRendererError,
+    '__version__',
+    'AnalogError',
+    'CorruptCompressionError',
+    'analyze',
+    'Analyzer',
+    'build_index',
+    'follow',
+    'InvalidCacheError',
+    'InvalidFollowError',
+    'InvalidFormatExpressionError',
+    'InvalidIndexError',
+    'InvalidPathTemplateError',
+    'InvalidStateError',
+    'InvalidTimeWindowError',
+    'LogFormat',
+    'main',
+    'MissingFormatError',
+    'Renderer',
+    'Report',
+    'UnknownBucketError',
+    'UnknownRendererError',
+    'UnknownStatsBackendError',
+    'UnsupportedCompressionError',
 )
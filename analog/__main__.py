@@ -0,0 +1,9 @@
+"""Run analog with ``python -m analog``."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from analog.main import main
+
+
+if __name__ == '__main__':
+    main()
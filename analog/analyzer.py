@@ -1,11 +1,31 @@
 """Analog analysis module."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import collections
 import datetime
+import io
+import json
+import math
+import os
+import sys
+import time
 
-from analog.exceptions import MissingFormatError
+from analog import LOG
+from analog.cache import (COLUMNS, ParseCache, cache_path, from_seconds,
+                          to_seconds)
+from analog.exceptions import (InvalidCacheError, InvalidFollowError,
+                               InvalidIndexError, InvalidStateError,
+                               InvalidTimeWindowError, MissingFormatError)
+from analog.tail import Tail, watch
 from analog.formats import LogFormat
-from analog.report import Report
+from analog.index import TimeIndex, index_path
+from analog.readers import (DEFAULT_ENCODING, binary_stream, compression,
+                            read_lines)
+from analog.report import BatchReport, create_report
+from analog.state import State
+from analog.statistics import _import_numpy
+from analog.timing import Timing, clock
+from analog.utils import PathTemplates, PrefixIndex
 
 
 #: Default verbs to monitor if unconfigured.
@@ -14,6 +34,11 @@ DEFAULT_VERBS = ['DELETE', 'GET', 'PATCH', 'POST', 'PUT']
 DEFAULT_STATUS_CODES = [1, 2, 3, 4, 5]
 #: Default paths (all) to monitor if unconfigured.
 DEFAULT_PATHS = []
+#: Log entry fields extracted for analysis.
+ENTRY_FIELDS = ('path', 'verb', 'status', 'request_time',
+                'upstream_response_time', 'body_bytes_sent')
+#: Number of lines read per bisection probe when seeking to a time window.
+SEEK_PROBE_LINES = 100
 
 
 class Analyzer:
@@ -27,11 +52,16 @@ class Analyzer:
 
     def __init__(self, log, format, pattern=None, time_format=None,
                  verbs=DEFAULT_VERBS, status_codes=DEFAULT_STATUS_CODES,
-                 paths=DEFAULT_PATHS, max_age=None, path_stats=False):
+                 paths=DEFAULT_PATHS, max_age=None, path_stats=False, jobs=1,
+                 stats_backend='exact', state=None, bucket=None,
+                 top_paths=None, path_templates=None, normalize_ids=False,
+                 timing=False, since=None, until=None, index=None,
+                 cache=False, percentiles=()):
         """Configure log analyzer.
 
-        :param log: handle on logfile to read and analyze.
-        :type log: :py:class:`io.TextIOWrapper`
+        :param log: binary or text handle on logfile to read and analyze.
+            Files are read as ``bytes``, only extracted fields are decoded.
+        :type log: :py:class:`io.BufferedReader`
         :param format: log format identifier or 'custom'.
         :type format: ``str``
         :param pattern: custom log format pattern expression.
@@ -52,10 +82,79 @@ class Analyzer:
         :param max_age: Max. age of log entries to analyze in minutes.
             Unlimited by default.
         :type max_age: ``int``
+        :param jobs: Number of worker processes analyzing chunks of regular
+            logfiles in parallel. Single process analysis by default.
+        :type jobs: ``int``
+        :param stats_backend: Collect times and body sizes for exact statistics
+            (``exact``) or in bounded memory sketches (``ddsketch``).
+            See :py:class:`analog.report.Report`.
+        :type stats_backend: ``str``
+        :param state: Path of a state file to analyze the logfile incrementally.
+            Only log entries added since the last analysis are read and merged
+            into the stored report. See :py:class:`analog.state.State`.
+        :type state: ``str``
+        :param bucket: Also count log entries per time bucket of this size
+            (``minute``, ``5min`` or ``hour``) for a time series report.
+            See :py:attr:`analog.report.Report.buckets`.
+        :type bucket: ``str``
+        :param top_paths: Only keep per path statistics for this number of most
+            frequent paths, in bounded memory. All paths by default.
+            See :py:class:`analog.report.Report`.
+        :type top_paths: ``int``
+        :param path_templates: Regex patterns normalizing matching paths to
+            templates. The text of named groups is replaced by
+            ``{<group name>}``. See :py:class:`analog.utils.PathTemplates`.
+        :type path_templates: ``list`` of ``str``
+        :param normalize_ids: Replace numeric, UUID and hex path segments by
+            ``{id}`` before analyzing paths.
+        :type normalize_ids: ``bool``
+        :param timing: Measure the time spent per analysis stage in
+            :py:attr:`timing`. Timing slows analysis down a bit.
+        :type timing: ``bool``
+        :param since: Only analyze log entries from this time on.
+        :type since: :py:class:`datetime.datetime`
+        :param until: Only analyze log entries up to this time.
+        :type until: :py:class:`datetime.datetime`
+        :param index: Path of the time index of the logfile to seek to the
+            time window with. Created or updated as needed. Defaults to the
+            index next to the logfile, if it exists.
+            See :py:class:`analog.index.TimeIndex`.
+        :type index: ``str``
+        :param cache: Analyze the log entries of the parse cache next to the
+            logfile instead of parsing it, creating the cache if it is
+            missing or outdated. See :py:class:`analog.cache.ParseCache`.
+        :type cache: ``bool``
+        :param percentiles: Percentiles of times and body sizes to report, in
+            addition to the mean and median. See
+            :py:class:`analog.report.ListStats`.
+        :type percentiles: ``list`` of ``float``
         :raises: :py:class:`analog.exceptions.MissingFormatError` if no
             ``format`` is specified.
+        :raises: :py:class:`analog.exceptions.InvalidStateError` if ``state``
+            is combined with ``max_age``, ``since`` or ``until``.
+        :raises: :py:class:`analog.exceptions.InvalidTimeWindowError` if
+            ``max_age`` is combined with ``since`` or ``until`` or ``since`` is
+            after ``until``.
+        :raises: :py:class:`analog.exceptions.InvalidPathTemplateError` for
+            invalid ``path_templates``.
+        :raises: :py:class:`analog.exceptions.InvalidCacheError` if ``cache``
+            is combined with ``state``.
 
         """
+        if cache and state is not None:
+            raise InvalidCacheError(
+                "A parse cache cannot be combined with a state file.")
+        time_window = (max_age is not None or since is not None or
+                       until is not None)
+        if state is not None and time_window:
+            raise InvalidStateError(
+                "Incremental analysis with a state file cannot be limited by "
+                "max. age or a time window.")
+        if max_age is not None and (since is not None or until is not None):
+            raise InvalidTimeWindowError(
+                "Max. age cannot be combined with since or until.")
+        if since is not None and until is not None and since > until:
+            raise InvalidTimeWindowError("Since must not be after until.")
         self._log = log
         formats = LogFormat.all_formats()
         if format in formats:
@@ -68,19 +167,68 @@ class Analyzer:
             raise MissingFormatError(
                 "Require log format. Specify format name or custom regex "
                 "pattern and timestamp format.")
+        # only extract log entry fields needed for the analysis
+        fields = ENTRY_FIELDS
+        if time_window or bucket is not None:
+            fields += ('timestamp',)
+        self._fields = fields
+        self._extract = self._format.extractor(fields)
+        self._extract_timestamp = self._format.extractor(('timestamp',))
         self._verbs = verbs
         self._status_codes = status_codes
         self._pathconf = paths
+        self._path_index = PrefixIndex(paths)
+        self._templates = None
+        if path_templates or normalize_ids:
+            self._templates = PathTemplates(path_templates or (),
+                                            ids=normalize_ids)
 
         self._max_age = max_age
+        self._since = since
+        self._until = until
+        self._time_window = time_window
+        self._index = index
+        self._cache = cache
+        # last parsed timestamp string and its datetime
+        self._last_time_str = None
+        self._last_timestamp = None
+        self._jobs = jobs
+        self._stats_backend = stats_backend
+        self._state = state
+        self._bucket = bucket
+        self._top_paths = top_paths
+        # only applied when reading the report, not part of stored states
+        self._percentiles = percentiles
+
+        # configuration to recreate this analyzer in worker processes
+        self._options = {
+            'format': format,
+            'pattern': pattern,
+            'time_format': time_format,
+            'verbs': verbs,
+            'status_codes': status_codes,
+            'paths': paths,
+            'max_age': max_age,
+            'since': since,
+            'until': until,
+            'stats_backend': stats_backend,
+            'bucket': bucket,
+            'top_paths': top_paths,
+            'path_templates': path_templates,
+            'normalize_ids': normalize_ids,
+        }
 
         # execution time
         self.execution_time = None
+        #: time spent per analysis stage, if enabled
+        self.timing = Timing() if timing else None
 
     def _monitor_path(self, path):
         """Convert full request path to monitored path.
 
+        Paths are normalized to their path template first, if configured.
         If no path groups are configured to be monitored, all full paths are.
+        Otherwise the first configured path ``path`` starts with is monitored.
 
         :param path: the full request path.
         :type path: ``str``
@@ -89,83 +237,719 @@ class Analyzer:
         :rtype: ``str`` or ``None``
 
         """
+        if self._templates is not None:
+            path = self._templates.apply(path)
         if not self._pathconf:
             return path
-        for monitored in self._pathconf:
-            if path.startswith(monitored):
-                return monitored
-        return None
+        return self._path_index.match(path)
 
     def _timestamp(self, time_str):
         """Convert timestamp strings from nginx to datetime objects.
 
         Format is "15/Jan/2014:14:12:50 +0000".
 
+        Consecutive log entries often share the same timestamp, so the last
+        converted timestamp is cached.
+
         :returns: request timestamp datetime.
         :rtype: :py:class:`datetime.datetime`
 
         """
-        return datetime.datetime.strptime(time_str, self._format.time_format)
+        if time_str != self._last_time_str:
+            self._last_timestamp = self._format.parse_time(time_str)
+            self._last_time_str = time_str
+        return self._last_timestamp
 
-    def __call__(self):
-        """Analyze defined logfile.
+    def _probe_timestamp(self, log, offset):
+        """Find timestamp of the first log entry after byte ``offset``.
+
+        Resyncs to the start of the next line and reads up to
+        :py:data:`analog.analyzer.SEEK_PROBE_LINES` lines for one that matches
+        the log format.
+
+        :param log: seekable handle on logfile.
+        :param offset: byte offset to probe at.
+        :type offset: ``int``
+        :returns: tuple of line start offset and log entry timestamp. The
+            timestamp is ``None`` if no log entry could be parsed.
+        :rtype: ``tuple``
+
+        """
+        if offset > 0:
+            log.seek(offset - 1)
+            log.readline()
+        else:
+            log.seek(0)
+        line_start = log.tell()
+        encoding = getattr(self._log, 'encoding', None) or 'utf-8'
+        for _ in range(SEEK_PROBE_LINES):
+            line = log.readline()
+            if not line:
+                break
+            if isinstance(line, bytes):
+                line = line.decode(encoding, 'replace')
+            values = self._extract_timestamp(line)
+            if values is not None:
+                return line_start, self._timestamp(values[0])
+        return line_start, None
+
+    def _seek_min_time(self):
+        """Position logfile at the first log entry not before the time window.
+
+        Bisects the byte offsets of seekable logfiles, assuming log entries are
+        ordered by time. Streams like ``stdin`` or pipes are left untouched and
+        read from the start.
+
+        :returns: byte offset the logfile was positioned at or ``None`` if
+            the logfile is not seekable.
+        :rtype: ``int``
+
+        """
+        try:
+            if not self._log.seekable():
+                return None
+            # bisect on the underlying binary buffer for text files
+            log = getattr(self._log, 'buffer', self._log)
+            size = log.seek(0, os.SEEK_END)
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            _, timestamp = self._probe_timestamp(log, middle)
+            if timestamp is None or timestamp >= self._min_time:
+                high = middle
+            else:
+                low = middle + 1
+        line_start, _ = self._probe_timestamp(log, low)
+        self._log.seek(line_start)
+        return line_start
+
+    def _set_window(self, min_time, max_time):
+        """Define the time window of log entries to analyze.
+
+        :param min_time: start of the time window.
+        :type min_time: :py:class:`datetime.datetime`
+        :param max_time: end of the time window.
+        :type max_time: :py:class:`datetime.datetime`
+
+        """
+        self._min_time = min_time
+        self._max_time = max_time
+
+    def _seek_window(self, stream):
+        """Find the byte range of the logfile covering the time window.
+
+        Looks the range up in the time index of the logfile, if there is one.
+        Otherwise bisects the logfile for the start of the window.
+
+        :param stream: binary stream of the logfile and its encoding.
+        :type stream: ``tuple``
+        :returns: tuple of start and end byte offset, ``None`` for the
+            current position and the end of the logfile respectively.
+        :rtype: ``tuple``
+
+        """
+        index = self._load_index(stream)
+        if index is None:
+            if self._min_time == datetime.datetime.min:
+                return None, None
+            return self._seek_min_time(), None
+        return index.start(self._min_time), index.end(self._max_time)
+
+    def _load_index(self, stream, create=False):
+        """Load the time index of the logfile and index new log entries.
+
+        The updated index is saved, failing to do so is only logged.
+
+        :param stream: binary stream of the logfile and its encoding.
+        :type stream: ``tuple``
+        :param create: create the index next to the logfile if it does not
+            exist yet.
+        :type create: ``bool``
+        :returns: the index or ``None`` if there is none.
+        :rtype: :py:class:`analog.index.TimeIndex`
+        :raises: :py:class:`analog.exceptions.InvalidIndexError` if an
+            index is requested for a logfile that is no uncompressed,
+            seekable file.
+
+        """
+        path = self._index
+        name = getattr(self._log, 'name', None)
+        if path is None and isinstance(name, str) and os.path.isfile(name):
+            path = index_path(name)
+            if not create and not os.path.exists(path):
+                return None
+        if path is None and not create:
+            return None
+        try:
+            indexable = (path is not None and stream is not None and
+                         compression(stream[0]) is None and
+                         stream[0].seekable())
+        except (AttributeError, IOError, OSError, ValueError):
+            indexable = False
+        if not indexable:
+            raise InvalidIndexError(
+                "Only uncompressed, seekable logfiles can be indexed.")
+        log, encoding = stream
+        index = TimeIndex.load(path, self._format_key())
+        if index.update(log, self._format.extractor(('timestamp',), encoding),
+                        self._format.parse_time):
+            try:
+                index.save(path)
+            except (IOError, OSError) as exc:
+                LOG.warning("Cannot save index file %s: %s", path, exc)
+        return index
+
+    def _format_key(self):
+        """Identify the log format of this analyzer.
+
+        Indexes and caches are only valid for the same log format.
+
+        :rtype: ``str``
+
+        """
+        return json.dumps({option: self._options[option]
+                           for option in ('format', 'pattern', 'time_format')},
+                          sort_keys=True)
+
+    def _load_cache(self, stream):
+        """Load the parse cache of the logfile, parsing it if outdated.
+
+        :param stream: binary stream of the logfile and its encoding.
+        :type stream: ``tuple``
+        :returns: the cache or ``None`` if it cannot be written.
+        :rtype: :py:class:`analog.cache.ParseCache`
+        :raises: :py:class:`analog.exceptions.InvalidCacheError` if the
+            logfile is no uncompressed regular file.
+
+        """
+        name = getattr(self._log, 'name', None)
+        try:
+            cacheable = (isinstance(name, str) and os.path.isfile(name) and
+                         stream is not None and
+                         compression(stream[0]) is None and
+                         stream[0].seekable())
+        except (AttributeError, IOError, OSError, ValueError):
+            cacheable = False
+        if not cacheable:
+            raise InvalidCacheError(
+                "Only uncompressed, regular logfiles can be cached.")
+        log, encoding = stream
+        path = cache_path(name)
+        key = self._format_key()
+        cache = ParseCache.load(path, log, key)
+        if cache is None:
+            try:
+                ParseCache.create(
+                    path, log, key,
+                    self._format.extractor(ENTRY_FIELDS + ('timestamp',),
+                                           encoding),
+                    self._format.parse_time)
+            except (IOError, OSError) as exc:
+                LOG.warning("Cannot write cache file %s: %s", path, exc)
+                return None
+            cache = ParseCache.load(path, log, key)
+        return cache
+
+    def _analyze_cache(self, cache, report):
+        """Analyze the log entries of parse ``cache`` into ``report``.
+
+        Paths are converted to monitored paths once per distinct path. Batch
+        reports aggregate the columns in bulk unless log entries are counted
+        in time buckets, other reports add the log entries row by row.
+
+        :param cache: parse cache of the logfile.
+        :type cache: :py:class:`analog.cache.ParseCache`
+        :param report: log analysis report to add log entries to.
+        :type report: :py:class:`analog.report.Report`
+
+        """
+        paths = [self._monitor_path(path) for path in cache.paths]
+        verbs = cache.verbs
+        add = report.add
+        time_window = self._time_window
+        if time_window:
+            min_seconds = to_seconds(self._min_time)
+            max_seconds = to_seconds(self._max_time)
+
+        if isinstance(report, BatchReport) and self._bucket is None:
+            numpy = _import_numpy()
+            (seconds, path_ids, verb_ids, status, times, upstream_times,
+             body_bytes) = (numpy.asarray(cache.columns[name])
+                            for name, _ in COLUMNS)
+            if time_window:
+                # stop at the first log entry after the window, like below
+                after = numpy.flatnonzero(seconds > max_seconds)
+                stop = after[0] if len(after) else len(seconds)
+                rows = numpy.flatnonzero(seconds[:stop] >= min_seconds)
+                (path_ids, verb_ids, status, times, upstream_times,
+                 body_bytes) = (column[rows] for column in (
+                     path_ids, verb_ids, status, times, upstream_times,
+                     body_bytes))
+            report.add_columns(paths, verbs, path_ids, verb_ids, status,
+                               times, upstream_times, body_bytes)
+            return
+
+        parse_time = len(self._fields) > len(ENTRY_FIELDS)
+        timestamp = last_seconds = None
+
+        for (seconds, path_id, verb_id, status, request_time, upstream_time,
+             body_bytes) in cache.rows():
+            if time_window:
+                if seconds < min_seconds:
+                    continue
+                if seconds > max_seconds:
+                    break
+            path = paths[path_id]
+            if path is None:
+                continue
+            if parse_time and seconds != last_seconds:
+                timestamp = from_seconds(seconds)
+                last_seconds = seconds
+            add(path=path, verb=verbs[verb_id], status=status,
+                time=request_time, upstream_time=upstream_time,
+                body_bytes=body_bytes, timestamp=timestamp)
+
+    def update_index(self):
+        """Create or update the time index of the logfile.
+
+        Only log entries added since the last update are indexed, unless the
+        logfile was replaced or rewritten.
+
+        :returns: the updated index.
+        :rtype: :py:class:`analog.index.TimeIndex`
+        :raises: :py:class:`analog.exceptions.InvalidIndexError` if the
+            logfile is no uncompressed, seekable file.
+
+        """
+        return self._load_index(binary_stream(self._log), create=True)
+
+    def _report(self):
+        """Create an empty report for this analyzer's configuration.
 
-        :returns: log analysis report object.
         :rtype: :py:class:`analog.report.Report`
 
         """
-        if self._max_age is not None:
-            self._now = datetime.datetime.now()
-            self._now = self._now.replace(second=0, microsecond=0)
-            self._min_time = (
-                self._now - datetime.timedelta(minutes=self._max_age))
-
-        report = Report(self._verbs, self._status_codes)
-
-        # read lines from logfile for the last max_age minutes
-        for line in self._log:
-            # parse line
-            match = self._format.pattern.search(line)
-            if match is None:
+        return create_report(self._verbs, self._status_codes,
+                             self._stats_backend, self._bucket,
+                             self._top_paths, self._percentiles)
+
+    def _chunks(self, start, end=None):
+        """Split the logfile from ``start`` into newline aligned byte ranges.
+
+        :param start: byte offset to start splitting at.
+        :type start: ``int``
+        :param end: byte offset to stop splitting at. Defaults to the end of the
+            logfile.
+        :type end: ``int``
+        :returns: list of (start, end) byte offset tuples, one per job, or
+            ``None`` if the logfile is no regular file.
+        :rtype: ``list`` of ``tuple``
+
+        """
+        name = getattr(self._log, 'name', None)
+        if not isinstance(name, str) or not os.path.isfile(name):
+            return None
+        size = os.path.getsize(name) if end is None else end
+        offsets = [start]
+        with io.open(name, 'rb') as log:
+            for job in range(1, self._jobs):
+                offset = start + (size - start) * job // self._jobs
+                if offset <= offsets[-1]:
+                    continue
+                log.seek(offset - 1)
+                log.readline()
+                offset = log.tell()
+                if offsets[-1] < offset < size:
+                    offsets.append(offset)
+        offsets.append(size)
+        return list(zip(offsets[:-1], offsets[1:]))
+
+    def _analyze_parallel(self, report, chunks, encoding):
+        """Analyze logfile ``chunks`` in worker processes.
+
+        Every worker analyzes one byte range of the logfile into a partial
+        report. The partial reports are merged into ``report`` in logfile order.
+
+        :param report: log analysis report to merge partial reports into.
+        :type report: :py:class:`analog.report.Report`
+        :param chunks: (start, end) byte offset tuples of the logfile.
+        :type chunks: ``list`` of ``tuple``
+        :param encoding: encoding of the logfile.
+        :type encoding: ``str``
+
+        """
+        window = None
+        if self._time_window:
+            window = (self._min_time, self._max_time)
+        timing = self.timing is not None
+        tasks = [(self._options, window, self._log.name, start, end, encoding,
+                  timing)
+                 for start, end in chunks]
+        import multiprocessing
+        pool = multiprocessing.Pool(min(self._jobs, len(tasks)))
+        try:
+            for partial, stopped, partial_timing in pool.imap(_analyze_chunk,
+                                                              tasks):
+                report.merge(partial)
+                if timing:
+                    self.timing.merge(partial_timing)
+                # later chunks only contain entries newer than now
+                if stopped:
+                    break
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _analyze(self, lines, report, extract=None):
+        """Analyze log entries from ``lines`` into ``report``.
+
+        :param lines: iterable of log lines. Undecoded lines are tuples of
+            each line and its size in bytes if the analysis is timed.
+        :param report: log analysis report to add log entries to.
+        :type report: :py:class:`analog.report.Report`
+        :param extract: function extracting the analyzed fields from ``lines``.
+            Defaults to extracting them from ``str`` lines.
+        :type extract: ``function``
+        :returns: ``True`` if analysis stopped at a log entry after the time
+            window, else ``False``.
+        :rtype: ``bool``
+
+        """
+        if self.timing is not None:
+            return self._analyze_timed(lines, report, extract)
+        extract = extract or self._extract
+        monitor_path = self._monitor_path
+        add = report.add
+        time_window = self._time_window
+        parse_time = len(self._fields) > len(ENTRY_FIELDS)
+        timestamp = None
+
+        # read lines from logfile for the time window
+        for line in lines:
+            # parse line into the values of ENTRY_FIELDS (+ timestamp)
+            values = extract(line)
+            if values is None:
                 continue
-            log_entry = self._format.entry(match)
 
-            if self._max_age is not None:
-                # don't process anything older than max_age
-                timestamp = self._timestamp(log_entry.timestamp)
+            if parse_time:
+                timestamp = self._timestamp(values[6])
+            if time_window:
+                # don't process anything before the time window
                 if timestamp < self._min_time:
                     continue
-                # stop processing when now was reached
-                if timestamp > self._now:
-                    break
+                # stop processing when the end of the window was reached
+                if timestamp > self._max_time:
+                    return True
 
             # parse request
-            path = self._monitor_path(log_entry.path)
+            path = monitor_path(values[0])
             if path is None:
                 continue
 
             # collect the numbers
-            report.add(
-                path=path,
-                verb=log_entry.verb,
-                status=int(log_entry.status),
-                time=float(log_entry.request_time),
-                upstream_time=float(log_entry.upstream_response_time),
-                body_bytes=int(log_entry.body_bytes_sent))
+            add(path=path,
+                verb=values[1],
+                status=int(values[2]),
+                time=float(values[3]),
+                upstream_time=float(values[4]),
+                body_bytes=int(values[5]),
+                timestamp=timestamp)
+
+        return False
+
+    def _analyze_timed(self, lines, report, extract=None):
+        """Analyze log entries like :py:meth:`_analyze`, timing every stage.
+
+        Stage times and line counts are added to :py:attr:`timing`.
+
+        """
+        # undecoded lines are read with their size in bytes
+        sized = extract is not None
+        extract = extract or self._extract
+        monitor_path = self._monitor_path
+        add = report.add
+        time_window = self._time_window
+        parse_time = len(self._fields) > len(ENTRY_FIELDS)
+        timestamp = None
+        read = match = parse = filter_ = entry = add_time = 0.0
+        lines_read = matched = skipped = bytes_read = 0
+
+        lines = iter(lines)
+        try:
+            while True:
+                start = clock()
+                line = next(lines, None)
+                now = clock()
+                read += now - start
+                if line is None:
+                    break
+                lines_read += 1
+                if sized:
+                    line, size = line
+                    bytes_read += size
+                else:
+                    bytes_read += len(line)
+
+                values = extract(line)
+                start, now = now, clock()
+                match += now - start
+                if values is None:
+                    continue
+                matched += 1
+
+                if parse_time:
+                    timestamp = self._timestamp(values[6])
+                    start, now = now, clock()
+                    parse += now - start
+                if time_window:
+                    if timestamp < self._min_time:
+                        skipped += 1
+                        continue
+                    if timestamp > self._max_time:
+                        skipped += 1
+                        return True
+                path = monitor_path(values[0])
+                start, now = now, clock()
+                filter_ += now - start
+                if path is None:
+                    skipped += 1
+                    continue
+
+                status = int(values[2])
+                request_time = float(values[3])
+                upstream_time = float(values[4])
+                body_bytes = int(values[5])
+                start, now = now, clock()
+                entry += now - start
+
+                requests = report.requests
+                add(path=path, verb=values[1], status=status,
+                    time=request_time, upstream_time=upstream_time,
+                    body_bytes=body_bytes, timestamp=timestamp)
+                add_time += clock() - now
+                # untracked verbs and status codes are ignored
+                if report.requests == requests:
+                    skipped += 1
+            return False
+        finally:
+            # aggregating the last buffered log entries is part of adding
+            start = clock()
+            report.flush()
+            add_time += clock() - start
+            timing = self.timing
+            timing.stages['read'] += read
+            timing.stages['match'] += match
+            timing.stages['timestamp'] += parse
+            timing.stages['filter'] += filter_
+            timing.stages['entry'] += entry
+            timing.stages['add'] += add_time
+            timing.lines_read += lines_read
+            timing.lines_matched += matched
+            timing.lines_skipped += skipped
+            timing.bytes_read += bytes_read
+
+    def _resume(self, stream, compressed):
+        """Load the state of the incremental analysis of the logfile.
+
+        :param stream: binary stream of the logfile and its encoding.
+        :type stream: ``tuple``
+        :param compressed: whether the logfile is compressed.
+        :type compressed: ``bool``
+        :returns: state for the analyzer configuration.
+        :rtype: :py:class:`analog.state.State`
+        :raises: :py:class:`analog.exceptions.InvalidStateError` if the logfile
+            is no seekable, uncompressed file.
+
+        """
+        try:
+            seekable = (stream is not None and not compressed and
+                        stream[0].seekable())
+        except (AttributeError, IOError, OSError, ValueError):
+            seekable = False
+        if not seekable:
+            raise InvalidStateError(
+                "Incremental analysis with a state file requires an "
+                "uncompressed, seekable logfile.")
+        # the stored report is only valid for the same configuration
+        key = json.dumps(self._options, sort_keys=True)
+        return State.load(self._state, key)
+
+    def __call__(self):
+        """Analyze defined logfile.
+
+        :returns: log analysis report object.
+        :rtype: :py:class:`analog.report.Report`
+
+        """
+        # read undecoded lines from files, only decode the extracted fields
+        stream = binary_stream(self._log)
+        # compressed logfiles can only be read from start to end
+        compressed = stream is not None and compression(stream[0]) is not None
+
+        start = end = state = None
+        if self._max_age is not None:
+            now = datetime.datetime.now().replace(second=0, microsecond=0)
+            self._set_window(now - datetime.timedelta(minutes=self._max_age),
+                             now)
+        elif self._time_window:
+            self._set_window(self._since or datetime.datetime.min,
+                             self._until or datetime.datetime.max)
+        cache = None
+        if self._cache:
+            # analyze the parsed log entries of the cache instead
+            cache = self._load_cache(stream)
+        elif self._time_window:
+            # skip all log entries outside the window if the logfile allows it
+            if not compressed:
+                start, end = self._seek_window(stream)
+        elif self._state is not None:
+            # only analyze complete lines added since the last run
+            state = self._resume(stream, compressed)
+            start, end = state.resume(stream[0])
+
+        report = self._report()
+        if state is not None and state.report is not None:
+            report.merge(state.report)
+
+        chunks = None
+        if (cache is None and stream is not None and not compressed and
+                self._jobs > 1):
+            chunks = self._chunks(start or 0, end)
+        if cache is not None:
+            try:
+                self._analyze_cache(cache, report)
+            finally:
+                cache.close()
+        elif chunks and len(chunks) > 1:
+            self._analyze_parallel(report, chunks, stream[1])
+        elif stream is not None:
+            log, encoding = stream
+            # line sizes are only needed to count the bytes read
+            lines = read_lines(log, start, end,
+                               sizes=self.timing is not None)
+            self._analyze(lines, report,
+                          self._format.extractor(self._fields, encoding))
+        else:
+            self._analyze(self._log, report)
+
+        if state is not None:
+            state.advance(stream[0], end, report)
+            state.save(self._state)
 
         # end timestamp
         report.finish()
         return report
 
+    def follow(self, interval, window):
+        """Continuously analyze log entries appended to the logfile.
+
+        The logfile is followed like ``tail -F`` from its current end, waiting
+        for changes with inotify if available. Log entries are analyzed into
+        one partial report per ``interval``. After every interval, the partial
+        reports of the last ``window`` seconds are merged into one report.
+
+        :param interval: seconds between reports.
+        :type interval: ``float``
+        :param window: seconds of log entries covered by each report, rounded
+            up to whole intervals.
+        :type window: ``float``
+        :returns: generator of reports of the last ``window`` seconds.
+        :rtype: ``generator`` of :py:class:`analog.report.Report`
+        :raises: :py:class:`analog.exceptions.InvalidFollowError` if the
+            logfile is no uncompressed regular file, combined with ``max_age``,
+            ``since``, ``until`` or ``state`` or ``window`` is shorter than
+            ``interval``.
+
+        """
+        name = getattr(self._log, 'name', None)
+        stream = binary_stream(self._log)
+        if (not isinstance(name, str) or not os.path.isfile(name) or
+                stream is not None and compression(stream[0]) is not None):
+            raise InvalidFollowError(
+                "Only uncompressed logfiles can be followed.")
+        if self._time_window or self._state is not None:
+            raise InvalidFollowError(
+                "Following a logfile cannot be combined with max. age, a time "
+                "window or a state file.")
+        if not 0 < interval <= window:
+            raise InvalidFollowError(
+                "Follow interval must be positive and not exceed the window.")
+        encoding = stream[1] if stream is not None else DEFAULT_ENCODING
+        return self._follow(name, encoding, interval, window)
+
+    def _follow(self, name, encoding, interval, window):
+        """Generate reports of logfile ``name`` for :py:meth:`follow`."""
+        clock = getattr(time, 'monotonic', time.time)
+        extract = self._format.extractor(self._fields, encoding)
+        sized = self.timing is not None
+        reports = collections.deque(maxlen=int(math.ceil(window / interval)))
+        report = self._report()
+        tail = Tail(name)
+        watcher = watch(name)
+        try:
+            deadline = clock() + interval
+            while True:
+                remaining = deadline - clock()
+                if remaining > 0:
+                    if watcher.wait(remaining):
+                        self._analyze(tail.read_lines(sizes=sized), report,
+                                      extract)
+                    continue
+                self._analyze(tail.read_lines(sizes=sized), report, extract)
+                reports.append(report)
+
+                window_report = self._report()
+                for partial in reports:
+                    window_report.merge(partial)
+                window_report.finish()
+                yield window_report
+
+                report = self._report()
+                # skip intervals missed while the report was processed
+                deadline = max(deadline + interval, clock())
+        finally:
+            watcher.close()
+            tail.close()
+
+
+def _analyze_chunk(task):
+    """Analyze one chunk of a logfile in a worker process.
+
+    :param task: tuple of analyzer options, time window, logfile name, start
+        and end byte offsets, encoding and whether to time the analysis
+        stages.
+    :type task: ``tuple``
+    :returns: tuple of partial report, whether analysis stopped at a log
+        entry after the time window and the timing or ``None``.
+    :rtype: ``tuple``
+
+    """
+    options, window, name, start, end, encoding, timing = task
+    analyzer = Analyzer(log=None, timing=timing, **options)
+    if window is not None:
+        analyzer._set_window(*window)
+    report = analyzer._report()
+    with io.open(name, 'rb') as log:
+        stopped = analyzer._analyze(
+            read_lines(log, start, end, sizes=timing), report,
+            analyzer._format.extractor(analyzer._fields, encoding))
+    return report, stopped, analyzer.timing
+
 
 def analyze(log, format, pattern=None, time_format=None,
             verbs=DEFAULT_VERBS, status_codes=DEFAULT_STATUS_CODES,
             paths=DEFAULT_PATHS, max_age=None, path_stats=False, timing=False,
-            output_format=None):
+            output_format=None, jobs=1, stats_backend='exact', state=None,
+            bucket=None, top_paths=None, path_templates=None,
+            normalize_ids=False, timing_format='text', since=None,
+            until=None, index=None, cache=False, percentiles=()):
     """Convenience wrapper around :py:class:`analog.analyzer.Analyzer`.
 
-    :param log: handle on logfile to read and analyze.
-    :type log: :py:class:`io.TextIOWrapper`
+    :param log: binary or text handle on logfile to read and analyze.
+    :type log: :py:class:`io.BufferedReader`
     :param format: log format identifier or 'custom'.
     :type format: ``str``
     :param pattern: custom log format pattern expression.
@@ -188,10 +972,36 @@ def analyze(log, format, pattern=None, time_format=None,
     :type max_age: ``int``
     :param path_stats: Print per-path analysis report. Default off.
     :type path_stats: ``bool``
-    :param timing: print analysis timing information?
+    :param timing: print time spent per analysis stage to ``stderr``?
     :type timing: ``bool``
     :param output_format: report output format.
     :type output_format: ``str``
+    :param jobs: number of worker processes to analyze the logfile with.
+    :type jobs: ``int``
+    :param stats_backend: statistics backend for times and body sizes.
+    :type stats_backend: ``str``
+    :param state: path of a state file for incremental analysis.
+    :type state: ``str``
+    :param bucket: time bucket size for a time series report.
+    :type bucket: ``str``
+    :param top_paths: number of most frequent paths to keep statistics for.
+    :type top_paths: ``int``
+    :param path_templates: regex patterns normalizing paths to templates.
+    :type path_templates: ``list`` of ``str``
+    :param normalize_ids: replace ID path segments by ``{id}``.
+    :type normalize_ids: ``bool``
+    :param timing_format: timing output format, ``text`` or ``json``.
+    :type timing_format: ``str``
+    :param since: only analyze log entries from this time on.
+    :type since: :py:class:`datetime.datetime`
+    :param until: only analyze log entries up to this time.
+    :type until: :py:class:`datetime.datetime`
+    :param index: path of the time index of the logfile.
+    :type index: ``str``
+    :param cache: analyze log entries of the parse cache of the logfile.
+    :type cache: ``bool``
+    :param percentiles: percentiles of times and body sizes to report.
+    :type percentiles: ``list`` of ``float``
 
     :returns: log analysis report object.
     :rtype: :py:class:`analog.report.Report`
@@ -200,14 +1010,116 @@ def analyze(log, format, pattern=None, time_format=None,
     analyzer = Analyzer(log=log, format=format,
                         pattern=pattern, time_format=time_format,
                         verbs=verbs, status_codes=status_codes,
-                        paths=paths, max_age=max_age, path_stats=path_stats)
+                        paths=paths, max_age=max_age, path_stats=path_stats,
+                        jobs=jobs, stats_backend=stats_backend, state=state,
+                        bucket=bucket, top_paths=top_paths,
+                        path_templates=path_templates,
+                        normalize_ids=normalize_ids, timing=timing,
+                        since=since, until=until, index=index, cache=cache,
+                        percentiles=percentiles)
     report = analyzer()
 
-    # print timing information
-    if timing and report.execution_time:
-        print("Analyzed logs in {:.3f}s.\n".format(report.execution_time))
+    if not timing:
+        # write report in requested output format as it is rendered
+        report.render_to(sys.stdout, path_stats=path_stats,
+                         output_format=output_format)
+        return report
 
-    # print report in requested output format
-    print(report.render(path_stats=path_stats, output_format=output_format))
+    stages = analyzer.timing
+    with stages.measure('stats'):
+        report.compute(path_stats=path_stats)
+    with stages.measure('render'):
+        report.render_to(sys.stdout, path_stats=path_stats,
+                         output_format=output_format)
+    stages.finish()
+    # keep timing information out of the report output
+    sys.stdout.flush()
+    print(stages.render(timing_format), file=sys.stderr)
 
     return report
+
+
+def build_index(log, format, pattern=None, time_format=None, index=None):
+    """Create or update the time index of a logfile.
+
+    See :py:meth:`analog.analyzer.Analyzer.update_index`.
+
+    :param log: binary handle on logfile to index.
+    :type log: :py:class:`io.BufferedReader`
+    :param format: log format identifier or 'custom'.
+    :type format: ``str``
+    :param pattern: custom log format pattern expression.
+    :type pattern: ``str``
+    :param time_format: log entry timestamp format (strftime compatible).
+    :type time_format: ``str``
+    :param index: path of the index file. Defaults to the logfile path with
+        :py:data:`analog.index.INDEX_SUFFIX`.
+    :type index: ``str``
+
+    :returns: the updated index.
+    :rtype: :py:class:`analog.index.TimeIndex`
+
+    """
+    analyzer = Analyzer(log=log, format=format, pattern=pattern,
+                        time_format=time_format, index=index)
+    return analyzer.update_index()
+
+
+def follow(log, format, pattern=None, time_format=None,
+           verbs=DEFAULT_VERBS, status_codes=DEFAULT_STATUS_CODES,
+           paths=DEFAULT_PATHS, path_stats=False, output_format=None,
+           stats_backend='exact', interval=10, window=300, bucket=None,
+           top_paths=None, path_templates=None, normalize_ids=False,
+           percentiles=()):
+    """Convenience wrapper around :py:meth:`analog.analyzer.Analyzer.follow`.
+
+    Prints a report of the last ``window`` seconds every ``interval`` seconds
+    until interrupted.
+
+    :param log: handle on logfile to follow.
+    :type log: :py:class:`io.BufferedReader`
+    :param format: log format identifier or 'custom'.
+    :type format: ``str``
+    :param pattern: custom log format pattern expression.
+    :type pattern: ``str``
+    :param time_format: log entry timestamp format (strftime compatible).
+    :type time_format: ``str``
+    :param verbs: HTTP verbs to be tracked.
+    :type verbs: ``list``
+    :param status_codes: status_codes to be tracked.
+    :type status_codes: ``list``
+    :param paths: Paths to explicitly analyze.
+    :type paths: ``list`` of ``str``
+    :param path_stats: Print per-path analysis report. Default off.
+    :type path_stats: ``bool``
+    :param output_format: report output format.
+    :type output_format: ``str``
+    :param stats_backend: statistics backend for times and body sizes.
+    :type stats_backend: ``str``
+    :param interval: seconds between reports.
+    :type interval: ``float``
+    :param window: seconds of log entries covered by each report.
+    :type window: ``float``
+    :param bucket: time bucket size for a time series report.
+    :type bucket: ``str``
+    :param top_paths: number of most frequent paths to keep statistics for.
+    :type top_paths: ``int``
+    :param path_templates: regex patterns normalizing paths to templates.
+    :type path_templates: ``list`` of ``str``
+    :param normalize_ids: replace ID path segments by ``{id}``.
+    :type normalize_ids: ``bool``
+    :param percentiles: percentiles of times and body sizes to report.
+    :type percentiles: ``list`` of ``float``
+
+    """
+    analyzer = Analyzer(log=log, format=format,
+                        pattern=pattern, time_format=time_format,
+                        verbs=verbs, status_codes=status_codes,
+                        paths=paths, path_stats=path_stats,
+                        stats_backend=stats_backend, bucket=bucket,
+                        top_paths=top_paths, path_templates=path_templates,
+                        normalize_ids=normalize_ids, percentiles=percentiles)
+    for report in analyzer.follow(interval, window):
+        report.render_to(sys.stdout, path_stats=path_stats,
+                         output_format=output_format)
+        sys.stdout.flush()
@@ -0,0 +1,297 @@
+"""Analog columnar cache of parsed log entries."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+from array import array
+import datetime
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+from analog import LOG
+from analog.readers import read_lines
+
+
+#: Version of the cache file layout.
+CACHE_VERSION = 2
+#: Suffix of cache files next to the logfile they cache.
+CACHE_SUFFIX = '.cache'
+#: Magic bytes at the start of cache files.
+MAGIC = b'ANALOGC\x01'
+#: Layout of the header length following the magic bytes.
+HEADER_LENGTH = struct.Struct(str('<Q'))
+#: Names and array typecodes of the cached columns.
+COLUMNS = (
+    ('timestamp', 'd'),
+    ('path', 'i'),
+    ('verb', 'H'),
+    ('status', 'i'),
+    ('request_time', 'd'),
+    ('upstream_response_time', 'd'),
+    ('body_bytes_sent', 'q'),
+)
+#: Largest status code the status column holds.
+MAX_STATUS = 2 ** 31 - 1
+#: Number of rows buffered per column before writing them out.
+FLUSH_ROWS = 65536
+#: Start of the seconds of the timestamp column.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def cache_path(log_path):
+    """Path of the cache file of logfile ``log_path``."""
+    return log_path + CACHE_SUFFIX
+
+
+def to_seconds(timestamp):
+    """Seconds of ``timestamp`` since :py:data:`analog.cache.EPOCH`."""
+    return (timestamp.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+def from_seconds(seconds):
+    """Timestamp of ``seconds`` since :py:data:`analog.cache.EPOCH`."""
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def _align(offset):
+    """Round ``offset`` up to the next multiple of 8 bytes."""
+    return offset + -offset % 8
+
+
+def _stat(log):
+    """Device, inode, size and mtime of the file binary ``log`` is open on."""
+    info = os.fstat(log.fileno())
+    return [info.st_dev, info.st_ino, info.st_size, info.st_mtime]
+
+
+class ParseCache(object):
+
+    """Log entries of a logfile parsed into columns.
+
+    Every matching log entry is one row of the columns in
+    :py:data:`analog.cache.COLUMNS`, except for log entries with status codes
+    above :py:data:`analog.cache.MAX_STATUS`, which are no HTTP status codes.
+    Timestamps are stored as seconds since :py:data:`analog.cache.EPOCH`,
+    paths and verbs as ids into the :py:attr:`paths` and :py:attr:`verbs`
+    tables of distinct values. Paths are stored as logged, so filters and path
+    templates can change between runs.
+
+    Cache files start with a JSON header describing the columns, followed by
+    the raw column arrays in native byte order. They are memory-mapped, the
+    columns are read without copying or parsing.
+
+    A cache is only valid for the logfile (by device, inode, size and mtime)
+    and log format (identified by ``key``) it was created from.
+
+    """
+
+    def __init__(self, paths, verbs, columns, data=None):
+        """Create cache of parsed log entries.
+
+        :param paths: distinct paths by path id.
+        :type paths: ``list`` of ``str``
+        :param verbs: distinct verbs by verb id.
+        :type verbs: ``list`` of ``str``
+        :param columns: column arrays or memory views by column name.
+        :type columns: ``dict``
+        :param data: memory map the columns are views of.
+        :type data: :py:class:`mmap.mmap`
+
+        """
+        #: distinct paths by path id
+        self.paths = paths
+        #: distinct verbs by verb id
+        self.verbs = verbs
+        #: columns by name, see :py:data:`analog.cache.COLUMNS`
+        self.columns = columns
+        self._data = data
+
+    def __len__(self):
+        """Number of cached log entries."""
+        return len(self.columns['timestamp'])
+
+    def rows(self):
+        """Iterate over rows of all columns in :py:data:`COLUMNS` order.
+
+        :returns: iterator of tuples of column values.
+
+        """
+        return zip(*(self.columns[name] for name, _ in COLUMNS))
+
+    def close(self):
+        """Release the memory map of the cache file."""
+        columns, self.columns = self.columns, {}
+        for column in columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    @classmethod
+    def load(cls, path, log, key):
+        """Load cache of binary ``log`` from file ``path``.
+
+        :param path: path of the cache file.
+        :type path: ``str``
+        :param log: binary handle on the cached logfile.
+        :param key: identifier of the log format.
+        :type key: ``str``
+        :returns: the cache or ``None`` if the file does not exist, cannot be
+            read or was created for another logfile or log format.
+        :rtype: :py:class:`analog.cache.ParseCache`
+
+        """
+        try:
+            with open(path, 'rb') as fp:
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None
+        try:
+            header = cls._header(data)
+        except Exception:
+            LOG.warning("Ignoring unreadable cache file %s.", path)
+            header = None
+        if (header is None or
+                header.get('version') != CACHE_VERSION or
+                header.get('key') != key or
+                header.get('byteorder') != sys.byteorder or
+                header.get('stat') != _stat(log)):
+            data.close()
+            return None
+
+        columns = {}
+        start = header['start']
+        view = memoryview(data)
+        for name, typecode in COLUMNS:
+            offset, size = header['columns'][name]
+            column = view[start + offset:start + offset + size]
+            try:
+                columns[name] = column.cast(str(typecode))
+            except AttributeError:  # Python 2.7, copy into an array
+                columns[name] = array(str(typecode), column.tobytes())
+        view.release()
+        return cls(header['paths'], header['verbs'], columns, data)
+
+    @staticmethod
+    def _header(data):
+        """Read the header of cache file ``data``."""
+        if data[:len(MAGIC)] != MAGIC:
+            return None
+        length, = HEADER_LENGTH.unpack_from(data, len(MAGIC))
+        start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(data[start:start + length].decode('utf-8'))
+        header['start'] = _align(start + length)
+        return header
+
+    @classmethod
+    def create(cls, path, log, key, extract, parse_time):
+        """Parse binary ``log`` into cache file ``path``.
+
+        Columns are written to temporary files in batches of
+        :py:data:`analog.cache.FLUSH_ROWS` rows, so the memory needed does
+        not grow with the size of the logfile.
+
+        :param path: path of the cache file, replaced atomically.
+        :type path: ``str``
+        :param log: seekable binary handle on logfile.
+        :param key: identifier of the log format.
+        :type key: ``str``
+        :param extract: function extracting the fields of
+            :py:data:`analog.analyzer.ENTRY_FIELDS` and the timestamp from
+            ``bytes`` log lines.
+        :type extract: ``function``
+        :param parse_time: function converting timestamp strings to
+            datetimes.
+        :type parse_time: ``function``
+        :raises: :py:class:`IOError` if the cache file cannot be written.
+
+        """
+        stat = _stat(log)
+        paths, verbs = {}, {}
+        columns = [array(str(typecode)) for _, typecode in COLUMNS]
+        parts = [tempfile.TemporaryFile() for _ in COLUMNS]
+        (timestamps, path_ids, verb_ids, status, times, upstream_times,
+         body_bytes) = columns
+        last_time_str = seconds = None
+        try:
+            for line in read_lines(log, 0, stat[2]):
+                values = extract(line)
+                if values is None:
+                    continue
+                status_code = int(values[2])
+                if status_code > MAX_STATUS:
+                    LOG.debug("Not caching log entry with status code %s.",
+                              status_code)
+                    continue
+                # consecutive log entries often share the same timestamp
+                if values[6] != last_time_str:
+                    last_time_str = values[6]
+                    seconds = to_seconds(parse_time(last_time_str))
+                timestamps.append(seconds)
+                path_id = paths.get(values[0])
+                if path_id is None:
+                    path_id = paths[values[0]] = len(paths)
+                path_ids.append(path_id)
+                verb_id = verbs.get(values[1])
+                if verb_id is None:
+                    verb_id = verbs[values[1]] = len(verbs)
+                verb_ids.append(verb_id)
+                status.append(status_code)
+                times.append(float(values[3]))
+                upstream_times.append(float(values[4]))
+                body_bytes.append(int(values[5]))
+                if len(timestamps) >= FLUSH_ROWS:
+                    cls._flush(columns, parts)
+            cls._flush(columns, parts)
+            cls._write(path, key, stat, paths, verbs, parts)
+        finally:
+            for part in parts:
+                part.close()
+
+    @staticmethod
+    def _flush(columns, parts):
+        """Append buffered ``columns`` to their temporary files ``parts``."""
+        for column, part in zip(columns, parts):
+            part.write(column.tobytes() if hasattr(column, 'tobytes')
+                       else column.tostring())
+            del column[:]
+
+    @staticmethod
+    def _write(path, key, stat, paths, verbs, parts):
+        """Write the header and the columns from ``parts`` to ``path``."""
+        offsets = {}
+        offset = 0
+        for (name, _), part in zip(COLUMNS, parts):
+            size = part.tell()
+            offsets[name] = (offset, size)
+            offset = _align(offset + size)
+        header = json.dumps({
+            'version': CACHE_VERSION,
+            'key': key,
+            'byteorder': sys.byteorder,
+            'stat': stat,
+            'paths': sorted(paths, key=paths.get),
+            'verbs': sorted(verbs, key=verbs.get),
+            'columns': offsets,
+        }).encode('utf-8')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as fp:
+            try:
+                fp.write(MAGIC)
+                fp.write(HEADER_LENGTH.pack(len(header)))
+                fp.write(header)
+                start = _align(fp.tell())
+                for (name, _), part in zip(COLUMNS, parts):
+                    fp.write(b'\0' * (start + offsets[name][0] - fp.tell()))
+                    part.seek(0)
+                    shutil.copyfileobj(part, fp)
+            except Exception:
+                fp.close()
+                os.remove(fp.name)
+                raise
+        getattr(os, 'replace', os.rename)(fp.name, path)
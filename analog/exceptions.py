@@ -21,3 +21,53 @@ class InvalidFormatExpressionError(AnalogError):
 class UnknownRendererError(AnalogError):
 
     """Error raised for unknown output format names (to select renderer)."""
+
+
+class UnknownStatsBackendError(AnalogError):
+
+    """Error raised for unknown statistics backend names."""
+
+
+class UnknownBucketError(AnalogError):
+
+    """Error raised for unknown time bucket size names."""
+
+
+class InvalidPathTemplateError(AnalogError):
+
+    """Error raised for invalid path template patterns."""
+
+
+class InvalidCacheError(AnalogError):
+
+    """Error raised if a logfile cannot be cached."""
+
+
+class InvalidFollowError(AnalogError):
+
+    """Error raised if a logfile cannot be followed."""
+
+
+class InvalidStateError(AnalogError):
+
+    """Error raised if incremental analysis with a state file is impossible."""
+
+
+class InvalidIndexError(AnalogError):
+
+    """Error raised if a logfile cannot be indexed."""
+
+
+class InvalidTimeWindowError(AnalogError):
+
+    """Error raised for invalid or conflicting time windows of log entries."""
+
+
+class UnsupportedCompressionError(AnalogError):
+
+    """Error raised for compressed logfiles that cannot be decompressed."""
+
+
+class CorruptCompressionError(AnalogError):
+
+    """Error raised for truncated or corrupt compressed logfiles."""
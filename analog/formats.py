@@ -2,12 +2,89 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 from collections import namedtuple
+import datetime
+from operator import itemgetter
 import re
 import weakref
 
 from analog.exceptions import InvalidFormatExpressionError
 
 
+#: Month abbreviations (``%b``) mapped to month numbers.
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+#: Named group openings in format patterns, ignoring escaped parentheses.
+NAMED_GROUP = re.compile(r'(?<!\\)\(\?P<(?P<name>\w+)>')
+#: Timestamp layout of nginx ``$time_local`` without timezone offset.
+NGINX_TIME_LAYOUT = '%d/%b/%Y:%H:%M:%S'
+#: Numeric log entry fields, converted from bytes without decoding.
+NUMERIC_FIELDS = frozenset(('status', 'body_bytes_sent', 'request_time',
+                            'upstream_response_time'))
+
+
+def time_parser(time_format):
+    """Create function converting timestamp strings to datetime objects.
+
+    Timestamps in the nginx ``$time_local`` layout (``%d/%b/%Y:%H:%M:%S``,
+    followed by ``%z`` or a fixed timezone like ``+0000``) are parsed by
+    slicing their fixed positions. All other time formats and timestamps not
+    matching the layout are parsed with ``strptime``.
+
+    :param time_format: timestamp format (strftime compatible).
+    :type time_format: ``str``
+    :returns: function converting a timestamp string to a datetime object.
+    :rtype: ``function``
+
+    """
+    def strptime(time_str):
+        return datetime.datetime.strptime(time_str, time_format)
+
+    if not time_format or not time_format.startswith(NGINX_TIME_LAYOUT):
+        return strptime
+    suffix = time_format[len(NGINX_TIME_LAYOUT):]
+    if suffix == ' %z':
+        if not hasattr(datetime, 'timezone'):  # Python 2.7
+            return strptime
+    elif '%' in suffix:
+        return strptime
+
+    # timezones by offset string for %z
+    timezones = {}
+
+    def parse_nginx_time(time_str):
+        if (time_str[2:3] != '/' or time_str[6:7] != '/' or
+                time_str[11:12] != ':' or time_str[14:15] != ':' or
+                time_str[17:18] != ':'):
+            return strptime(time_str)
+        tzinfo = None
+        offset = time_str[20:]
+        if suffix == ' %z':
+            tzinfo = timezones.get(offset)
+            if tzinfo is None:
+                if (len(offset) != 6 or offset[0] != ' ' or
+                        offset[1] not in '+-' or not offset[2:].isdigit()):
+                    return strptime(time_str)
+                delta = datetime.timedelta(hours=int(offset[2:4]),
+                                           minutes=int(offset[4:6]))
+                tzinfo = timezones[offset] = datetime.timezone(
+                    -delta if offset[1] == '-' else delta)
+        elif offset != suffix:
+            return strptime(time_str)
+        try:
+            timestamp = datetime.datetime(
+                int(time_str[7:11]), MONTHS[time_str[3:6]], int(time_str[0:2]),
+                int(time_str[12:14]), int(time_str[15:17]),
+                int(time_str[18:20]))
+        except (KeyError, ValueError):
+            return strptime(time_str)
+        if tzinfo is not None:
+            timestamp = timestamp.replace(tzinfo=tzinfo)
+        return timestamp
+
+    return parse_nginx_time
+
+
 class LogFormat:
 
     """Log format definition.
@@ -37,7 +114,8 @@ class LogFormat:
                             'body_bytes_sent', 'request_time',
                             'upstream_response_time')
 
-    def __init__(self, name, pattern, time_format):
+    def __init__(self, name, pattern, time_format, tokenizer=None,
+                 binary_tokenizer=None):
         """Describe log format.
 
         The format ``pattern`` is a (verbose) regex pattern string specifying
@@ -47,12 +125,24 @@ class LogFormat:
         All pattern group names are be available as attributes of log entries
         when using a :py:meth:`analog.formats.LogEntry.entry`.
 
+        Optionally, a ``tokenizer`` function can split well-formed log lines
+        faster than the regex pattern. It returns the values of all pattern
+        groups in pattern order, or ``None`` for lines it cannot handle, which
+        are then matched with the ``pattern`` instead. It must never return
+        different values than the ``pattern`` would match. The
+        ``binary_tokenizer`` does the same for undecoded (``bytes``) lines.
+
         :param name: log format name.
         :type name: ``str``
         :param pattern: regular expression pattern string.
         :type pattern: raw ``str``
         :param time_format: timestamp parsing pattern.
         :type time_format: ``str``
+        :param tokenizer: function splitting log lines into pattern groups.
+        :type tokenizer: ``function``
+        :param binary_tokenizer: function splitting ``bytes`` log lines into
+            pattern groups.
+        :type binary_tokenizer: ``function``
         :raises: :py:class:`analog.exceptions.InvalidFormatExpressionError` if
             missing required format pattern groups or the pattern is not a valid
             regular expression.
@@ -71,9 +161,13 @@ class LogFormat:
                     "Format pattern must at least define the groups: "
                     "{0}.".format(", ".join(self._required_attributes)))
         self.time_format = time_format
-        self._entry = namedtuple(
-            'LogEntry{0}'.format(name.title()),
+        self.parse_time = time_parser(time_format)
+        self.tokenizer = tokenizer
+        self.binary_tokenizer = binary_tokenizer
+        self._groups = tuple(
             sorted(self.pattern.groupindex, key=self.pattern.groupindex.get))
+        self._entry = namedtuple(
+            'LogEntry{0}'.format(name.title()), self._groups)
 
     def entry(self, match):
         """Convert regex match object to log entry object.
@@ -86,6 +180,101 @@ class LogFormat:
         """
         return self._entry(**match.groupdict())
 
+    def extractor(self, fields, encoding=None):
+        r"""Compile a function extracting only ``fields`` from log lines.
+
+        All named groups of ``pattern`` that are not in ``fields`` are turned
+        into non-capturing groups (unless used in backreferences). The
+        extracted fields are read from the match by group index. This saves
+        building a dictionary and log entry object per line as with
+        :py:meth:`analog.formats.LogFormat.entry`.
+
+        If the log format has a ``tokenizer``, it is tried first for every line.
+
+        With an ``encoding``, the function extracts fields from undecoded
+        (``bytes``) log lines, matching a ``bytes`` compiled ``pattern``. Only
+        the extracted text fields are decoded, replacing invalid characters.
+        Values of :py:data:`analog.formats.NUMERIC_FIELDS` are returned as
+        ``bytes``, which ``int`` and ``float`` convert just as well. Note that
+        character classes like ``\w`` only match ASCII characters in ``bytes``
+        patterns.
+
+        :param fields: names of pattern groups to extract.
+        :type fields: ``tuple`` of ``str``
+        :param encoding: encoding of ``bytes`` log lines. Log lines are
+            ``str`` if ``None``.
+        :type encoding: ``str``
+        :returns: function returning a tuple of the ``fields`` values of a log
+            line in the given order or ``None`` if the line does not match.
+        :rtype: ``function``
+
+        """
+        binary = encoding is not None
+        source = self.pattern.pattern
+
+        def strip_group(match):
+            name = match.group('name')
+            if name in fields or '(?P={0})'.format(name) in source:
+                return match.group(0)
+            return '(?:'
+
+        source = NAMED_GROUP.sub(strip_group, source)
+        if binary:
+            pattern = re.compile(source.encode('utf-8'),
+                                 self.pattern.flags & ~re.UNICODE)
+        else:
+            pattern = re.compile(source, self.pattern.flags)
+        search = pattern.search
+        indices = tuple(pattern.groupindex[field] for field in fields)
+
+        def extract(line):
+            match = search(line)
+            if match is None:
+                return None
+            return match.group(*indices)
+
+        def extract_one(line):
+            match = search(line)
+            if match is None:
+                return None
+            return (match.group(indices[0]),)
+
+        match_pattern = extract if len(indices) > 1 else extract_one
+        tokenize = self.binary_tokenizer if binary else self.tokenizer
+        if tokenize is None:
+            extract_values = match_pattern
+        else:
+            pick = itemgetter(*(self._groups.index(field) for field in fields))
+            if len(fields) == 1:
+                pick_one = pick
+
+                def pick(values):
+                    return (pick_one(values),)
+
+            def extract_values(line):
+                values = tokenize(line)
+                if values is None:
+                    return match_pattern(line)
+                return pick(values)
+
+        text_indices = tuple(index for index, field in enumerate(fields)
+                             if field not in NUMERIC_FIELDS)
+        if not binary or not text_indices:
+            return extract_values
+
+        def extract_decoded(line):
+            values = extract_values(line)
+            if values is None:
+                return None
+            values = list(values)
+            for index in text_indices:
+                value = values[index]
+                if value is not None:
+                    values[index] = value.decode(encoding, 'replace')
+            return tuple(values)
+
+        return extract_decoded
+
     @classmethod
     def all_formats(cls):
         """Mapping of all defined log format patterns.
@@ -102,6 +291,131 @@ class LogFormat:
         return formats
 
 
+#: HTTP verbs recognized by :py:func:`analog.formats.tokenize_nginx`.
+NGINX_VERBS = frozenset(('CONNECT', 'DELETE', 'GET', 'HEAD', 'OPTIONS',
+                         'PATCH', 'POST', 'PUT', 'TRACE'))
+#: HTTP protocols recognized by :py:func:`analog.formats.tokenize_nginx`.
+NGINX_PROTOCOLS = frozenset(('HTTP/1.0', 'HTTP/1.1', 'HTTP/2.0'))
+#: Characters of nginx time values.
+NGINX_TIME_CHARS = '0123456789.'
+
+
+def nginx_tokenizer(binary=False):
+    """Create function splitting nginx log lines at their delimiters.
+
+    :param binary: split undecoded ``bytes`` log lines instead of ``str``.
+    :type binary: ``bool``
+    :returns: tokenizer for :py:data:`analog.formats.NGINX` log lines.
+    :rtype: ``function``
+
+    """
+    if binary:
+        def literal(text):
+            return text.encode('ascii')
+
+        verbs = frozenset(literal(verb) for verb in NGINX_VERBS)
+        protocols = frozenset(literal(protocol)
+                              for protocol in NGINX_PROTOCOLS)
+        # like \d in bytes patterns, only accept ASCII digits
+        isdecimal = bytes.isdigit
+        whitespace = re.compile(br'\s').search
+    else:
+        def literal(text):
+            return text
+
+        verbs = NGINX_VERBS
+        protocols = NGINX_PROTOCOLS
+        isdecimal = type('').isdecimal
+        whitespace = re.compile(r'\s', re.UNICODE).search
+    newline, quote, space, dash, empty = (
+        literal('\n'), literal('"'), literal(' '), literal('-'), literal(''))
+    bracket, bracket_space, question_mark = (
+        literal('['), literal('] '), literal('?'))
+    time_chars = literal(NGINX_TIME_CHARS)
+
+    def tokenize_nginx(line):
+        """Split nginx ``combined_timed`` log lines at their delimiters.
+
+        Equivalent to matching the :py:data:`analog.formats.NGINX` pattern for
+        well-formed lines, but without a regex: the line is split at its
+        quotes, which leaves the request, referer, user agent and
+        forwarded-for header as separate parts. The remaining parts are split
+        at single spaces.
+
+        Lines with any unusual formatting, like other whitespace than single
+        spaces, unknown HTTP verbs or protocols or empty query strings, are not
+        tokenized.
+
+        :param line: log line.
+        :type line: ``str``
+        :returns: values of all ``NGINX`` pattern groups in pattern order, or
+            ``None`` if the line is not a well-formed log entry.
+        :rtype: ``tuple``
+
+        """
+        if line[-1:] == newline:
+            line = line[:-1]
+        parts = line.split(quote)
+        if (len(parts) != 9 or parts[4] != space or parts[6] != space or
+                newline in line):
+            return None
+        (head, request, numbers, referer, _, user_agent, _, forwarded,
+         tail) = parts
+
+        # remote address and user, [timestamp]
+        head = head.split(space, 3)
+        if (len(head) != 4 or head[1] != dash or head[3][:1] != bracket or
+                head[3][-2:] != bracket_space):
+            return None
+        remote_addr, _, remote_user, timestamp = head
+
+        # "verb path?query protocol"
+        verb, _, target = request.partition(space)
+        target, _, protocol = target.rpartition(space)
+        path, query, query_string = target.partition(question_mark)
+        if (verb not in verbs or protocol not in protocols or
+                not path or query and not query_string):
+            return None
+
+        # status and body size
+        if numbers[:1] != space or numbers[-1:] != space:
+            return None
+        status, _, body_bytes_sent = numbers[1:-1].partition(space)
+        if not isdecimal(status) or not isdecimal(body_bytes_sent):
+            return None
+
+        # "referer" "user agent" "forwarded for"
+        if not referer or not user_agent or not forwarded:
+            return None
+
+        # request and upstream response times, pipelined request
+        tail = tail.split(space)
+        if len(tail) == 3:
+            tail.append(None)
+        if len(tail) != 4 or tail[0] or tail[3] == empty:
+            return None
+        _, request_time, upstream_response_time, pipe = tail
+        if (not request_time or request_time.strip(time_chars) or
+                not upstream_response_time or
+                upstream_response_time.strip(time_chars)):
+            return None
+
+        if (not remote_addr or not remote_user or
+                whitespace(remote_addr + remote_user + (pipe or empty))):
+            return None
+        return (remote_addr, remote_user, timestamp[1:-2], verb, path, status,
+                body_bytes_sent, referer, user_agent, forwarded, request_time,
+                upstream_response_time, pipe)
+
+    return tokenize_nginx
+
+
+#: Tokenizer for :py:data:`analog.formats.NGINX` log lines.
+tokenize_nginx = nginx_tokenizer()
+#: Tokenizer for undecoded (``bytes``) :py:data:`analog.formats.NGINX` lines.
+tokenize_nginx_bytes = nginx_tokenizer(binary=True)
+
+
 NGINX = LogFormat('nginx', r'''
     ^(?P<remote_addr>\S+)\s-\s              # Remote address
     (?P<remote_user>\S+)\s                  # Remote user
@@ -120,7 +434,8 @@ NGINX = LogFormat('nginx', r'''
     (?P<request_time>[\d\.]+)\s             # Request time
     (?P<upstream_response_time>[\d\.]+)\s?  # Upstream response time
     (?P<pipe>\S+)?$                         # Pipelined request
-    ''', time_format='%d/%b/%Y:%H:%M:%S +0000')
+    ''', time_format='%d/%b/%Y:%H:%M:%S +0000', tokenizer=tokenize_nginx,
+                  binary_tokenizer=tokenize_nginx_bytes)
 """Nginx ``combinded_timed`` format::
 
     '$remote_addr - $remote_user [$time_local] "$request" '
@@ -0,0 +1,217 @@
+"""Analog sidecar index of log entry timestamps."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+from array import array
+from bisect import bisect_right
+import datetime
+import os
+import pickle
+import tempfile
+
+from analog import LOG
+from analog.readers import last_line_end, read_lines
+
+
+#: Version of the index file layout.
+INDEX_VERSION = 1
+#: Suffix of index files next to the logfile they index.
+INDEX_SUFFIX = '.index'
+#: Number of bytes before the indexed size compared to detect rewritten logs.
+TAIL_SIZE = 64
+#: Start of the minutes counted in the index.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def index_path(log_path):
+    """Path of the sidecar index file of logfile ``log_path``."""
+    return log_path + INDEX_SUFFIX
+
+
+def _minute(timestamp):
+    """Number of the minute of ``timestamp`` since the epoch."""
+    delta = timestamp.replace(tzinfo=None) - EPOCH
+    return delta.days * 1440 + delta.seconds // 60
+
+
+class TimeIndex(object):
+
+    """Sparse index of the byte offsets of log entries by minute.
+
+    Stores one checkpoint per minute: the byte offset of the first log entry
+    of that minute. Assuming log entries are ordered by time, the byte range
+    of log entries in a time window is found without reading the logfile.
+
+    Like :py:class:`analog.state.State`, the index records the logfile (by
+    device and inode) and the size up to which it was indexed. Updates only
+    index log entries added since and rebuild the index if the logfile was
+    replaced, truncated or rewritten.
+
+    An index is only valid for the log format it was created with, identified
+    by ``key``.
+
+    """
+
+    def __init__(self, key):
+        """Create empty index.
+
+        :param key: identifier of the log format.
+        :type key: ``str``
+
+        """
+        self.key = key
+        self.device = None
+        self.inode = None
+        self.size = 0
+        self.tail = b''
+        #: minutes since :py:data:`analog.index.EPOCH` of the checkpoints
+        self.minutes = array(str('q'))
+        #: byte offsets of the first log entry of each checkpoint minute
+        self.offsets = array(str('q'))
+
+    def __len__(self):
+        """Number of checkpoints."""
+        return len(self.minutes)
+
+    @classmethod
+    def load(cls, path, key):
+        """Load index from file ``path``.
+
+        If the file does not exist, cannot be read or was saved for another
+        log format, an empty index is returned.
+
+        :param path: path of the index file.
+        :type path: ``str``
+        :param key: identifier of the log format.
+        :type key: ``str``
+        :returns: loaded or empty index.
+        :rtype: :py:class:`analog.index.TimeIndex`
+
+        """
+        index = cls(key)
+        try:
+            with open(path, 'rb') as fp:
+                data = pickle.load(fp)
+        except (IOError, OSError):
+            return index
+        except Exception:
+            LOG.warning("Ignoring unreadable index file %s.", path)
+            return index
+        if (not isinstance(data, dict) or
+                data.get('version') != INDEX_VERSION or
+                data.get('key') != key):
+            return index
+        index.device = data['device']
+        index.inode = data['inode']
+        index.size = data['size']
+        index.tail = data['tail']
+        index.minutes = data['minutes']
+        index.offsets = data['offsets']
+        return index
+
+    def save(self, path):
+        """Save index to file ``path``, replacing it atomically.
+
+        :param path: path of the index file.
+        :type path: ``str``
+
+        """
+        data = {
+            'version': INDEX_VERSION,
+            'key': self.key,
+            'device': self.device,
+            'inode': self.inode,
+            'size': self.size,
+            'tail': self.tail,
+            'minutes': self.minutes,
+            'offsets': self.offsets,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as fp:
+            pickle.dump(data, fp, pickle.HIGHEST_PROTOCOL)
+        getattr(os, 'replace', os.rename)(fp.name, path)
+
+    def update(self, log, extract, parse_time):
+        """Index the complete lines added to ``log`` since the last update.
+
+        Starts over if ``log`` is another file than last time (e.g. after
+        logrotate moved it) or if it was truncated or rewritten since.
+
+        :param log: seekable binary handle on logfile.
+        :param extract: function extracting the timestamp field from
+            ``bytes`` log lines.
+        :type extract: ``function``
+        :param parse_time: function converting timestamp strings to
+            datetimes.
+        :type parse_time: ``function``
+        :returns: ``True`` if the index changed.
+        :rtype: ``bool``
+
+        """
+        info = os.fstat(log.fileno())
+        if ((info.st_dev, info.st_ino) != (self.device, self.inode) or
+                info.st_size < self.size or
+                _read_at(log, self.size - len(self.tail),
+                         len(self.tail)) != self.tail):
+            self.device, self.inode = info.st_dev, info.st_ino
+            self.size = 0
+            self.tail = b''
+            self.minutes = array(str('q'))
+            self.offsets = array(str('q'))
+        end = last_line_end(log, self.size, info.st_size)
+        if end == self.size:
+            return False
+
+        minutes, offsets = self.minutes, self.offsets
+        last = minutes[-1] if minutes else None
+        last_time_str = None
+        offset = self.size
+        for line, size in read_lines(log, self.size, end, sizes=True):
+            values = extract(line)
+            # consecutive log entries often share the same timestamp
+            if values is not None and values[0] != last_time_str:
+                last_time_str = values[0]
+                minute = _minute(parse_time(last_time_str))
+                if last is None or minute > last:
+                    minutes.append(minute)
+                    offsets.append(offset)
+                    last = minute
+            offset += size
+
+        start = max(end - TAIL_SIZE, 0)
+        self.tail = _read_at(log, start, end - start)
+        self.size = end
+        return True
+
+    def start(self, since):
+        """Byte offset to start reading log entries from ``since`` at.
+
+        :param since: start of the time window.
+        :type since: :py:class:`datetime.datetime`
+        :returns: offset of the first log entry of the last indexed minute not
+            after ``since``.
+        :rtype: ``int``
+
+        """
+        position = bisect_right(self.minutes, _minute(since)) - 1
+        return self.offsets[position] if position >= 0 else 0
+
+    def end(self, until):
+        """Byte offset to stop reading log entries until ``until`` at.
+
+        :param until: end of the time window.
+        :type until: :py:class:`datetime.datetime`
+        :returns: offset of the first log entry of the first indexed minute
+            after ``until`` or ``None`` if there is none.
+        :rtype: ``int``
+
+        """
+        position = bisect_right(self.minutes, _minute(until))
+        if position < len(self.offsets):
+            return self.offsets[position]
+        return None
+
+
+def _read_at(log, offset, size):
+    """Read ``size`` bytes of binary ``log`` at byte ``offset``."""
+    log.seek(offset)
+    return log.read(size)
@@ -7,7 +7,10 @@ import textwrap
 
 import analog
 from analog.analyzer import DEFAULT_VERBS, DEFAULT_STATUS_CODES, DEFAULT_PATHS
-from analog.utils import AnalogArgumentParser
+from analog.report import BUCKET_SIZES, STATS_BACKENDS
+from analog.timing import TIMING_FORMATS
+from analog.utils import (AnalogArgumentParser, VersionAction,
+                          parse_percentiles, parse_timestamp)
 
 
 def main(argv=None):
@@ -44,9 +47,7 @@ def main(argv=None):
     output_choices = sorted(analog.Renderer.all_renderers().keys())
 
     # --version
-    parser.add_argument('--version',
-                        action='version',
-                        version="analog {v}".format(v=analog.__version__))
+    parser.add_argument('--version', action=VersionAction)
 
     # common arguments
     common = argparse.ArgumentParser(add_help=False)
@@ -64,6 +65,20 @@ def main(argv=None):
                         dest='paths',
                         default=DEFAULT_PATHS,
                         help="paths to monitor (repeat for multiple)")
+    # --path-template
+    common.add_argument('--path-template',
+                        action='append',
+                        dest='path_templates',
+                        default=None,
+                        metavar='REGEX',
+                        help="regex normalizing matching paths, named groups "
+                             "are replaced by {name} (repeat for multiple)")
+    # --normalize-ids
+    common.add_argument('--normalize-ids',
+                        action='store_true',
+                        dest='normalize_ids',
+                        help="replace numeric, UUID and hex path segments "
+                             "by {id}")
     # -v / --verb
     common.add_argument('-v', '--verb',
                         action='append',
@@ -90,14 +105,112 @@ def main(argv=None):
     # -t / --timing
     common.add_argument('-t', '--timing',
                         action='store_true',
-                        help="print timing")
+                        help="print time spent per analysis stage to stderr")
+    # --timing-format
+    common.add_argument('--timing-format',
+                        action='store',
+                        choices=TIMING_FORMATS,
+                        default='text',
+                        help="timing output format")
+    # -j / --jobs
+    common.add_argument('-j', '--jobs',
+                        action='store',
+                        type=int,
+                        default=1,
+                        help="analyze logfile in n parallel processes")
+    # -sb / --stats-backend
+    common.add_argument('-sb', '--stats-backend',
+                        action='store',
+                        dest='stats_backend',
+                        default='exact',
+                        choices=sorted(STATS_BACKENDS),
+                        help="exact statistics or bounded memory estimates")
+    # -b / --bucket
+    common.add_argument('-b', '--bucket',
+                        action='store',
+                        default=None,
+                        choices=list(BUCKET_SIZES),
+                        help="count log entries per time bucket, "
+                             "render with --output-format series")
+    # --top-paths
+    common.add_argument('--top-paths',
+                        action='store',
+                        dest='top_paths',
+                        type=int,
+                        default=None,
+                        metavar='K',
+                        help="only keep per path statistics for the K most "
+                             "frequent paths, in bounded memory")
+    # --percentiles
+    common.add_argument('--percentiles',
+                        action='store',
+                        type=parse_percentiles,
+                        default=(),
+                        metavar='P,...',
+                        help="also report these percentiles of times and "
+                             "body sizes, e.g. 90,95,99")
+    # -f / --follow
+    common.add_argument('-f', '--follow',
+                        action='store_true',
+                        help="follow the logfile and report the last window "
+                             "every interval")
+    # --interval
+    common.add_argument('--interval',
+                        action='store',
+                        type=float,
+                        default=10,
+                        help="seconds between reports when following")
+    # --window
+    common.add_argument('--window',
+                        action='store',
+                        type=float,
+                        default=300,
+                        help="seconds of log entries per report when "
+                             "following")
+    # --since
+    common.add_argument('--since',
+                        action='store',
+                        type=parse_timestamp,
+                        default=None,
+                        metavar='TIMESTAMP',
+                        help="analyze log entries from "
+                             "YYYY-MM-DD[THH:MM[:SS]]")
+    # --until
+    common.add_argument('--until',
+                        action='store',
+                        type=parse_timestamp,
+                        default=None,
+                        metavar='TIMESTAMP',
+                        help="analyze log entries up to "
+                             "YYYY-MM-DD[THH:MM[:SS]]")
+    # --index
+    common.add_argument('--index',
+                        action='store',
+                        default=None,
+                        help="time index to seek to --since/--until with, "
+                             "defaults to LOGFILE.index if it exists")
+    # --cache
+    common.add_argument('--cache',
+                        action='store_true',
+                        help="analyze log entries parsed into LOGFILE.cache "
+                             "by an earlier run, parse and cache them if "
+                             "the logfile changed")
+    # --state
+    common.add_argument('--state',
+                        action='store',
+                        default=None,
+                        help="state file to only analyze log entries added "
+                             "since the last run; grows with the analyzed "
+                             "log entries unless using --stats-backend "
+                             "ddsketch and --top-paths")
     # logfile, defaults to stdin
     common.add_argument('log',
                         action='store',
                         nargs='?',
-                        type=argparse.FileType('r'),
+                        type=argparse.FileType('rb'),
                         default='-',
-                        help="logfile to analyze."
+                        help="logfile to analyze, may be compressed with "
+                             "gzip, bzip2, xz or zstd. "
                              "Defaults to stdin for piping.")
 
     # subcommands for predefined log formats
@@ -126,11 +239,61 @@ def main(argv=None):
                                required=True,
                                help='timestamp format (strftime compatible)')
 
+    # subcommand to index logfile timestamps
+    index_parser = format_parsers.add_parser(
+        'index', help="create or update the time index of a logfile for "
+                      "--since and --until")
+    # -lf / --log-format
+    index_parser.add_argument('-lf', '--log-format',
+                              action='store',
+                              dest='log_format',
+                              default='nginx',
+                              choices=sorted(format_choices) + ['custom'],
+                              help="log format")
+    # -pr / --pattern-regex
+    index_parser.add_argument('-pr', '--pattern-regex',
+                              action='store',
+                              dest='pattern',
+                              default=None,
+                              help='regex format pattern with named groups, '
+                                   'for the custom log format.')
+    # -tf / --time-format
+    index_parser.add_argument('-tf', '--time-format',
+                              action='store',
+                              dest='time_format',
+                              default=None,
+                              help='timestamp format (strftime compatible), '
+                                   'for the custom log format.')
+    # --index
+    index_parser.add_argument('--index',
+                              action='store',
+                              default=None,
+                              help="index file, defaults to LOGFILE.index")
+    # logfile
+    index_parser.add_argument('log',
+                              action='store',
+                              type=argparse.FileType('rb'),
+                              help="logfile to index")
+
     try:
         if argv is None:  # pragma: no cover
             argv = sys.argv
         args = parser.parse_args(argv[1:])
 
+        if args.format == 'index':
+            if (args.log_format == 'custom' and
+                    not (args.pattern and args.time_format)):
+                parser.error("--log-format custom requires --pattern-regex "
+                             "and --time-format.")
+            index = analog.build_index(log=args.log,
+                                       format=args.log_format,
+                                       pattern=args.pattern,
+                                       time_format=args.time_format,
+                                       index=args.index)
+            print("{0:,} bytes indexed, {1:,} minute checkpoints.".format(
+                index.size, len(index)))
+            parser.exit(0)
+
         format_kwargs = {'format': args.format}
         if args.format == 'custom':
             format_kwargs.update({
@@ -138,16 +301,55 @@ def main(argv=None):
                 'time_format': args.time_format,
             })
 
-        # analyze logfile and generate report
-        analog.analyze(log=args.log,
-                       paths=args.paths,
-                       verbs=args.verbs,
-                       status_codes=args.status_codes,
-                       max_age=args.max_age,
-                       path_stats=args.path_stats,
-                       timing=args.timing,
-                       output_format=args.output_format,
-                       **format_kwargs)
+        if args.top_paths is not None and args.top_paths < 1:
+            parser.error("--top-paths must be positive.")
+
+        if args.follow:
+            if (args.max_age is not None or args.state is not None or
+                    args.since is not None or args.until is not None or
+                    args.cache or args.jobs != 1):
+                parser.error("--follow cannot be combined with --max-age, "
+                             "--since, --until, --state, --cache or --jobs.")
+            # continuously report the last window of log entries
+            analog.follow(log=args.log,
+                          paths=args.paths,
+                          verbs=args.verbs,
+                          status_codes=args.status_codes,
+                          path_stats=args.path_stats,
+                          output_format=args.output_format,
+                          stats_backend=args.stats_backend,
+                          interval=args.interval,
+                          window=args.window,
+                          bucket=args.bucket,
+                          top_paths=args.top_paths,
+                          path_templates=args.path_templates,
+                          normalize_ids=args.normalize_ids,
+                          percentiles=args.percentiles,
+                          **format_kwargs)
+        else:
+            # analyze logfile and generate report
+            analog.analyze(log=args.log,
+                           paths=args.paths,
+                           verbs=args.verbs,
+                           status_codes=args.status_codes,
+                           max_age=args.max_age,
+                           path_stats=args.path_stats,
+                           timing=args.timing,
+                           timing_format=args.timing_format,
+                           output_format=args.output_format,
+                           jobs=args.jobs,
+                           stats_backend=args.stats_backend,
+                           state=args.state,
+                           bucket=args.bucket,
+                           top_paths=args.top_paths,
+                           path_templates=args.path_templates,
+                           normalize_ids=args.normalize_ids,
+                           since=args.since,
+                           until=args.until,
+                           index=args.index,
+                           cache=args.cache,
+                           percentiles=args.percentiles,
+                           **format_kwargs)
 
         parser.exit(0)
 
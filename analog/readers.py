@@ -0,0 +1,410 @@
+"""Analog logfile readers."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import bz2
+from functools import partial
+import io
+import mmap
+import os
+import stat
+import threading
+import zlib
+try:
+    import queue
+except ImportError:  # Python 2.7
+    import Queue as queue
+try:
+    import lzma
+except ImportError:  # Python 2.7
+    lzma = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from analog.exceptions import (CorruptCompressionError,
+                               UnsupportedCompressionError)
+
+
+#: Size of blocks read from logfiles in bytes.
+BLOCK_SIZE = 1024 * 1024
+#: Number of decompressed blocks buffered ahead of the analysis.
+READ_AHEAD_BLOCKS = 4
+#: Magic numbers at the start of compressed logfiles by compression name.
+MAGIC_NUMBERS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+#: Errors raised by decompressors for corrupt compressed streams.
+DECOMPRESSION_ERRORS = tuple(
+    error for error in (zlib.error, IOError, getattr(lzma, 'LZMAError', None),
+                        getattr(zstandard, 'ZstdError', None))
+    if error is not None)
+#: Encoding of logfiles opened in binary mode.
+DEFAULT_ENCODING = 'utf-8'
+#: Characters log formats are made of, encoded the same in ASCII compatible
+#: encodings.
+ASCII_PROBE = ('\t\n\r !"#$%&\'()*+,-./0123456789:;<=>?@[\\]^_`{|}~'
+               'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+
+
+def ascii_compatible(encoding):
+    """Check if ``encoding`` encodes ASCII characters as single ASCII bytes.
+
+    Lines of logfiles in such an encoding can be split and matched as ``bytes``
+    and only the extracted fields have to be decoded.
+
+    :param encoding: name of the encoding.
+    :type encoding: ``str``
+    :rtype: ``bool``
+
+    """
+    try:
+        return (ASCII_PROBE.encode(encoding) ==
+                ASCII_PROBE.encode('ascii'))
+    except (LookupError, TypeError, UnicodeError):
+        return False
+
+
+def binary_stream(log):
+    """Find the binary stream of logfile ``log`` to read undecoded lines from.
+
+    Binary files are read as they are. Text files in an ASCII compatible
+    encoding are read from their underlying binary buffer.
+
+    :param log: handle on logfile or iterable of log lines.
+    :returns: tuple of the binary stream and the encoding of its lines or
+        ``None`` if ``log`` is only available as text, like lists of lines or
+        :py:class:`io.StringIO` objects.
+    :rtype: ``tuple``
+
+    """
+    if isinstance(log, io.TextIOBase):
+        buffer = getattr(log, 'buffer', None)
+        if buffer is None or not ascii_compatible(log.encoding):
+            return None
+        return buffer, log.encoding
+    mode = getattr(log, 'mode', None)
+    if (isinstance(log, (io.RawIOBase, io.BufferedIOBase)) or
+            isinstance(mode, str) and 'b' in mode):
+        return log, DEFAULT_ENCODING
+    return None
+
+
+def _peek(log, size):
+    """Read the first ``size`` bytes at the current position of ``log``.
+
+    The position of ``log`` is not changed.
+
+    :returns: up to ``size`` bytes, less if they cannot be read ahead.
+    :rtype: ``bytes``
+
+    """
+    try:
+        if hasattr(log, 'peek'):
+            return log.peek(size)[:size]
+        if log.seekable():
+            position = log.tell()
+            head = log.read(size)
+            log.seek(position)
+            return head
+    except (AttributeError, EnvironmentError, ValueError):
+        pass
+    return b''
+
+
+def compression(log):
+    """Detect the compression of binary logfile ``log`` by its magic number.
+
+    :param log: binary handle on logfile.
+    :returns: compression name of :py:data:`analog.readers.MAGIC_NUMBERS` or
+        ``None`` for uncompressed logfiles.
+    :rtype: ``str``
+
+    """
+    head = _peek(log, max(len(magic) for magic, _ in MAGIC_NUMBERS))
+    for magic, name in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def decompressor(name):
+    """Find the incremental decompressor for compression ``name``.
+
+    :param name: compression name as detected by
+        :py:func:`analog.readers.compression`.
+    :type name: ``str``
+    :returns: function creating decompressor objects for one compressed stream.
+    :raises: :py:class:`analog.exceptions.UnsupportedCompressionError` if the
+        module required for decompression is not available.
+
+    """
+    if name == 'gzip':
+        return partial(zlib.decompressobj, 16 + zlib.MAX_WBITS)
+    if name == 'bz2':
+        return bz2.BZ2Decompressor
+    if name == 'xz' and lzma is not None:
+        return lzma.LZMADecompressor
+    if name == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj
+    raise UnsupportedCompressionError(
+        "Cannot decompress {0} compressed logfile. Install the {1} module."
+        "".format(name, {'xz': 'lzma', 'zstd': 'zstandard'}.get(name, name)))
+
+
+def _decompress_blocks(log, new_decompressor, block_size):
+    """Decompress blocks of ``block_size`` bytes read from binary ``log``.
+
+    Concatenated compressed streams, like appended gzip members, are all
+    decompressed.
+
+    :raises: :py:class:`analog.exceptions.CorruptCompressionError` if ``log``
+        is corrupt or ends within a compressed stream.
+
+    """
+    decompressor = new_decompressor()
+    pending = False
+    while True:
+        data = log.read(block_size)
+        if not data:
+            break
+        while data:
+            pending = True
+            try:
+                block = decompressor.decompress(data)
+            except DECOMPRESSION_ERRORS as exc:
+                raise CorruptCompressionError(
+                    "Cannot decompress corrupt logfile: {0}".format(exc))
+            if block:
+                yield block
+            data = b''
+            if decompressor.eof:
+                data = decompressor.unused_data
+                decompressor = new_decompressor()
+                pending = False
+    if pending:
+        raise CorruptCompressionError(
+            "Compressed logfile ended before the end of stream.")
+
+
+def _read_ahead(blocks, size=READ_AHEAD_BLOCKS):
+    """Iterate ``blocks`` in a background thread.
+
+    Reading and decompressing release the GIL, so decompressing the next blocks
+    overlaps with analyzing the current one. At most ``size`` blocks are
+    buffered.
+
+    :param blocks: iterable of blocks.
+    :returns: generator of blocks.
+    :rtype: ``generator`` of ``bytes``
+
+    """
+    buffered = queue.Queue(size)
+    stop = threading.Event()
+
+    def reader():
+        try:
+            for block in blocks:
+                buffered.put(block)
+                if stop.is_set():
+                    return
+            buffered.put(b'')
+        except Exception as exc:
+            buffered.put(exc)
+
+    thread = threading.Thread(target=reader, name='analog-reader')
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            block = buffered.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                break
+            yield block
+    finally:
+        # release the reader blocked on a full queue
+        stop.set()
+        while thread.is_alive():
+            try:
+                buffered.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+def _map(log):
+    """Memory-map the regular file ``log`` is a handle on.
+
+    :returns: read-only memory map of the file or ``None`` if ``log`` is no
+        regular file, is empty or cannot be mapped.
+    :rtype: :py:class:`mmap.mmap`
+
+    """
+    try:
+        fileno = log.fileno()
+        info = os.fstat(fileno)
+        if not stat.S_ISREG(info.st_mode) or not info.st_size:
+            return None
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, OverflowError, ValueError):
+        return None
+
+
+def split_lines(data, sizes=False):
+    """Split ``data`` into lines at ``\\n`` and ``\\r\\n`` line endings.
+
+    Like universal newlines mode of text files, a carriage return before the
+    newline is dropped. Only data containing carriage returns is stripped line
+    by line.
+
+    :param data: block of a binary logfile.
+    :type data: ``bytes``
+    :param sizes: return tuples of each line and its size in ``data``
+        including the line ending.
+    :type sizes: ``bool``
+    :returns: lines without line endings. The last item is the rest of
+        ``data`` after the last newline, which is not stripped.
+    :rtype: ``list`` of ``bytes`` or ``tuple``
+
+    """
+    lines = data.split(b'\n')
+    if sizes:
+        rest = lines.pop()
+        lines = [(line[:-1] if line.endswith(b'\r') else line, len(line) + 1)
+                 for line in lines]
+        lines.append(rest)
+    elif b'\r' in data:
+        rest = lines.pop()
+        lines = [line[:-1] if line.endswith(b'\r') else line
+                 for line in lines]
+        lines.append(rest)
+    return lines
+
+
+def _map_blocks(data, start, end, block_size):
+    """Slice memory-mapped file ``data`` into blocks ending at line ends."""
+    try:
+        size = len(data)
+        position = start
+        end = size if end is None else min(end, size)
+        while position < end:
+            stop = min(position + block_size, end)
+            if stop < end:
+                # end blocks at the last line end
+                newline = data.rfind(b'\n', position, stop)
+                if newline < 0:
+                    newline = data.find(b'\n', stop, end)
+                stop = end if newline < 0 else newline + 1
+            yield data[position:stop]
+            position = stop
+    finally:
+        data.close()
+
+
+def _read_blocks(log, start, end, block_size):
+    """Read blocks from binary stream ``log``."""
+    if start is not None:
+        log.seek(start)
+    position = start or 0
+    while True:
+        size = block_size if end is None else min(block_size, end - position)
+        if size <= 0:
+            break
+        block = log.read(size)
+        if not block:
+            break
+        position += len(block)
+        yield block
+
+
+def _split_blocks(blocks, sizes=False):
+    """Split ``blocks`` of a binary stream into lines.
+
+    Lines continued in the next block are only stripped once finished.
+
+    """
+    pending = b''
+    for block in blocks:
+        lines = split_lines(pending + block, sizes)
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        # the last line of a stream may end without newline
+        line = pending[:-1] if pending.endswith(b'\r') else pending
+        yield (line, len(pending)) if sizes else line
+
+
+def last_line_end(log, start, end):
+    """Find the end of the last complete line of ``log`` before byte ``end``.
+
+    :param log: seekable binary handle on logfile.
+    :param start: byte offset to search back to.
+    :type start: ``int``
+    :param end: byte offset to search back from.
+    :type end: ``int``
+    :returns: byte offset after the last line end between ``start`` and
+        ``end`` or ``start`` if there is none.
+    :rtype: ``int``
+
+    """
+    position = end
+    while position > start:
+        size = min(BLOCK_SIZE, position - start)
+        log.seek(position - size)
+        newline = log.read(size).rfind(b'\n')
+        if newline >= 0:
+            return position - size + newline + 1
+        position -= size
+    return start
+
+
+def read_lines(log, start=None, end=None, block_size=BLOCK_SIZE,
+               sizes=False):
+    """Read undecoded lines from binary logfile handle ``log``.
+
+    Regular files are memory-mapped, all other streams like ``stdin`` or pipes
+    are read in blocks of ``block_size`` bytes. Each block is split into lines
+    at once, which is a lot faster than reading and decoding line by line.
+
+    Compressed logfiles (see :py:data:`analog.readers.MAGIC_NUMBERS`) are
+    read in blocks of ``block_size`` compressed bytes and decompressed in a
+    background thread, handing blocks over through a bounded queue. They are
+    always read from the current position to the end.
+
+    :param log: binary handle on logfile.
+    :param start: byte offset to start reading at. Defaults to the current
+        position of ``log``. Ignored for compressed logfiles.
+    :type start: ``int``
+    :param end: byte offset to stop reading at. Should be at a line end.
+        Ignored for compressed logfiles.
+    :type end: ``int``
+    :param block_size: size of blocks to split into lines in bytes.
+    :type block_size: ``int``
+    :param sizes: generate tuples of each line and the number of bytes read
+        for it, including the line ending. Sizes of compressed logfiles are
+        the decompressed sizes.
+    :type sizes: ``bool``
+    :returns: generator of log lines without line endings.
+    :rtype: ``generator`` of ``bytes`` or ``tuple``
+    :raises: :py:class:`analog.exceptions.UnsupportedCompressionError` if the
+        module required to decompress ``log`` is not available,
+        :py:class:`analog.exceptions.CorruptCompressionError` while reading
+        lines of a truncated or corrupt compressed logfile.
+
+    """
+    name = compression(log)
+    if name is not None:
+        blocks = _decompress_blocks(log, decompressor(name), block_size)
+        return _split_blocks(_read_ahead(blocks), sizes)
+    data = _map(log)
+    if data is None:
+        return _split_blocks(_read_blocks(log, start, end, block_size), sizes)
+    if start is None:
+        start = log.tell()
+    return _split_blocks(_map_blocks(data, start, end, block_size), sizes)
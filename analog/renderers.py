@@ -2,15 +2,12 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import abc
-import csv
 try:
     from cStringIO import StringIO
 except ImportError:
     from io import StringIO
 import textwrap
 
-from tabulate import tabulate
-
 from analog.exceptions import UnknownRendererError
 from analog.utils import PrefixMatchingCounter
 
@@ -34,6 +31,17 @@ def find_subclasses(cls, _seen=None):
                 yield subclass
 
 
+def percentile_name(percent):
+    """Name percentile ``percent`` for report output, e.g. ``p99.9``.
+
+    :param percent: percentile between 0 and 100.
+    :type percent: ``float``
+    :rtype: ``str``
+
+    """
+    return 'p{0:g}'.format(percent)
+
+
 def add_metaclass(metaclass):
     """From six: Class decorator for creating a class with a metaclass."""
     def wrapper(cls):
@@ -64,6 +72,23 @@ class Renderer(object):
 
         """
 
+    def render_to(self, report, stream, path_stats=False):
+        """Write report statistics to ``stream``, followed by a newline.
+
+        Renderers that can produce their output piece by piece write it to
+        ``stream`` as it is generated instead of building the output string
+        first. By default, the output of :py:meth:`render` is written at once.
+
+        :param report: log analysis report object.
+        :type report: :py:class:`analog.report.Report`
+        :param stream: text stream to write to, e.g. ``sys.stdout``.
+        :param path_stats: include per path statistics in output.
+        :type path_stats: ``bool``
+
+        """
+        stream.write(self.render(report, path_stats=path_stats))
+        stream.write("\n")
+
     @classmethod
     def all_renderers(cls):
         """Get a mapping of all defined report renderer names.
@@ -107,7 +132,40 @@ class PlainTextRenderer(Renderer):
         :rtype: `str`
 
         """
-        output = textwrap.dedent("""\
+        stream = StringIO()
+        self.render_to(report, stream, path_stats=path_stats)
+        return stream.getvalue()[:-1]  # Do not return last newline
+
+    def render_to(self, report, stream, path_stats=False):
+        """Write overall and per path summary reports to ``stream``.
+
+        Per path summaries are written one path at a time.
+
+        :param report: log analysis report object.
+        :type report: :py:class:`analog.report.Report`
+        :param stream: text stream to write to.
+        :param path_stats: include per path statistics in output.
+        :type path_stats: ``bool``
+
+        """
+        stream.write(self._render_summary(report))
+        if path_stats:
+            stream.write("\n")
+            for index, path_output in enumerate(self._iter_path_stats(report)):
+                if index:
+                    stream.write("\n")
+                stream.write(path_output)
+        stream.write("\n")
+
+    def _render_summary(self, report):
+        """
+        Render overall analysis summary report.
+
+        :returns: output string
+        :rtype: `str`
+
+        """
+        return textwrap.dedent("""\
             Requests: {self.requests}
 
             HTTP Verbs:
@@ -138,11 +196,6 @@ class PlainTextRenderer(Renderer):
             body_bytes=self._indent(
                 self._render_list_stats(report.body_bytes)))
 
-        if path_stats:
-            output += "\n" + self._render_path_stats(report)
-
-        return output
-
     def _render_path_stats(self, report):
         """
         Render per path analysis summary report.
@@ -151,7 +204,16 @@ class PlainTextRenderer(Renderer):
         :rtype: `str`
 
         """
-        output = []
+        return "\n".join(self._iter_path_stats(report))
+
+    def _iter_path_stats(self, report):
+        """
+        Render analysis summary reports path by path.
+
+        :returns: output string per path.
+        :rtype: ``generator`` of `str`
+
+        """
         for path, verbs, status, times, upstream_times, body_bytes in zip(
                 report.path_verbs.keys(),
                 report.path_verbs.values(),
@@ -160,7 +222,7 @@ class PlainTextRenderer(Renderer):
                 report.path_upstream_times.values(),
                 report.path_body_bytes.values()):
 
-            output.append(textwrap.dedent("""\
+            yield textwrap.dedent("""\
                 {path}
 
                     HTTP Verbs:
@@ -185,9 +247,7 @@ class PlainTextRenderer(Renderer):
                 upstream_times=self._indent(
                     self._render_list_stats(upstream_times), 8),
                 body_bytes=self._indent(
-                    self._render_list_stats(body_bytes), 8)))
-
-        return "\n".join(output)
+                    self._render_list_stats(body_bytes), 8))
 
     def _render_list_stats(self, list_stats):
         """
@@ -198,21 +258,43 @@ class PlainTextRenderer(Renderer):
         :rtype: ``str``
 
         """
-        return textwrap.dedent("""\
+        output = textwrap.dedent("""\
             {stats.mean:>10.3f}   mean
             {stats.median:>10.3f}   median
             """).format(stats=list_stats)
+        for percent, value in list_stats.percentiles.items():
+            output += "{value:>10.3f}   {name}\n".format(
+                value=value, name=percentile_name(percent))
+        return output
 
     def _str_path_counts(self, path_counts):
         """
         Render path count.
 
+        Approximate counts of top paths are followed by their error bound.
+
         :returns: output string
         :rtype: `str`
 
         """
-        return "\n".join("{count:>10,}   {key}".format(
-            key=key, count=count) for key, count in path_counts)
+        return "\n".join("{count:>10,}   {key}{error}".format(
+            key=key, count=count, error=self._str_count_error(count))
+            for key, count in path_counts)
+
+    def _str_count_error(self, count):
+        """
+        Render the maximum overestimation of an approximate count.
+
+        :param count: count, possibly an
+            :py:class:`analog.sketches.ApproximateCount`.
+        :returns: output string, empty for exact counts.
+        :rtype: `str`
+
+        """
+        error = getattr(count, 'error', 0)
+        if not error:
+            return ""
+        return " (\u00b1{error:,})".format(error=error)
 
     def _indent(self, text, indent=4):
         """
@@ -248,13 +330,18 @@ class TabularDataRenderer(Renderer):
     def _list_stats(self, list_stats):
         """Get list of (key,value) tuples for each attribute of ``list_stats``.
 
+        Percentiles follow the attributes, named like ``p90``.
+
         :param list_stats: list statistics object.
         :type list_stats: :py:class:`analog.report.ListStats`
         :returns: (key, value) tuples for each ``ListStats`` attribute.
         :rtype: ``list`` of ``tuple``
 
         """
-        return zip(self._list_stats_keys, [list_stats.mean, list_stats.median])
+        return (list(zip(self._list_stats_keys,
+                         [list_stats.mean, list_stats.median])) +
+                [(percentile_name(percent), value) for percent, value
+                 in list_stats.percentiles.items()])
 
     def _tabular_data(self, report, path_stats):
         """Prepare tabular data for output.
@@ -269,6 +356,18 @@ class TabularDataRenderer(Renderer):
         :returns: tuple of table (headers, rows).
         :rtype: ``tuple``
 
+        """
+        headers, rows = self._iter_tabular_data(report, path_stats)
+        return (headers, list(rows))
+
+    def _iter_tabular_data(self, report, path_stats):
+        """Prepare tabular data for output row by row.
+
+        Like :py:meth:`_tabular_data`, but the rows are generated lazily.
+
+        :returns: tuple of table headers and generator of rows.
+        :rtype: ``tuple``
+
         """
         # sorted list of all HTTP verbs in this report and their counts
         verb_names, verb_counts = zip(*sorted(
@@ -288,12 +387,27 @@ class TabularDataRenderer(Renderer):
         status_headers = tuple("status_{code:x<3}".format(code=code)
                                for code in status_names)
 
-        headers = (("path", "requests") + verb_names + status_headers +
-                   stats_names)
-        total = (("total", report.requests) +
-                 verb_counts + status_counts + stats_values)
+        headers = ("path", "requests")
+        total = ("total", report.requests)
+        # approximate request counts of top paths have an error bound
+        errors = bool(path_stats) and report.top_paths is not None
+        if errors:
+            headers += ("requests_error",)
+            total += (0,)
+        headers += verb_names + status_headers + stats_names
+        total += verb_counts + status_counts + stats_values
+
+        return (list(headers), self._iter_rows(
+            report, path_stats, verb_names, status_names, total, errors))
 
-        rows = []
+    def _iter_rows(self, report, path_stats, verb_names, status_names, total,
+                   errors=False):
+        """Generate the per path rows (if ``path_stats``) and ``total`` row.
+
+        With ``errors``, the request count of each path is followed by its
+        maximum overestimation.
+
+        """
         # include path statistics?
         if path_stats:
             # get per path values from report, ordered by path
@@ -307,17 +421,18 @@ class TabularDataRenderer(Renderer):
                 requests = report._path_requests[path]
                 verbs = dict(verbs)
                 status = PrefixMatchingCounter(dict(status))
-                row = [path, requests]
+                # approximate counts are rendered like integers
+                row = [path, int(requests)]
+                if errors:
+                    row.append(requests.error)
                 row += [verbs.get(name, 0) for name in verb_names]
                 row += [status.get(name, 0) for name in status_names]
                 row += [time[1] for time in self._list_stats(times)]
                 row += [utime[1] for utime in self._list_stats(utimes)]
                 row += [bbytes[1] for bbytes in self._list_stats(body_bytes)]
-                rows.append(row)
+                yield row
 
-        rows.append(total)
-
-        return (list(headers), rows)
+        yield total
 
 
 @add_metaclass(abc.ABCMeta)
@@ -338,6 +453,8 @@ class ASCIITableRenderer(TabularDataRenderer):
         :rtype: `str`
 
         """
+        # only import tabulate when rendering tables, it is slow to import
+        from tabulate import tabulate
         headers, rows = self._tabular_data(report, path_stats)
         return tabulate(rows,
                         headers=headers,
@@ -361,6 +478,51 @@ class GridTableRenderer(ASCIITableRenderer):
     tabulate_format = 'grid'
 
 
+class SeriesRenderer(ASCIITableRenderer):
+
+    """Renderer for the time series of a report in simple reSt table format.
+
+    Prints one row per time bucket of the report and the total (see
+    :py:attr:`analog.report.Report.buckets`). Per path statistics are not
+    included.
+
+    """
+
+    name = "series"
+    tabulate_format = 'rst'
+
+    def _tabular_data(self, report, path_stats):
+        """Prepare tabular data of time buckets for output.
+
+        :param report: log analysis report object.
+        :type report: :py:class:`analog.report.Report`
+        :param path_stats: ignored.
+        :type path_stats: ``bool``
+        :returns: tuple of table (headers, rows).
+        :rtype: ``tuple``
+
+        """
+        headers, rows = super(SeriesRenderer, self)._tabular_data(
+            report, path_stats=False)
+        headers[0] = "bucket"
+        verb_names = [verb for verb, _ in sorted(report.verbs)]
+        status_names = [str(status) for status, _ in sorted(report.status)]
+
+        buckets = []
+        for start, bucket in report.buckets.items():
+            verbs = dict(bucket.verbs)
+            status = PrefixMatchingCounter(dict(bucket.status))
+            row = [str(start), bucket.requests]
+            row += [verbs.get(name, 0) for name in verb_names]
+            row += [status.get(name, 0) for name in status_names]
+            for stats_field in self._stats_fields:
+                row += [value for _, value in self._list_stats(
+                    getattr(bucket, stats_field))]
+            buckets.append(row)
+
+        return (headers, buckets + rows)
+
+
 @add_metaclass(abc.ABCMeta)
 class SeparatedValuesRenderer(TabularDataRenderer):
 
@@ -380,18 +542,31 @@ class SeparatedValuesRenderer(TabularDataRenderer):
         :rtype: `str`
 
         """
-        headers, rows = self._tabular_data(report, path_stats)
-
         try:
             stream = StringIO(newline='')
         except TypeError:
             stream = StringIO()  # Python 2.7 does not support newline arg
+        self.render_to(report, stream, path_stats=path_stats)
+
+        return stream.getvalue()[:-1]  # Do not return last newline
+
+    def render_to(self, report, stream, path_stats=False):
+        """Write report statistics to ``stream`` row by row.
+
+        :param report: log analysis report object.
+        :type report: :py:class:`analog.report.Report`
+        :param stream: text stream to write to.
+        :param path_stats: include per path statistics in output.
+        :type path_stats: ``bool``
+
+        """
+        import csv
+        headers, rows = self._iter_tabular_data(report, path_stats)
         writer = csv.writer(stream, delimiter=str(self.delimiter),
                             lineterminator='\n')
         writer.writerow(headers)
-        writer.writerows(rows)
-
-        return stream.getvalue()[:-1]  # Do not return last newline
+        for row in rows:
+            writer.writerow(row)
 
 
 class CSVRenderer(SeparatedValuesRenderer):
@@ -1,37 +1,228 @@
 """Analog log report object."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+from array import array
 from collections import Counter, defaultdict, OrderedDict
-import time
+import datetime
+from functools import partial, wraps
 
+from analog.exceptions import UnknownBucketError, UnknownStatsBackendError
 from analog.renderers import Renderer
+from analog.sketches import DDSketch, SpaceSaving
+from analog.statistics import _import_numpy, mean
+from analog.statistics import percentiles as select_percentiles
+from analog.timing import clock
 from analog.utils import PrefixMatchingCounter
 
+from analog import LOG
+
+
+#: Status codes below this are looked up in a table of tracked prefixes.
+STATUS_TABLE_SIZE = 600
+#: ``array`` typecode for times (float).
+FLOAT_TYPECODE = str('d')
+#: ``array`` typecode for body sizes (integer).
+INT_TYPECODE = str('q')
 try:
-    from statistics import mean, median
-except ImportError:
-    from analog.statistics import mean, median
+    array(INT_TYPECODE)
+except ValueError:  # Python 2.7 has no long long arrays
+    INT_TYPECODE = str('l')
+#: ``array`` typecode for path, verb and status code prefix ids (integer).
+ID_TYPECODE = str('i')
+#: Number of log entries a :py:class:`analog.report.BatchReport` buffers
+#: before aggregating them.
+BATCH_SIZE = 65536
 
-from analog import LOG
+
+def exact_values(typecode):
+    """Create typed buffer to collect all values in for exact statistics.
+
+    :param typecode: ``array`` typecode of values.
+    :type typecode: ``str``
+    :rtype: :py:class:`array.array`
+
+    """
+    return array(typecode)
+
+
+def sketch_values(typecode):
+    """Create sketch to summarize values in for estimated statistics.
+
+    :param typecode: ``array`` typecode of values (ignored).
+    :type typecode: ``str``
+    :rtype: :py:class:`analog.sketches.DDSketch`
+
+    """
+    return DDSketch()
+
+
+#: Factories of containers to collect times and body sizes in, by statistics
+#: backend name. Factories are called with the ``array`` typecode of values.
+STATS_BACKENDS = {
+    'exact': exact_values,
+    'ddsketch': sketch_values,
+}
+
+
+#: Sizes of time buckets in seconds, by bucket name. Sizes divide an hour.
+BUCKET_SIZES = OrderedDict((
+    ('minute', 60),
+    ('5min', 300),
+    ('hour', 3600),
+))
+
+
+def bucket_start(timestamp, size):
+    """Find the start of the time bucket ``timestamp`` belongs to.
+
+    :param timestamp: log entry timestamp.
+    :type timestamp: :py:class:`datetime.datetime`
+    :param size: bucket size in seconds, dividing an hour.
+    :type size: ``int``
+    :returns: ``timestamp`` truncated to a multiple of ``size`` seconds.
+    :rtype: :py:class:`datetime.datetime`
+
+    """
+    seconds = timestamp.minute * 60 + timestamp.second
+    return (timestamp.replace(minute=0, second=0, microsecond=0) +
+            datetime.timedelta(seconds=seconds - seconds % size))
+
+
+def memoized_property(method):
+    """Define report property caching the value computed by ``method``.
+
+    Values are stored in the report's ``_cache`` until it is cleared because
+    log entries are added or merged into the report. Buffered log entries are
+    aggregated before the value is computed.
+
+    :param method: report method computing the property value.
+    :type method: ``function``
+    :rtype: ``property``
+
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def getter(self):
+        try:
+            return self._cache[name]
+        except KeyError:
+            self.flush()
+            value = self._cache[name] = method(self)
+            return value
+    return property(getter)
 
 
 class ListStats(object):
 
     """Statistic analysis of a list of values.
 
-    Provides the mean, median and 90th, 75th and 25th percentiles.
+    Provides the mean, median and the requested percentiles, e.g. the 90th,
+    75th and 25th percentiles.
+
+    Values collected in a :py:class:`analog.sketches.DDSketch` are not
+    evaluated exactly. The mean is exact but the median and percentiles are
+    estimates within 1% relative error of the actual values.
 
     """
 
-    def __init__(self, elements):
+    def __init__(self, elements, percentiles=()):
         """Calculate some stats from list of values.
 
-        :param elements: list of values.
-        :type elements: ``list``
+        The median and all percentiles are selected in a single pass over the
+        values, see :py:func:`analog.statistics.percentiles`.
+
+        :param elements: list, typed buffer or sketch of values.
+        :type elements: ``list``, :py:class:`array.array` or
+            :py:class:`analog.sketches.DDSketch`
+        :param percentiles: percentiles to compute, between 0 and 100.
+        :type percentiles: ``list`` of ``float``
 
         """
-        self.mean = mean(elements) if elements else None
-        self.median = median(elements) if elements else None
+        percentiles = tuple(percentiles)
+        if isinstance(elements, DDSketch):
+            self.mean = elements.mean()
+            values = [elements.quantile(percent / 100)
+                      for percent in (50,) + percentiles]
+        elif elements:
+            self.mean = mean(elements)
+            values = select_percentiles(elements, (50,) + percentiles)
+        else:
+            self.mean = None
+            values = [None] * (len(percentiles) + 1)
+        self.median = values[0]
+        #: percentile values by percentile, in the requested order.
+        self.percentiles = OrderedDict(zip(percentiles, values[1:]))
+
+
+class TimeBucket(object):
+
+    """Log entries of one time bucket of a report.
+
+    Counts requests, verbs and status codes. Times and body sizes are always
+    summarized in :py:class:`analog.sketches.DDSketch` objects, so every bucket
+    uses a bounded amount of memory.
+
+    """
+
+    def __init__(self, verb_counter, status_counter, percentiles=()):
+        """Create empty time bucket.
+
+        :param verb_counter: factory of the verb counter.
+        :param status_counter: factory of the status code counter.
+        :param percentiles: percentiles of times and body sizes to compute.
+
+        """
+        self.requests = 0
+        self._percentiles = percentiles
+        self._verbs = verb_counter()
+        self._status = status_counter()
+        self._times = DDSketch()
+        self._upstream_times = DDSketch()
+        self._body_bytes = DDSketch()
+
+    def add(self, verb, prefix, time, upstream_time, body_bytes):
+        """Add a log entry with tracked ``verb`` and status ``prefix``."""
+        self.requests += 1
+        self._verbs[verb] += 1
+        self._status[prefix] += 1
+        self._times.append(time)
+        self._upstream_times.append(upstream_time)
+        self._body_bytes.append(body_bytes)
+
+    def merge(self, other):
+        """Merge log entries of ``other`` bucket of the same time."""
+        self.requests += other.requests
+        self._verbs.update(other._verbs)
+        self._status.update(other._status)
+        self._times.merge(other._times)
+        self._upstream_times.merge(other._upstream_times)
+        self._body_bytes.merge(other._body_bytes)
+
+    @property
+    def verbs(self):
+        """List request methods in this bucket, ordered by frequency."""
+        return self._verbs.most_common()
+
+    @property
+    def status(self):
+        """List status codes in this bucket, ordered by frequency."""
+        return self._status.most_common()
+
+    @property
+    def times(self):
+        """Response time statistics in this bucket."""
+        return ListStats(self._times, self._percentiles)
+
+    @property
+    def upstream_times(self):
+        """Response upstream time statistics in this bucket."""
+        return ListStats(self._upstream_times, self._percentiles)
+
+    @property
+    def body_bytes(self):
+        """Response body size statistics in this bucket."""
+        return ListStats(self._body_bytes, self._percentiles)
 
 
 class Report(object):
@@ -44,18 +235,40 @@ class Report(object):
     * Response request method (HTTP verb) distribution.
     * Response status code distribution.
     * Requests per path.
-    * Response time statistics (mean, median).
-    * Response upstream time statistics (mean, median).
-    * Response body size in bytes statistics (mean, median).
+    * Response time statistics (mean, median, percentiles).
+    * Response upstream time statistics (mean, median, percentiles).
+    * Response body size in bytes statistics (mean, median, percentiles).
     * Per path request method (HTTP verb) distribution.
     * Per path response status code distribution.
-    * Per path response time statistics (mean, median).
-    * Per path response upstream time statistics (mean, median).
-    * Per path response body size in bytes statistics (mean, median).
+    * Per path response time statistics (mean, median, percentiles).
+    * Per path response upstream time statistics (mean, median, percentiles).
+    * Per path response body size in bytes statistics (mean, median,
+      percentiles).
+
+    Times and body sizes are collected in typed buffers (:py:class:`array.array`
+    of floats and integers) for exact statistics by default. Choose the
+    ``ddsketch`` statistics backend to collect them in
+    :py:class:`analog.sketches.DDSketch` summaries instead. These use a fixed
+    amount of memory per path, regardless of the number of requests.
+
+    With a ``bucket`` size, log entries are also counted per minute, 5 minutes
+    or hour of their timestamp. See :py:attr:`buckets`.
+
+    Per path statistics grow with the number of distinct paths. With
+    ``top_paths``, only the most frequent paths are tracked in a
+    :py:class:`analog.sketches.SpaceSaving` summary. Statistics are only kept
+    for these paths and their request counts are approximate. Statistics of
+    a path are dropped when it is replaced, so its verbs, status codes, times
+    and body sizes only cover the log entries since it was last admitted.
+
+    Derived statistics and sorted views are computed on first access and cached
+    until more log entries are added, so rendering a report reads every value
+    once. The cached values are shared and must not be modified.
 
     """
 
-    def __init__(self, verbs, status_codes):
+    def __init__(self, verbs, status_codes, stats_backend='exact',
+                 bucket=None, top_paths=None, percentiles=()):
         """Create new log report object.
 
         Use ``add()`` method to add log entries to be analyzed.
@@ -65,38 +278,78 @@ class Report(object):
         :param status_codes: status_codes to be tracked. May be prefixes,
             e.g. ["100", "2", "3", "4", "404" ]
         :type status_codes: ``list``
+        :param stats_backend: name of statistics backend, one of
+            :py:data:`analog.report.STATS_BACKENDS`.
+        :type stats_backend: ``str``
+        :param bucket: name of time bucket size, one of
+            :py:data:`analog.report.BUCKET_SIZES`. No time series by default.
+        :type bucket: ``str``
+        :param top_paths: number of most frequent paths to keep per path
+            statistics for. All paths by default.
+        :type top_paths: ``int``
+        :param percentiles: percentiles of times and body sizes to compute,
+            between 0 and 100. None by default.
+        :type percentiles: ``list`` of ``float``
         :returns: Report analysis object
         :rtype: :py:class:`analog.report.Report`
+        :raises: :py:class:`analog.exceptions.UnknownStatsBackendError` for
+            unknown ``stats_backend`` names.
+        :raises: :py:class:`analog.exceptions.UnknownBucketError` for unknown
+            ``bucket`` names.
 
         """
-        def verb_counter():
-            return Counter({verb: 0 for verb in verbs})
-
-        def status_counter():
-            return PrefixMatchingCounter(
-                {str(code): 0 for code in status_codes})
-
-        self._start_time = time.clock()
+        if stats_backend not in STATS_BACKENDS:
+            raise UnknownStatsBackendError(stats_backend)
+        if bucket is not None and bucket not in BUCKET_SIZES:
+            raise UnknownBucketError(bucket)
+        times = partial(STATS_BACKENDS[stats_backend], FLOAT_TYPECODE)
+        body_bytes = partial(STATS_BACKENDS[stats_backend], INT_TYPECODE)
+
+        # counter factories are partials to keep reports picklable
+        verb_counter = partial(Counter, OrderedDict(
+            (verb, 0) for verb in verbs))
+        status_counter = partial(PrefixMatchingCounter, OrderedDict(
+            (str(code), 0) for code in status_codes))
+
+        self._start_time = clock()
         self.execution_time = None
         self.requests = 0
         self._verbs = verb_counter()
         self._status = status_counter()
-        self._times = []
-        self._upstream_times = []
-        self._body_bytes = []
-        self._path_requests = Counter()
+        self._status_table = self._status.lookup_table(STATUS_TABLE_SIZE)
+        self._times = times()
+        self._upstream_times = times()
+        self._body_bytes = body_bytes()
+        self._top_paths = top_paths
+        self._percentiles = tuple(percentiles)
+        if top_paths is None:
+            self._path_requests = Counter()
+        else:
+            self._path_requests = SpaceSaving(top_paths)
         self._path_verbs = defaultdict(verb_counter)
         self._path_status = defaultdict(status_counter)
-        self._path_times = defaultdict(list)
-        self._path_upstream_times = defaultdict(list)
-        self._path_body_bytes = defaultdict(list)
+        self._path_times = defaultdict(times)
+        self._path_upstream_times = defaultdict(times)
+        self._path_body_bytes = defaultdict(body_bytes)
+        self._bucket_size = BUCKET_SIZES.get(bucket)
+        self._buckets = defaultdict(
+            partial(TimeBucket, verb_counter, status_counter,
+                    self._percentiles))
+        # bounds of the bucket of the last log entry, likely the next one's
+        self._bucket_start = None
+        self._bucket_end = None
+        self._bucket = None
+        # memoized property values, cleared on changes
+        self._cache = {}
 
     def finish(self):
-        """Stop execution timer."""
-        end_time = time.clock()
+        """Aggregate buffered log entries and stop execution timer."""
+        self.flush()
+        end_time = clock()
         self.execution_time = end_time - self._start_time
 
-    def add(self, path, verb, status, time, upstream_time, body_bytes):
+    def add(self, path, verb, status, time, upstream_time, body_bytes,
+            timestamp=None):
         """Add a log entry to the report.
 
         Any request with ``verb`` not matching any of ``self._verbs`` or
@@ -113,29 +366,131 @@ class Report(object):
         :param upstream_time: upstream response time in seconds.
         :type upstream_time: ``float``
         :param body_bytes: response body size in bytes.
-        :type body_bytes: ``float``
+        :type body_bytes: ``int``
+        :param timestamp: log entry timestamp. Required to count the entry in
+            its time bucket, if the report has a bucket size.
+        :type timestamp: :py:class:`datetime.datetime`
 
         """
+        # tracked status code prefix from lookup table
+        if 0 <= status < STATUS_TABLE_SIZE:
+            prefix = self._status_table[status]
+        else:
+            prefix = self._status.match(status)
         # Only keep entries with verbs/status codes that are being tracked
-        if verb not in self._verbs or self._status.match(status) is None:
+        if verb not in self._verbs or prefix is None:
             LOG.debug("Ignoring log entry for non-tracked verb ({verb}) or "
                       "status code ({status!s}).".format(verb=verb,
                                                          status=status))
             return
+        if self._cache:
+            self._cache.clear()
         self.requests += 1
         self._verbs[verb] += 1
-        self._status.inc(str(status))
+        self._status[prefix] += 1
         self._times.append(time)
         self._upstream_times.append(upstream_time)
         self._body_bytes.append(body_bytes)
-        self._path_requests[path] += 1
+        if self._top_paths is None:
+            self._path_requests[path] += 1
+        else:
+            evicted = self._path_requests.add(path)
+            if evicted is not None:
+                self._drop_path(evicted)
         self._path_verbs[path][verb] += 1
-        self._path_status[path].inc(status)
+        self._path_status[path][prefix] += 1
         self._path_times[path].append(time)
         self._path_upstream_times[path].append(upstream_time)
         self._path_body_bytes[path].append(body_bytes)
+        if timestamp is not None and self._bucket_size:
+            self._add_to_bucket(timestamp, verb, prefix, time, upstream_time,
+                                body_bytes)
+
+    def _add_to_bucket(self, timestamp, verb, prefix, time, upstream_time,
+                       body_bytes):
+        """Add a log entry to the time bucket ``timestamp`` belongs to."""
+        if (self._bucket is None or
+                not self._bucket_start <= timestamp < self._bucket_end):
+            start = bucket_start(timestamp, self._bucket_size)
+            self._bucket_start = start
+            self._bucket_end = start + datetime.timedelta(
+                seconds=self._bucket_size)
+            self._bucket = self._buckets[start]
+        self._bucket.add(verb, prefix, time, upstream_time, body_bytes)
+
+    def flush(self):
+        """Aggregate buffered log entries.
+
+        Statistics are aggregated before they are read, so this is only needed
+        to control when the work is done, e.g. to time it. Reports add log
+        entries immediately, see :py:class:`analog.report.BatchReport`.
+
+        """
+
+    def merge(self, other):
+        """Merge log entries analyzed in ``other`` report into this report.
+
+        Merging reports of consecutive parts of a logfile in order results in
+        the same report as analyzing the whole logfile at once.
+
+        :param other: report with the same verbs and status codes tracked.
+        :type other: :py:class:`analog.report.Report`
+        :returns: this report.
+        :rtype: :py:class:`analog.report.Report`
+
+        """
+        self.flush()
+        other.flush()
+        self._cache.clear()
+        self.requests += other.requests
+        self._verbs.update(other._verbs)
+        self._status.update(other._status)
+        _merge_values(self._times, other._times)
+        _merge_values(self._upstream_times, other._upstream_times)
+        _merge_values(self._body_bytes, other._body_bytes)
+        if self._top_paths is None:
+            self._path_requests.update(other._path_requests)
+        else:
+            for path in self._path_requests.merge(other._path_requests):
+                self._drop_path(path)
+        # only paths still tracked after merging the top paths
+        paths = self._path_requests
+        for path, verbs in other._path_verbs.items():
+            if path in paths:
+                self._path_verbs[path].update(verbs)
+        for path, status in other._path_status.items():
+            if path in paths:
+                self._path_status[path].update(status)
+        for path, times in other._path_times.items():
+            if path in paths:
+                _merge_values(self._path_times[path], times)
+        for path, times in other._path_upstream_times.items():
+            if path in paths:
+                _merge_values(self._path_upstream_times[path], times)
+        for path, body_bytes in other._path_body_bytes.items():
+            if path in paths:
+                _merge_values(self._path_body_bytes[path], body_bytes)
+        for start, bucket in other._buckets.items():
+            self._buckets[start].merge(bucket)
+        return self
+
+    def _drop_path(self, path):
+        """Drop per path statistics of ``path`` that is no top path anymore."""
+        for stats in (self._path_verbs, self._path_status, self._path_times,
+                      self._path_upstream_times, self._path_body_bytes):
+            stats.pop(path, None)
 
     @property
+    def top_paths(self):
+        """Number of most frequent paths per path statistics are kept for.
+
+        :returns: number of top paths or ``None`` if all paths are tracked.
+        :rtype: ``int``
+
+        """
+        return self._top_paths
+
+    @memoized_property
     def verbs(self):
         """List request methods of all matched requests, ordered by frequency.
 
@@ -145,7 +500,7 @@ class Report(object):
         """
         return self._verbs.most_common()
 
-    @property
+    @memoized_property
     def status(self):
         """List status codes of all matched requests, ordered by frequency.
 
@@ -155,7 +510,7 @@ class Report(object):
         """
         return self._status.most_common()
 
-    @property
+    @memoized_property
     def times(self):
         """Response time statistics of all matched requests.
 
@@ -163,9 +518,9 @@ class Report(object):
         :rtype: :py:class:`analog.report.ListStats`
 
         """
-        return ListStats(self._times)
+        return ListStats(self._times, self._percentiles)
 
-    @property
+    @memoized_property
     def upstream_times(self):
         """Response upstream time statistics of all matched requests.
 
@@ -173,9 +528,9 @@ class Report(object):
         :rtype: :py:class:`analog.report.ListStats`
 
         """
-        return ListStats(self._upstream_times)
+        return ListStats(self._upstream_times, self._percentiles)
 
-    @property
+    @memoized_property
     def body_bytes(self):
         """Response body size in bytes of all matched requests.
 
@@ -183,18 +538,52 @@ class Report(object):
         :rtype: :py:class:`analog.report.ListStats`
 
         """
-        return ListStats(self._body_bytes)
+        return ListStats(self._body_bytes, self._percentiles)
 
-    @property
+    @memoized_property
     def path_requests(self):
         """List paths of all matched requests, ordered by frequency.
 
+        With ``top_paths``, only the top paths are listed. Their counts are
+        :py:class:`analog.sketches.ApproximateCount` objects with the maximum
+        overestimation as ``error`` attribute.
+
         :returns: tuples of path and occurrency count.
         :rtype: ``list`` of ``tuple``
 
         """
         return self._path_requests.most_common()
 
+    @memoized_property
+    def _path_stats(self):
+        """Compute all per path statistics in one pass over the sorted paths.
+
+        :returns: mapping of per path property names to path mappings.
+        :rtype: ``dict`` of ``dict``
+
+        """
+        path_verbs = OrderedDict()
+        path_status = OrderedDict()
+        path_times = OrderedDict()
+        path_upstream_times = OrderedDict()
+        path_body_bytes = OrderedDict()
+        for path in sorted(self._path_requests):
+            path_verbs[path] = self._path_verbs[path].most_common()
+            path_status[path] = self._path_status[path].most_common()
+            path_times[path] = ListStats(self._path_times[path],
+                                         self._percentiles)
+            path_upstream_times[path] = ListStats(
+                self._path_upstream_times[path], self._percentiles)
+            path_body_bytes[path] = ListStats(self._path_body_bytes[path],
+                                              self._percentiles)
+        return {
+            'path_verbs': path_verbs,
+            'path_status': path_status,
+            'path_times': path_times,
+            'path_upstream_times': path_upstream_times,
+            'path_body_bytes': path_body_bytes,
+        }
+
     @property
     def path_verbs(self):
         """List request methods (HTTP verbs) of all matched requests per path.
@@ -205,10 +594,7 @@ class Report(object):
         :rtype: ``dict`` of ``list`` of ``tuple``
 
         """
-        return OrderedDict(
-            sorted(((path, counter.most_common())
-                    for path, counter in self._path_verbs.items()),
-                   key=lambda item: item[0]))
+        return self._path_stats['path_verbs']
 
     @property
     def path_status(self):
@@ -220,10 +606,7 @@ class Report(object):
         :rtype: ``dict`` of ``list`` of ``tuple``
 
         """
-        return OrderedDict(
-            sorted(((path, counter.most_common())
-                    for path, counter in self._path_status.items()),
-                   key=lambda item: item[0]))
+        return self._path_stats['path_status']
 
     @property
     def path_times(self):
@@ -233,10 +616,7 @@ class Report(object):
         :rtype: ``dict`` of :py:class:`analog.report.ListStats`
 
         """
-        return OrderedDict(
-            sorted(((path, ListStats(values))
-                    for path, values in self._path_times.items()),
-                   key=lambda item: item[0]))
+        return self._path_stats['path_times']
 
     @property
     def path_upstream_times(self):
@@ -246,10 +626,7 @@ class Report(object):
         :rtype: ``dict`` of :py:class:`analog.report.ListStats`
 
         """
-        return OrderedDict(
-            sorted(((path, ListStats(values))
-                    for path, values in self._path_upstream_times.items()),
-                   key=lambda item: item[0]))
+        return self._path_stats['path_upstream_times']
 
     @property
     def path_body_bytes(self):
@@ -259,10 +636,20 @@ class Report(object):
         :rtype: ``dict`` of :py:class:`analog.report.ListStats`
 
         """
-        return OrderedDict(
-            sorted(((path, ListStats(values))
-                    for path, values in self._path_body_bytes.items()),
-                   key=lambda item: item[0]))
+        return self._path_stats['path_body_bytes']
+
+    @memoized_property
+    def buckets(self):
+        """Time series of all matched requests, ordered by time.
+
+        Empty unless the report was created with a ``bucket`` size.
+
+        :returns: mapping of bucket start times to time buckets.
+        :rtype: ``dict`` of :py:class:`analog.report.TimeBucket`
+
+        """
+        return OrderedDict(sorted(self._buckets.items(),
+                                  key=lambda item: item[0]))
 
     def render(self, path_stats, output_format):
         """Render report data into ``output_format``.
@@ -279,3 +666,332 @@ class Report(object):
         """
         renderer = Renderer.by_name(name=output_format)
         return renderer.render(self, path_stats=path_stats)
+
+    def compute(self, path_stats=False):
+        """Compute all statistics of the report ahead of rendering.
+
+        Statistics are memoized, so rendering the report afterwards only
+        formats them.
+
+        :param path_stats: also compute per path statistics.
+        :type path_stats: ``bool``
+
+        """
+        for name in ('verbs', 'status', 'times', 'upstream_times',
+                     'body_bytes', 'path_requests', 'buckets'):
+            getattr(self, name)
+        if path_stats:
+            self._path_stats
+
+    def render_to(self, stream, path_stats, output_format):
+        """Write report data in ``output_format`` to ``stream``.
+
+        Output is written as it is rendered where the renderer supports it,
+        followed by a newline.
+        See :py:meth:`analog.renderers.Renderer.render_to`.
+
+        :param stream: text stream to write to, e.g. ``sys.stdout``.
+        :param path_stats: include per path statistics in output.
+        :type path_stats: ``bool``
+        :param output_format: name of report renderer.
+        :type output_format: ``str``
+        :raises: :py:class:`analog.exceptions.UnknownRendererError` or unknown
+            ``output_format`` identifiers.
+
+        """
+        renderer = Renderer.by_name(name=output_format)
+        renderer.render_to(self, stream, path_stats=path_stats)
+
+
+class BatchReport(Report):
+
+    """Log analysis report aggregating log entries in batches with NumPy.
+
+    Log entries are buffered in typed columns of path, verb and status code
+    prefix ids, times and body sizes. Once ``batch_size`` entries are buffered,
+    and before statistics are read or the report is finished, merged or
+    pickled, the columns are aggregated with vectorized operations: requests
+    per verb, status code and path are counted with ``numpy.bincount`` and
+    values are grouped per path with a stable ``numpy.argsort``.
+
+    The aggregated statistics equal those of :py:class:`analog.report.Report`.
+    Only exact statistics of all paths are supported, see
+    :py:func:`analog.report.create_report`.
+
+    """
+
+    def __init__(self, verbs, status_codes, bucket=None, percentiles=(),
+                 batch_size=BATCH_SIZE):
+        """Create new log report object buffering log entries.
+
+        :param verbs: HTTP verbs to be tracked.
+        :type verbs: ``list``
+        :param status_codes: status_codes to be tracked. May be prefixes,
+            e.g. ["100", "2", "3", "4", "404" ]
+        :type status_codes: ``list``
+        :param bucket: name of time bucket size, one of
+            :py:data:`analog.report.BUCKET_SIZES`. No time series by default.
+        :type bucket: ``str``
+        :param percentiles: percentiles of times and body sizes to compute,
+            between 0 and 100. None by default.
+        :type percentiles: ``list`` of ``float``
+        :param batch_size: number of log entries to buffer before aggregating
+            them.
+        :type batch_size: ``int``
+        :returns: Report analysis object
+        :rtype: :py:class:`analog.report.BatchReport`
+        :raises: :py:class:`analog.exceptions.UnknownBucketError` for unknown
+            ``bucket`` names.
+
+        """
+        super(BatchReport, self).__init__(verbs, status_codes, 'exact', bucket,
+                                          percentiles=percentiles)
+        self._batch_size = batch_size
+        self._verb_names = list(self._verbs)
+        self._verb_ids = dict(
+            (verb, index) for index, verb in enumerate(self._verb_names))
+        self._prefix_names = list(self._status)
+        self._prefix_ids = dict(
+            (prefix, index) for index, prefix in enumerate(self._prefix_names))
+        # tracked status code prefix ids by status code, -1 if not tracked
+        self._prefix_id_table = [self._prefix_ids.get(prefix, -1)
+                                 for prefix in self._status_table]
+        self._path_names = []
+        self._path_ids = {}
+        self._new_batch()
+
+    def __getstate__(self):
+        """Aggregate buffered log entries before pickling the report."""
+        self.flush()
+        return self.__dict__
+
+    def add(self, path, verb, status, time, upstream_time, body_bytes,
+            timestamp=None):
+        """Buffer a log entry to be added to the report.
+
+        See :py:meth:`analog.report.Report.add`.
+
+        """
+        if 0 <= status < STATUS_TABLE_SIZE:
+            prefix_id = self._prefix_id_table[status]
+        else:
+            prefix_id = self._prefix_ids.get(self._status.match(status), -1)
+        verb_id = self._verb_ids.get(verb)
+        # Only keep entries with verbs/status codes that are being tracked
+        if verb_id is None or prefix_id < 0:
+            LOG.debug("Ignoring log entry for non-tracked verb ({verb}) or "
+                      "status code ({status!s}).".format(verb=verb,
+                                                         status=status))
+            return
+        if self._cache:
+            self._cache.clear()
+        self.requests += 1
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self._path_names)
+            self._path_names.append(path)
+        self._batch_paths.append(path_id)
+        self._batch_verbs.append(verb_id)
+        self._batch_status.append(prefix_id)
+        self._batch_times.append(time)
+        self._batch_upstream_times.append(upstream_time)
+        self._batch_body_bytes.append(body_bytes)
+        if timestamp is not None and self._bucket_size:
+            self._add_to_bucket(timestamp, verb, self._prefix_names[prefix_id],
+                                time, upstream_time, body_bytes)
+        if len(self._batch_paths) >= self._batch_size:
+            self.flush()
+
+    def add_columns(self, paths, verbs, path_ids, verb_ids, status, times,
+                    upstream_times, body_bytes):
+        """Add log entries given as columns of NumPy arrays.
+
+        Entries are filtered and mapped to the report's ids with vectorized
+        operations and aggregated batch by batch, without adding them one by
+        one. They are not counted in time buckets.
+
+        :param paths: monitored paths by path id, ``None`` for paths that are
+            not monitored.
+        :type paths: ``list`` of ``str``
+        :param verbs: HTTP verbs by verb id.
+        :type verbs: ``list`` of ``str``
+        :param path_ids: path id of each log entry.
+        :param verb_ids: verb id of each log entry.
+        :param status: response status code of each log entry.
+        :param times: response time of each log entry.
+        :param upstream_times: upstream response time of each log entry.
+        :param body_bytes: response body size of each log entry.
+
+        """
+        numpy = _import_numpy()
+        monitored = numpy.array([path is not None for path in paths],
+                                dtype=bool)
+        verb_table = numpy.array(
+            [self._verb_ids.get(verb, -1) for verb in verbs],
+            dtype=ID_TYPECODE)
+        # tracked status code prefix ids, looked up per distinct status code
+        # outside of the lookup table
+        prefix_ids = numpy.full(len(status), -1, dtype=ID_TYPECODE)
+        in_table = (status >= 0) & (status < STATUS_TABLE_SIZE)
+        prefix_ids[in_table] = numpy.array(
+            self._prefix_id_table, dtype=ID_TYPECODE)[status[in_table]]
+        for code in numpy.unique(status[~in_table]).tolist():
+            prefix_ids[status == code] = self._prefix_ids.get(
+                self._status.match(code), -1)
+        entry_verbs = verb_table[verb_ids]
+        # only keep entries of monitored paths and tracked verbs/status codes
+        keep = monitored[path_ids] & (entry_verbs >= 0) & (prefix_ids >= 0)
+        path_ids, first, entry_paths = numpy.unique(
+            path_ids[keep], return_index=True, return_inverse=True)
+        # new paths are numbered in order of their first log entry, like
+        # adding the log entries one by one does
+        report_ids = [None] * len(path_ids)
+        for index in numpy.argsort(first, kind='stable').tolist():
+            path = paths[int(path_ids[index])]
+            path_id = self._path_ids.get(path)
+            if path_id is None:
+                path_id = self._path_ids[path] = len(self._path_names)
+                self._path_names.append(path)
+            report_ids[index] = path_id
+        columns = (numpy.array(report_ids, dtype=ID_TYPECODE)[entry_paths],
+                   entry_verbs[keep], prefix_ids[keep],
+                   times[keep].astype(FLOAT_TYPECODE),
+                   upstream_times[keep].astype(FLOAT_TYPECODE),
+                   body_bytes[keep].astype(INT_TYPECODE))
+        if self._cache:
+            self._cache.clear()
+        self.requests += len(columns[0])
+        self.flush()
+        for start in range(0, len(columns[0]), self._batch_size):
+            stop = start + self._batch_size
+            batches = (self._batch_paths, self._batch_verbs,
+                       self._batch_status, self._batch_times,
+                       self._batch_upstream_times, self._batch_body_bytes)
+            for batch, column in zip(batches, columns):
+                batch.frombytes(column[start:stop].tobytes())
+            self.flush()
+
+    def flush(self):
+        """Aggregate buffered log entries into the report's statistics."""
+        if not self._batch_paths:
+            return
+        numpy = _import_numpy()
+        verb_names = self._verb_names
+        prefix_names = self._prefix_names
+        verbs = numpy.frombuffer(self._batch_verbs, dtype=ID_TYPECODE)
+        status = numpy.frombuffer(self._batch_status, dtype=ID_TYPECODE)
+        # path ids of this batch only, so aggregation grows with batch size
+        path_ids, paths = numpy.unique(
+            numpy.frombuffer(self._batch_paths, dtype=ID_TYPECODE),
+            return_inverse=True)
+        _count(self._verbs, verb_names,
+               numpy.bincount(verbs, minlength=len(verb_names)))
+        _count(self._status, prefix_names,
+               numpy.bincount(status, minlength=len(prefix_names)))
+        self._times.extend(self._batch_times)
+        self._upstream_times.extend(self._batch_upstream_times)
+        self._body_bytes.extend(self._batch_body_bytes)
+
+        # requests per path and verb/status combination, one row per path
+        path_counts = numpy.bincount(paths, minlength=len(path_ids))
+        path_verbs = numpy.bincount(
+            paths * len(verb_names) + verbs,
+            minlength=len(path_ids) * len(verb_names)).reshape(
+                len(path_ids), len(verb_names))
+        path_status = numpy.bincount(
+            paths * len(prefix_names) + status,
+            minlength=len(path_ids) * len(prefix_names)).reshape(
+                len(path_ids), len(prefix_names))
+        # values grouped by path, in log order within each path
+        order = numpy.argsort(paths, kind='stable')
+        times = numpy.frombuffer(
+            self._batch_times, dtype=FLOAT_TYPECODE)[order].tolist()
+        upstream_times = numpy.frombuffer(
+            self._batch_upstream_times, dtype=FLOAT_TYPECODE)[order].tolist()
+        body_bytes = numpy.frombuffer(
+            self._batch_body_bytes, dtype=INT_TYPECODE)[order].tolist()
+
+        batch_paths = [self._path_names[path_id]
+                       for path_id in path_ids.tolist()]
+        start = 0
+        for path, end in zip(batch_paths, numpy.cumsum(path_counts).tolist()):
+            self._path_requests[path] += end - start
+            self._path_times[path].extend(times[start:end])
+            self._path_upstream_times[path].extend(upstream_times[start:end])
+            self._path_body_bytes[path].extend(body_bytes[start:end])
+            start = end
+        # only the combinations that occur in this batch
+        _count_pairs(self._path_verbs, batch_paths, verb_names, path_verbs,
+                     numpy)
+        _count_pairs(self._path_status, batch_paths, prefix_names,
+                     path_status, numpy)
+        self._new_batch()
+
+    def _new_batch(self):
+        """Start buffering log entries in empty columns.
+
+        Aggregated columns are replaced instead of cleared, NumPy arrays may
+        still reference their buffers.
+
+        """
+        self._batch_paths = array(ID_TYPECODE)
+        self._batch_verbs = array(ID_TYPECODE)
+        self._batch_status = array(ID_TYPECODE)
+        self._batch_times = array(FLOAT_TYPECODE)
+        self._batch_upstream_times = array(FLOAT_TYPECODE)
+        self._batch_body_bytes = array(INT_TYPECODE)
+
+
+def create_report(verbs, status_codes, stats_backend='exact', bucket=None,
+                  top_paths=None, percentiles=()):
+    """Create new log report object, aggregating in batches where possible.
+
+    A :py:class:`analog.report.BatchReport` is created for exact statistics of
+    all paths if NumPy is installed, a :py:class:`analog.report.Report`
+    otherwise. See :py:class:`analog.report.Report` for the parameters.
+
+    :rtype: :py:class:`analog.report.Report`
+
+    """
+    if stats_backend == 'exact' and top_paths is None and _import_numpy():
+        return BatchReport(verbs, status_codes, bucket, percentiles)
+    return Report(verbs, status_codes, stats_backend, bucket, top_paths,
+                  percentiles)
+
+
+def _count(counter, names, counts):
+    """Add non-zero ``counts`` to ``counter`` entries of ``names``.
+
+    :param counter: counter of names.
+    :param names: names of ``counts``.
+    :param counts: one dimensional NumPy array of counts.
+
+    """
+    for name, count in zip(names, counts.tolist()):
+        if count:
+            counter[name] += count
+
+
+def _count_pairs(counters, rows, columns, counts, numpy):
+    """Add non-zero ``counts`` matrix entries to ``counters`` by row name.
+
+    :param counters: mapping of row names to counters of column names.
+    :param rows: row names of ``counts``.
+    :param columns: column names of ``counts``.
+    :param counts: two dimensional NumPy array of counts.
+    :param numpy: the ``numpy`` module.
+
+    """
+    row_indexes, column_indexes = numpy.nonzero(counts)
+    for row, column, count in zip(
+            row_indexes.tolist(), column_indexes.tolist(),
+            counts[row_indexes, column_indexes].tolist()):
+        counters[rows[row]][columns[column]] += count
+
+
+def _merge_values(values, other):
+    """Merge ``other`` collected values into ``values`` of the same backend."""
+    if isinstance(values, DDSketch):
+        values.merge(other)
+    else:
+        values.extend(other)
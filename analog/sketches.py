@@ -0,0 +1,329 @@
+"""Bounded memory summaries for analog reports."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import heapq
+import math
+
+from analog.statistics import _exact_partials, _partials_mean
+
+
+#: Number of values buffered before they are added to the exact sum.
+SUM_BUFFER_SIZE = 1024
+
+
+class DDSketch(object):
+
+    """Quantile sketch with relative error guarantee.
+
+    Implementation of the `DDSketch <https://arxiv.org/abs/1908.10693>`_ by
+    Masson, Rim and Lee. Values are counted in logarithmically sized bins so
+    that any quantile estimate ``x'`` of the true quantile value ``x`` is
+    within ``|x' - x| <= relative_accuracy * x``.
+
+    The number of bins is limited to ``max_bins``, so memory use does not grow
+    with the number of values. With the default accuracy of 1% and 2048 bins,
+    values spanning 17 orders of magnitude are covered without loss of accuracy.
+    If more bins are needed, the lowest bins are collapsed, which only affects
+    the accuracy of the lowest quantiles.
+
+    The mean is computed from the exact sum and count of all values. Values
+    are buffered and added to partial sums without rounding errors in bulk,
+    see :py:func:`analog.statistics._exact_partials`.
+
+    Only positive values and zero are supported, which is all that is needed
+    for times and body sizes.
+
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        """Create empty sketch.
+
+        :param relative_accuracy: relative error bound of quantile estimates.
+        :type relative_accuracy: ``float``
+        :param max_bins: maximum number of bins to keep.
+        :type max_bins: ``int``
+
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins = {}
+        self._zeros = 0
+        self.count = 0
+        self._partials = []
+        self._values = []
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        """Number of values added to the sketch."""
+        return self.count
+
+    def append(self, value):
+        """Add ``value`` to the sketch.
+
+        :param value: positive value or zero.
+        :type value: ``float`` or ``int``
+
+        """
+        self.count += 1
+        self._values.append(value)
+        if len(self._values) >= SUM_BUFFER_SIZE:
+            self._add_values()
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= 0:
+            self._zeros += 1
+            return
+        key = int(math.ceil(math.log(value) / self._log_gamma))
+        bins = self._bins
+        bins[key] = bins.get(key, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other):
+        """Merge all values of ``other`` sketch into this sketch.
+
+        :param other: sketch with the same ``relative_accuracy``.
+        :type other: :py:class:`analog.sketches.DDSketch`
+
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different accuracy.")
+        if not other.count:
+            return
+        self.count += other.count
+        self._values.extend(other._partials)
+        self._values.extend(other._values)
+        self._add_values()
+        self._zeros += other._zeros
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+        bins = self._bins
+        for key, count in other._bins.items():
+            bins[key] = bins.get(key, 0) + count
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def _add_values(self):
+        """Add the buffered values to the exact partial sums."""
+        self._partials = _exact_partials(self._partials + self._values)
+        self._values = []
+
+    def _collapse(self):
+        """Collapse the lowest bins into one to get back to ``max_bins``."""
+        keys = sorted(self._bins)
+        excess = keys[:len(keys) - self.max_bins + 1]
+        self._bins[keys[len(excess)]] += sum(
+            self._bins.pop(key) for key in excess)
+
+    @property
+    def sum(self):
+        """Sum of all values, rounded once."""
+        return math.fsum(self._partials + self._values)
+
+    def mean(self):
+        """Mean of all values, rounded once.
+
+        :returns: mean or ``None`` if no values were added.
+        :rtype: ``float``
+
+        """
+        if not self.count:
+            return None
+        self._add_values()
+        return _partials_mean(self._partials, self.count)
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile of all values.
+
+        :param q: quantile between 0 and 1, e.g. 0.5 for the median.
+        :type q: ``float``
+        :returns: quantile estimate or ``None`` if no values were added.
+        :rtype: ``float``
+
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0
+        for key in sorted(self._bins):
+            seen += self._bins[key]
+            if rank < seen:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class ApproximateCount(int):
+
+    """Count that overestimates the true count by at most ``error``.
+
+    Behaves like an ``int`` of the estimated count. The true count is between
+    ``count - error`` and ``count``.
+
+    """
+
+    def __new__(cls, count, error=0):
+        """Create approximate count.
+
+        :param count: estimated count.
+        :type count: ``int``
+        :param error: maximum overestimation of ``count``.
+        :type error: ``int``
+
+        """
+        self = super(ApproximateCount, cls).__new__(cls, count)
+        self.error = error
+        return self
+
+
+class SpaceSaving(object):
+
+    """Heavy hitter summary counting the most frequent keys.
+
+    Implementation of the Space-Saving algorithm by Metwally, Agrawal and
+    El Abbadi. At most ``capacity`` keys are counted. A key that is not
+    counted yet replaces the key with the lowest count and takes over that
+    count as its error bound. Every key occurring more than ``n / capacity``
+    times in ``n`` additions is counted, and counts overestimate true counts
+    by at most their error.
+
+    Lowest counts are found in a heap of count lower bounds, one entry per key,
+    that is only updated on replacements.
+
+    """
+
+    def __init__(self, capacity):
+        """Create empty summary.
+
+        :param capacity: maximum number of keys to count.
+        :type capacity: ``int``
+
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self._counts = {}
+        self._errors = {}
+        self._heap = []
+
+    def __len__(self):
+        """Number of keys counted."""
+        return len(self._counts)
+
+    def __iter__(self):
+        """Iterate counted keys."""
+        return iter(self._counts)
+
+    def __contains__(self, key):
+        """Check if ``key`` is counted."""
+        return key in self._counts
+
+    def __getitem__(self, key):
+        """Approximate count of ``key``, 0 if it is not counted.
+
+        :rtype: :py:class:`analog.sketches.ApproximateCount`
+
+        """
+        if key not in self._counts:
+            return ApproximateCount(0)
+        return ApproximateCount(self._counts[key], self._errors[key])
+
+    def add(self, key):
+        """Count one occurrence of ``key``.
+
+        :returns: key that is not counted anymore because ``key`` replaced it
+            or ``None``.
+
+        """
+        counts = self._counts
+        if key in counts:
+            counts[key] += 1
+            return None
+        if len(counts) < self.capacity:
+            counts[key] = 1
+            self._errors[key] = 0
+            heapq.heappush(self._heap, (1, key))
+            return None
+        minimum, evicted = self._pop_minimum()
+        del counts[evicted]
+        del self._errors[evicted]
+        counts[key] = minimum + 1
+        self._errors[key] = minimum
+        heapq.heappush(self._heap, (minimum + 1, key))
+        return evicted
+
+    def _pop_minimum(self):
+        """Remove the heap entry of the key with the lowest count.
+
+        Heap entries are lower bounds of counts. Outdated entries on top of
+        the heap are updated until the top entry is current.
+
+        :returns: tuple of lowest count and its key.
+        :rtype: ``tuple``
+
+        """
+        heap = self._heap
+        while True:
+            count, key = heap[0]
+            current = self._counts[key]
+            if count == current:
+                return heapq.heappop(heap)
+            heapq.heapreplace(heap, (current, key))
+
+    def _minimum(self):
+        """Upper bound of the count of keys not counted."""
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def merge(self, other):
+        """Merge counts of ``other`` summary into this summary.
+
+        Keys not counted in one of the summaries may have occurred there as
+        often as its lowest count, which is added to their count and error.
+        The ``capacity`` keys with the highest merged counts are kept.
+
+        :param other: summary to merge.
+        :type other: :py:class:`analog.sketches.SpaceSaving`
+        :returns: keys that are not counted anymore.
+        :rtype: ``set``
+
+        """
+        minimum = self._minimum()
+        other_minimum = other._minimum()
+        counts = {}
+        errors = {}
+        for key in set(self._counts) | set(other._counts):
+            counts[key] = (self._counts.get(key, minimum) +
+                           other._counts.get(key, other_minimum))
+            errors[key] = (self._errors.get(key, minimum) +
+                           other._errors.get(key, other_minimum))
+        kept = heapq.nlargest(self.capacity, counts,
+                              key=lambda key: (counts[key], key))
+        evicted = set(self._counts).difference(kept)
+        self._counts = dict((key, counts[key]) for key in kept)
+        self._errors = dict((key, errors[key]) for key in kept)
+        self._heap = [(count, key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+        return evicted
+
+    def most_common(self):
+        """List counted keys, ordered by count.
+
+        :returns: tuples of key and approximate count.
+        :rtype: ``list`` of ``tuple``
+
+        """
+        return [(key, ApproximateCount(count, self._errors[key]))
+                for key, count in sorted(self._counts.items(),
+                                         key=lambda item: item[1],
+                                         reverse=True)]
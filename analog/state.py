@@ -0,0 +1,147 @@
+"""Analog state of incremental log analysis."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import os
+import pickle
+import tempfile
+
+from analog import LOG
+from analog.readers import last_line_end
+
+
+#: Version of the state file layout.
+STATE_VERSION = 1
+#: Number of bytes before the stored offset compared to detect rewritten logs.
+TAIL_SIZE = 64
+
+
+class State(object):
+
+    """Progress of the incremental analysis of a logfile.
+
+    Records the logfile (by device and inode) that was analyzed, the byte offset
+    up to which it was analyzed and the report of all log entries analyzed so
+    far. Every run continues at the stored offset and merges the new log entries
+    into the stored report. The stored report grows with the analyzed log
+    entries unless its statistics and path counts are bounded, using the
+    ``ddsketch`` statistics backend and ``top_paths``.
+
+    A state is only valid for the analyzer configuration it was created with,
+    identified by ``key``.
+
+    """
+
+    def __init__(self, key):
+        """Create state of a logfile not analyzed yet.
+
+        :param key: identifier of the analyzer configuration.
+        :type key: ``str``
+
+        """
+        self.key = key
+        self.device = None
+        self.inode = None
+        self.offset = 0
+        self.tail = b''
+        self.report = None
+
+    @classmethod
+    def load(cls, path, key):
+        """Load state from file ``path``.
+
+        If the file does not exist, cannot be read or was saved for another
+        analyzer configuration, a new state is returned.
+
+        :param path: path of the state file.
+        :type path: ``str``
+        :param key: identifier of the analyzer configuration.
+        :type key: ``str``
+        :returns: loaded or new state.
+        :rtype: :py:class:`analog.state.State`
+
+        """
+        state = cls(key)
+        try:
+            with open(path, 'rb') as fp:
+                data = pickle.load(fp)
+        except (IOError, OSError):
+            return state
+        except Exception:
+            LOG.warning("Ignoring unreadable state file %s.", path)
+            return state
+        if (not isinstance(data, dict) or
+                data.get('version') != STATE_VERSION or
+                data.get('key') != key):
+            return state
+        state.device = data['device']
+        state.inode = data['inode']
+        state.offset = data['offset']
+        state.tail = data['tail']
+        state.report = data['report']
+        return state
+
+    def save(self, path):
+        """Save state to file ``path``, replacing it atomically.
+
+        :param path: path of the state file.
+        :type path: ``str``
+
+        """
+        data = {
+            'version': STATE_VERSION,
+            'key': self.key,
+            'device': self.device,
+            'inode': self.inode,
+            'offset': self.offset,
+            'tail': self.tail,
+            'report': self.report,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as fp:
+            pickle.dump(data, fp, pickle.HIGHEST_PROTOCOL)
+        getattr(os, 'replace', os.rename)(fp.name, path)
+
+    def resume(self, log):
+        """Find the byte range of ``log`` not analyzed yet.
+
+        Starts over at the beginning of ``log`` if it is another file than last
+        time (e.g. after logrotate moved it) or if it was truncated or
+        rewritten since.
+
+        :param log: seekable binary handle on logfile.
+        :returns: tuple of start and end byte offset of the complete lines not
+            analyzed yet.
+        :rtype: ``tuple``
+
+        """
+        info = os.fstat(log.fileno())
+        if ((info.st_dev, info.st_ino) != (self.device, self.inode) or
+                info.st_size < self.offset or
+                _read_at(log, self.offset - len(self.tail),
+                         len(self.tail)) != self.tail):
+            self.device, self.inode = info.st_dev, info.st_ino
+            self.offset = 0
+            self.tail = b''
+            self.report = None
+        return self.offset, last_line_end(log, self.offset, info.st_size)
+
+    def advance(self, log, offset, report):
+        """Record analysis of ``log`` up to byte ``offset`` into ``report``.
+
+        :param log: seekable binary handle on logfile.
+        :param offset: byte offset analysis stopped at.
+        :type offset: ``int``
+        :param report: report of all log entries analyzed so far.
+        :type report: :py:class:`analog.report.Report`
+
+        """
+        start = max(offset - TAIL_SIZE, 0)
+        self.tail = _read_at(log, start, offset - start)
+        self.offset = offset
+        self.report = report
+
+
+def _read_at(log, offset, size):
+    """Read ``size`` bytes of binary ``log`` at byte ``offset``."""
+    log.seek(offset)
+    return log.read(size)
@@ -2,10 +2,28 @@
 
 This is a partial backport of Python 3.4's statistics module.
 
+The functions work directly on typed :py:class:`array.array` buffers as well.
+If NumPy is available, the median and percentiles of typed buffers are selected
+from a contiguous copy of the buffer without converting every value to a Python
+object. NumPy is only imported once they are computed for a typed buffer.
+
 """
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+from array import array
+from fractions import Fraction
+from itertools import chain
 import math
+try:
+    from statistics import mean as _exact_mean
+except ImportError:  # Python 2.7
+    _exact_mean = None
+
+
+#: NumPy module once imported, ``False`` if it is not available.
+_numpy = None
+#: ``array`` typecodes of integer values.
+INTEGER_TYPECODES = frozenset('bBhHiIlLqQ')
 
 
 class StatisticsError(ValueError):
@@ -29,12 +47,25 @@ def mean(data):
 
     If ``data`` is empty, StatisticsError will be raised.
 
+    The mean is exact and keeps the type of the data where possible, like
+    Python 3.4's ``statistics.mean``. Typed buffers of integers are summed as
+    integers, their mean is an ``int`` if it is a whole number. The exact sum
+    of typed buffers of floats is collected from a few ``math.fsum`` passes,
+    see :py:func:`_float_mean`.
+
     """
     if iter(data) is data:
         data = list(data)
     n = len(data)
     if n < 1:
         raise StatisticsError('mean requires at least one data point')
+    if isinstance(data, array) and data.typecode in INTEGER_TYPECODES:
+        total = sum(data)
+        return total // n if total % n == 0 else total / n
+    if isinstance(data, array):
+        return _float_mean(data)
+    if _exact_mean is not None:
+        return _exact_mean(data)
     return math.fsum(data) / n
 
 
@@ -51,12 +82,144 @@ def median(data):
     4.0
 
     """
-    data = sorted(data)
     n = len(data)
     if n == 0:
         raise StatisticsError("no median for empty data")
+    if isinstance(data, array) and _import_numpy():
+        return _numpy_median(data)
+    data = sorted(data)
     if n % 2 == 1:
         return data[n // 2]
     else:
         i = n//2
         return (data[i - 1] + data[i]) / 2
+
+
+def percentiles(data, percents):
+    """Return the percentiles ``percents`` (0 to 100) of numeric data.
+
+    Percentiles are interpolated linearly between the two closest data points,
+    so the 50th percentile equals the median:
+
+    >>> percentiles([1, 2, 3, 4], [25, 50, 100])
+    [1.75, 2.5, 4]
+
+    All percentiles are selected in one pass: typed buffers are partitioned
+    once at every needed position with NumPy if available, other data is
+    sorted once.
+
+    :param data: numeric data points.
+    :param percents: percentiles to compute, between 0 and 100.
+    :type percents: ``list`` of ``float``
+    :returns: percentile values in the order of ``percents``.
+    :rtype: ``list``
+
+    """
+    n = len(data)
+    if n == 0:
+        raise StatisticsError("no percentiles for empty data")
+    # position of each percentile in sorted data, split into index and fraction
+    positions = []
+    needed = set()
+    for percent in percents:
+        if not 0 <= percent <= 100:
+            raise StatisticsError(
+                "percentile {0} not between 0 and 100".format(percent))
+        position = percent / 100 * (n - 1)
+        index = int(position)
+        positions.append((index, position - index))
+        needed.add(index)
+        if position > index:
+            needed.add(index + 1)
+    if isinstance(data, array) and _import_numpy():
+        numpy = _import_numpy()
+        kth = sorted(needed)
+        values = numpy.partition(
+            numpy.frombuffer(data, dtype=data.typecode), kth)
+        values = dict((index, values[index].item()) for index in kth)
+    else:
+        values = sorted(data)
+    return [values[index] * (1 - fraction) + values[index + 1] * fraction
+            if fraction else values[index]
+            for index, fraction in positions]
+
+
+def _float_mean(data):
+    """Return the exact mean of a typed buffer of floats, rounded once.
+
+    The exact sum of the values is collected as partial sums, see
+    :py:func:`_exact_partials`, which is divided by their number as a fraction.
+
+    """
+    return _partials_mean(_exact_partials(data), len(data))
+
+
+def _exact_partials(data):
+    """Return partial sums adding up to the exact sum of ``data``.
+
+    ``math.fsum`` rounds the sum of all values once. Summing the values again
+    together with the negated partial sums collected so far yields the rounded
+    remainder, until nothing remains.
+
+    :param data: sequence of floats.
+    :returns: partial sums, only the rounded sum if it is not finite.
+    :rtype: ``list`` of ``float``
+
+    """
+    partials = [math.fsum(data)]
+    if not math.isinf(partials[0]) and not math.isnan(partials[0]):
+        while True:
+            remainder = math.fsum(
+                chain(data, [-partial for partial in partials]))
+            if not remainder:
+                break
+            partials.append(remainder)
+    return partials
+
+
+def _partials_mean(partials, n):
+    """Return the mean of ``n`` values summing up to ``partials``, rounded once.
+
+    :param partials: partial sums of the values.
+    :type partials: ``list`` of ``float``
+    :param n: number of values.
+    :type n: ``int``
+
+    """
+    if len(partials) == 1:
+        return partials[0] / n
+    return float(sum(map(Fraction, partials)) / n)
+
+
+def _import_numpy():
+    """Import NumPy on first use, it is slow to import.
+
+    :returns: the ``numpy`` module or ``False`` if it is not available.
+
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+
+def _numpy_median(data):
+    """Return the median of a typed buffer using NumPy partitioning.
+
+    Only the middle data point(s) are selected instead of sorting all values.
+    They are converted back to Python numbers to return the same types as
+    :py:func:`analog.statistics.median`.
+
+    """
+    n = len(data)
+    i = n // 2
+    numpy = _import_numpy()
+    values = numpy.frombuffer(data, dtype=data.typecode)
+    if n % 2 == 1:
+        return numpy.partition(values, i)[i].item()
+    values = numpy.partition(values, (i - 1, i))
+    return (values[i - 1].item() + values[i].item()) / 2
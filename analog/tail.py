@@ -0,0 +1,210 @@
+"""Analog logfile tailing."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import io
+import os
+import select
+import struct
+import sys
+import time
+
+from analog.readers import split_lines
+
+
+#: Seconds between checks for new log entries without inotify.
+POLL_INTERVAL = 1.0
+#: inotify events of directory entries that may change the followed logfile:
+#: ``IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE``.
+INOTIFY_MASK = 0x002 | 0x040 | 0x080 | 0x100 | 0x200
+#: Layout of ``struct inotify_event`` without its name: wd, mask, cookie, len.
+INOTIFY_EVENT = struct.Struct(str('iIII'))
+
+
+class Tail(object):
+
+    """Read the log lines appended to a logfile.
+
+    Like ``tail -F``, the logfile is followed by name: if it is truncated, it is
+    read from the start again and if it is replaced (e.g. by logrotate), the
+    rest of the old file and then the new file are read.
+
+    """
+
+    def __init__(self, path):
+        """Open logfile ``path`` at its end.
+
+        :param path: path of the logfile.
+        :type path: ``str``
+
+        """
+        self.path = path
+        self._log = io.open(path, 'rb')
+        self._log.seek(0, os.SEEK_END)
+        self._pending = b''
+
+    def _replaced(self):
+        """Check if ``path`` refers to another file than the open one."""
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            # moved away and not yet recreated
+            return False
+        current = os.fstat(self._log.fileno())
+        return (info.st_dev, info.st_ino) != (current.st_dev, current.st_ino)
+
+    def read_lines(self, sizes=False):
+        """Read all complete lines appended since the last call.
+
+        :param sizes: return tuples of each line and its size in bytes
+            including the line ending.
+        :type sizes: ``bool``
+        :returns: log lines without line endings.
+        :rtype: ``list`` of ``bytes`` or ``tuple``
+
+        """
+        lines = []
+        while True:
+            if os.fstat(self._log.fileno()).st_size < self._log.tell():
+                # truncated
+                self._log.seek(0)
+                self._pending = b''
+            data = self._log.read()
+            if data:
+                lines.extend(split_lines(self._pending + data, sizes))
+                self._pending = lines.pop()
+            if not self._replaced():
+                return lines
+            # continue with the new file after reading the rest of the old one
+            self._log.close()
+            self._log = io.open(self.path, 'rb')
+            self._pending = b''
+
+    def close(self):
+        """Close the logfile."""
+        self._log.close()
+
+
+class PollingWatcher(object):
+
+    """Wait for changes of a logfile by checking it regularly."""
+
+    def __init__(self, path):
+        """Watch logfile ``path``.
+
+        :param path: path of the logfile.
+        :type path: ``str``
+
+        """
+        self.path = path
+
+    def wait(self, timeout):
+        """Wait until the logfile may have changed.
+
+        :param timeout: maximum number of seconds to wait.
+        :type timeout: ``float``
+        :returns: ``True`` if the logfile may have changed.
+        :rtype: ``bool``
+
+        """
+        time.sleep(max(min(timeout, POLL_INTERVAL), 0))
+        return True
+
+    def close(self):
+        """Stop watching the logfile."""
+
+
+class InotifyWatcher(object):
+
+    """Wait for changes of a logfile with Linux inotify.
+
+    The directory of the logfile is watched, so that replacing the logfile is
+    noticed as well.
+
+    """
+
+    def __init__(self, path):
+        """Watch logfile ``path``.
+
+        :param path: path of the logfile.
+        :type path: ``str``
+        :raises: :py:class:`OSError` if inotify is not available.
+
+        """
+        self.path = path
+        directory, name = os.path.split(os.path.abspath(path))
+        encoding = sys.getfilesystemencoding()
+        self._name = name.encode(encoding)
+        libc = _libc()
+        if libc is None:
+            raise OSError("inotify is not available.")
+        import ctypes
+        self._fd = libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed.")
+        if libc.inotify_add_watch(self._fd, directory.encode(encoding),
+                                  INOTIFY_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, "inotify_add_watch failed.")
+
+    def wait(self, timeout):
+        """Wait until the logfile changed.
+
+        :param timeout: maximum number of seconds to wait.
+        :type timeout: ``float``
+        :returns: ``True`` if the logfile changed.
+        :rtype: ``bool``
+
+        """
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not readable:
+            return False
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        changed = False
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            if data[offset:offset + length].rstrip(b'\0') == self._name:
+                changed = True
+            offset += length
+        return changed
+
+    def close(self):
+        """Stop watching the logfile."""
+        os.close(self._fd)
+
+
+def _libc():
+    """Load the C library if it provides inotify."""
+    if not sys.platform.startswith('linux'):
+        return None
+    # only import ctypes when following logfiles, it is slow to import
+    try:
+        import ctypes
+        import ctypes.util
+    except ImportError:  # pragma: no cover
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, 'inotify_init'):
+        return None
+    return libc
+
+
+def watch(path):
+    """Watch logfile ``path`` for changes.
+
+    :param path: path of the logfile.
+    :type path: ``str``
+    :returns: inotify watcher on Linux, polling watcher everywhere else.
+    :rtype: :py:class:`analog.tail.InotifyWatcher` or
+        :py:class:`analog.tail.PollingWatcher`
+
+    """
+    try:
+        return InotifyWatcher(path)
+    except OSError:
+        return PollingWatcher(path)
@@ -1,3 +1,40 @@
 """Analog tests."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import datetime
+
+from analog.formats import NGINX
+
+
+#: Nginx log line with the fields of :py:func:`analog.tests.write_log`.
+NGINX_LINE = ('123.123.123.123 - - [{timestamp}] '
+              '"{verb} {path} HTTP/1.1" {status} {body_bytes} "-" '
+              '"UAString" "-" {request_time} {upstream_time}\n')
+
+
+def write_log(logfile, minutes, entry, malformatted=False):
+    """Write an nginx log entry per minute ago into ``logfile``.
+
+    :param logfile: temporary logfile.
+    :type logfile: ``py.path.local``
+    :param minutes: minutes before now to log entries at, in order.
+    :type minutes: ``iterable`` of ``int``
+    :param entry: function returning the fields of the log entry of a
+        minute, overriding the defaults of ``GET /`` with status 200.
+    :type entry: ``function``
+    :param malformatted: follow each log entry by a malformatted line.
+    :type malformatted: ``bool``
+
+    """
+    now = datetime.datetime.now()
+    with logfile.open('w') as log:
+        for minute in minutes:
+            fields = {'verb': 'GET', 'path': '/', 'status': 200,
+                      'body_bytes': 110, 'request_time': '0.312',
+                      'upstream_time': '0.312'}
+            fields.update(entry(minute))
+            date = now - datetime.timedelta(minutes=minute)
+            log.write(NGINX_LINE.format(
+                timestamp=date.strftime(NGINX.time_format), **fields))
+            if malformatted:
+                log.write('malformatted entry\n')
@@ -2,6 +2,8 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import datetime
+import gzip
+import json
 import sys
 import tempfile
 try:
@@ -11,9 +13,10 @@ except ImportError:
 
 import pytest
 
-from analog import analyzer
-from analog.exceptions import MissingFormatError
+from analog import analyzer, renderers
+from analog.exceptions import InvalidFollowError, MissingFormatError
 from analog.formats import NGINX
+from analog.tests import write_log
 
 
 PY3 = sys.version_info[0] == 3
@@ -37,14 +40,16 @@ def test_analyze(capsys):
         log=log, format='nginx', pattern=None, time_format=None,
         verbs=analyzer.DEFAULT_VERBS,
         status_codes=analyzer.DEFAULT_STATUS_CODES,
-        paths=analyzer.DEFAULT_PATHS, max_age=None, path_stats=False)
+        paths=analyzer.DEFAULT_PATHS, max_age=None, path_stats=False, jobs=1,
+        stats_backend='exact', state=None, bucket=None, top_paths=None,
+        path_templates=None, normalize_ids=False, timing=False, since=None,
+        until=None, index=None, cache=False, percentiles=())
     assert mock_report.mock_calls[:2] == [
         # analyzer was executed to retreve a report
         mock.call(),
-        # timing was printed
-        # mock.call().execution_time.__str__,
-        # report.render called
-        mock.call().render(path_stats=False, output_format=None),
+        # report written to stdout
+        mock.call().render_to(sys.stdout, path_stats=False,
+                              output_format=None),
     ]
 
 
@@ -81,17 +86,38 @@ class TestAnalyzer():
 
     def test_monitor_path(self):
         """Full paths are converted to monitored paths."""
-        with mock.patch.object(self.analyzer, '_pathconf',
-                               ['/foo/bar', '/auth']):
-            assert self.analyzer._monitor_path('/auth/token') == '/auth'
-            assert self.analyzer._monitor_path('/foo') is None
-            assert self.analyzer._monitor_path('/foo/bar/baz') == '/foo/bar'
+        anginx = analyzer.Analyzer(log=self.log, format='nginx',
+                                   paths=['/foo/bar', '/auth'])
+        assert anginx._monitor_path('/auth/token') == '/auth'
+        assert anginx._monitor_path('/foo') is None
+        assert anginx._monitor_path('/foo/bar/baz') == '/foo/bar'
 
         # if no paths are defined, all pathes will be monitored as is
-        with mock.patch.object(self.analyzer, '_pathconf', []):
-            assert self.analyzer._monitor_path('/auth/token') == '/auth/token'
-            assert self.analyzer._monitor_path('/foo') == '/foo'
-            assert self.analyzer._monitor_path('/foo/bar/baz') == '/foo/bar/baz'
+        anginx = analyzer.Analyzer(log=self.log, format='nginx', paths=[])
+        assert anginx._monitor_path('/auth/token') == '/auth/token'
+        assert anginx._monitor_path('/foo') == '/foo'
+        assert anginx._monitor_path('/foo/bar/baz') == '/foo/bar/baz'
+
+    def test_path_templates(self):
+        """Paths are normalized to path templates before being monitored."""
+        anginx = analyzer.Analyzer(
+            log=self.log, format='nginx', normalize_ids=True,
+            path_templates=[r'/auth/(?P<endpoint>\w+)'])
+        assert anginx._monitor_path('/users/12/orders') == '/users/{id}/orders'
+        assert anginx._monitor_path('/auth/token') == '/auth/{endpoint}'
+
+        anginx = analyzer.Analyzer(log=self.log, format='nginx',
+                                   paths=['/users/{id}/orders'],
+                                   normalize_ids=True)
+        assert anginx._monitor_path('/users/12/orders/3') == (
+            '/users/{id}/orders')
+        assert anginx._monitor_path('/users/12') is None
+
+        report = analyzer.Analyzer(
+            log=self.log, format='nginx',
+            path_templates=[r'/sub/(?P<folder>[^/]+)'])()
+        assert sorted(report.path_requests) == [('/auth/token', 1),
+                                                ('/sub/{folder}', 1)]
 
     def test_timestamp(self):
         """Timestamp strings from log entries can be converted to datetimes."""
@@ -179,3 +205,253 @@ class TestAnalyzer():
         assert report.requests == 2
         assert (sorted(report._path_requests.keys()) ==
                 ['/auth', '/sub/folder'])
+
+
+def test_seek_max_age(tmpdir):
+    """Seekable logfiles are bisected to the start of the max-age window."""
+    logfile = tmpdir.join('access.log')
+    write_log(logfile, range(120, 0, -1),
+              lambda minutes: {'path': '/minute/{}'.format(minutes)})
+
+    with logfile.open('r') as log:
+        amaxage = analyzer.Analyzer(log, format='nginx', max_age=10)
+        with mock.patch.object(amaxage, '_timestamp',
+                               wraps=amaxage._timestamp) as mock_timestamp:
+            report = amaxage()
+    # only a few bisection probes instead of parsing every entry's timestamp
+    assert mock_timestamp.call_count < 40
+    assert report.requests == 10
+    assert sorted(report._path_requests.keys()) == sorted(
+        '/minute/{}'.format(minutes) for minutes in range(10, 0, -1))
+
+    # the same logfile as non-seekable stream is analyzed linearly
+    with logfile.open('r') as log:
+        report = analyzer.Analyzer(iter(log.readlines()), format='nginx',
+                                   max_age=10)()
+    assert report.requests == 10
+
+
+def test_parallel_jobs(tmpdir):
+    """Regular logfiles can be analyzed in chunks by parallel processes."""
+    logfile = tmpdir.join('access.log')
+    write_log(logfile, range(90, -3, -1), lambda minutes: {
+        'verb': ('GET', 'POST', 'PUT')[minutes % 3],
+        'path': '/path/{}'.format(minutes % 7),
+        'status': (200, 404, 500, 302)[minutes % 4],
+        'body_bytes': minutes * 13,
+        'request_time': '0.{:03d}'.format(minutes * 7 % 1000),
+        'upstream_time': '0.{:03d}'.format(minutes * 5 % 1000),
+    }, malformatted=True)
+
+    for max_age in (None, 30):
+        with logfile.open('r') as log:
+            single = analyzer.Analyzer(log, format='nginx', max_age=max_age)()
+        with logfile.open('r') as log:
+            parallel = analyzer.Analyzer(log, format='nginx', max_age=max_age,
+                                         jobs=4)
+            with mock.patch.object(parallel, '_analyze') as mock_analyze:
+                parallel = parallel()
+            # all the work was done in worker processes
+            assert not mock_analyze.called
+        assert parallel.requests == single.requests
+        for output_format in renderers.Renderer.all_renderers():
+            assert (parallel.render(path_stats=True,
+                                    output_format=output_format) ==
+                    single.render(path_stats=True,
+                                  output_format=output_format))
+
+
+def test_timing(tmpdir, capsys):
+    """Analysis stages are timed and lines counted with ``timing``."""
+    logfile = tmpdir.join('access.log')
+    write_log(logfile, range(20, 0, -1), lambda minutes: {
+        'verb': ('GET', 'TRACE')[minutes % 2],
+        'path': '/{}/item'.format(('api', 'static')[minutes % 5 == 0]),
+        'body_bytes': 100,
+        'request_time': '0.100',
+        'upstream_time': '0.090',
+    }, malformatted=True)
+    size = logfile.size()
+
+    for jobs in (1, 2):
+        with logfile.open('r') as log:
+            anginx = analyzer.Analyzer(log, format='nginx', paths=['/api'],
+                                       jobs=jobs, timing=True)
+            report = anginx()
+        timing = anginx.timing
+        assert timing.lines_read == 40
+        assert timing.lines_matched == 20
+        # 4 paths not monitored, 8 untracked TRACE requests
+        assert timing.lines_skipped == 12
+        assert report.requests == 8
+        assert timing.bytes_read == size
+        for stage in ('read', 'match', 'filter', 'entry', 'add'):
+            assert timing.stages[stage] > 0
+        # timestamps are only parsed for max_age or buckets
+        assert timing.stages['timestamp'] == 0
+
+    with logfile.open('r') as log:
+        analyzer.analyze(log, format='nginx', timing=True,
+                         timing_format='json', output_format='csv')
+    out, err = capsys.readouterr()
+    data = json.loads(err)
+    assert data['lines_read'] == 40
+    assert data['stages']['stats'] > 0
+    assert data['stages']['render'] > 0
+    # report output is kept clean
+    assert 'lines_read' not in out
+
+
+def test_timestamp_cache():
+    """The last converted timestamp is reused for identical timestamps."""
+    anginx = analyzer.Analyzer([], format='nginx')
+    with mock.patch.object(NGINX, 'parse_time',
+                           wraps=NGINX.parse_time) as mock_parse_time:
+        for _ in range(3):
+            assert (anginx._timestamp('16/Jan/2014:13:30:30 +0000') ==
+                    datetime.datetime(2014, 1, 16, 13, 30, 30))
+        assert (anginx._timestamp('16/Jan/2014:13:30:31 +0000') ==
+                datetime.datetime(2014, 1, 16, 13, 30, 31))
+    assert mock_parse_time.call_count == 2
+
+
+def test_time_buckets(tmpdir):
+    """Log entries are counted per time bucket of their timestamp."""
+    logfile = tmpdir.join('access.log')
+    with logfile.open('w') as log:
+        for seconds in range(0, 900, 20):
+            log.write(
+                '123.123.123.123 - - [16/Jan/2014:13:{:02d}:{:02d} +0000] '
+                '"GET /path HTTP/1.1" {} 100 "-" "UA" "-" 0.100 0.050\n'
+                ''.format(seconds // 60, seconds % 60,
+                          200 if seconds % 300 else 500))
+
+    with logfile.open('rb') as log:
+        report = analyzer.Analyzer(log, format='nginx', bucket='5min')()
+    assert report.requests == 45
+    start = datetime.datetime(2014, 1, 16, 13, 0, tzinfo=NGINX.parse_time(
+        '16/Jan/2014:13:00:00 +0000').tzinfo)
+    assert list(report.buckets) == [
+        start + datetime.timedelta(minutes=minutes) for minutes in (0, 5, 10)]
+    for bucket in report.buckets.values():
+        assert bucket.requests == 15
+        assert dict(bucket.status)['5'] == 1
+        assert bucket.times.mean == pytest.approx(0.1)
+
+    # parallel jobs merge the buckets of their chunks
+    with logfile.open('rb') as log:
+        parallel = analyzer.Analyzer(log, format='nginx', bucket='5min',
+                                     jobs=2)()
+    assert (parallel.render(path_stats=False, output_format='series') ==
+            report.render(path_stats=False, output_format='series'))
+
+
+def test_undecodable_log(tmpdir):
+    """Invalid characters in logfiles do not fail the analysis."""
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(
+        b'123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        b'"GET /caf\xe9 HTTP/1.1" 200 110 "-" "UA \xff\xfe" "-" 0.312 0.312\n'
+        b'123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        b'"GET /foo HTTP/1.1" 200 110 "-" "UA" "-" 0.312 0.312\n')
+    for mode in ('r', 'rb'):
+        with logfile.open(mode) as log:
+            report = analyzer.Analyzer(log, format='nginx')()
+        assert report.requests == 2
+        assert (sorted(report._path_requests.keys()) ==
+                ['/caf\ufffd', '/foo'])
+
+
+def test_crlf_log(tmpdir):
+    """Logfiles with CRLF line endings are analyzed like text files."""
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(
+        b'123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        b'"GET /foo HTTP/1.1" 200 110 "-" "UA" "-" 0.312 0.312\r\n' * 3)
+    for mode in ('r', 'rb'):
+        with logfile.open(mode) as log:
+            report = analyzer.Analyzer(log, format='nginx')()
+        assert report.requests == 3
+        assert report.path_requests == [('/foo', 3)]
+
+    # bytes read include the carriage returns
+    with logfile.open('rb') as log:
+        anginx = analyzer.Analyzer(log, format='nginx', timing=True)
+        anginx()
+    assert anginx.timing.bytes_read == logfile.size()
+
+
+def test_compressed_log(tmpdir):
+    """Compressed logfiles are analyzed like uncompressed ones."""
+    logfile = tmpdir.join('access.log')
+    write_log(logfile, range(60, 0, -1),
+              lambda minutes: {'path': '/minute/{}'.format(minutes % 5)})
+    compressed = tmpdir.join('access.log.1.gz')
+    compressed.write_binary(gzip.compress(logfile.read_binary()))
+
+    for max_age in (None, 10):
+        with logfile.open('rb') as log:
+            expected = analyzer.Analyzer(log, format='nginx', max_age=max_age)()
+        # compressed logfiles are neither bisected nor split into jobs
+        with compressed.open('rb') as log:
+            report = analyzer.Analyzer(log, format='nginx', max_age=max_age,
+                                       jobs=4)()
+        assert report.requests == expected.requests
+        assert (report.render(path_stats=True, output_format='plain') ==
+                expected.render(path_stats=True, output_format='plain'))
+
+
+FOLLOW_LINE = (
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /path/{0} HTTP/1.1" 200 110 "-" "UA" "-" 0.{0:03d} 0.001\n')
+
+
+def follow_lines(start, stop):
+    """Log lines for paths ``/path/<start>`` to ``/path/<stop - 1>``."""
+    return ''.join(FOLLOW_LINE.format(number) for number in range(start, stop))
+
+
+def test_follow_window(tmpdir):
+    """Following yields reports of the last window every interval."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(follow_lines(0, 10))
+    with logfile.open('rb') as log:
+        afollow = analyzer.Analyzer(log, format='nginx')
+        reports = afollow.follow(interval=0.01, window=0.02)
+        # starts at the end of the logfile
+        assert next(reports).requests == 0
+        logfile.write(follow_lines(10, 13), mode='a')
+        assert next(reports).requests == 3
+        logfile.write(follow_lines(13, 15), mode='a')
+        report = next(reports)
+        assert report.requests == 5
+        assert sorted(report._path_requests) == sorted(
+            '/path/{0}'.format(number) for number in range(10, 15))
+        # the first interval left the window
+        assert next(reports).requests == 2
+        assert next(reports).requests == 0
+        reports.close()
+
+
+def test_follow_invalid(tmpdir):
+    """Only uncompressed logfiles can be followed for positive intervals."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(follow_lines(0, 10))
+    with logfile.open('rb') as log:
+        afollow = analyzer.Analyzer(log, format='nginx')
+        with pytest.raises(InvalidFollowError):
+            afollow.follow(interval=0, window=10)
+        with pytest.raises(InvalidFollowError):
+            afollow.follow(interval=10, window=5)
+        afollow = analyzer.Analyzer(log, format='nginx', max_age=10)
+        with pytest.raises(InvalidFollowError):
+            afollow.follow(interval=10, window=300)
+    with pytest.raises(InvalidFollowError):
+        analyzer.Analyzer(follow_lines(0, 10).splitlines(True),
+                          format='nginx').follow(interval=10, window=300)
+    compressed = tmpdir.join('access.log.gz')
+    compressed.write_binary(gzip.compress(follow_lines(0, 10).encode('utf-8')))
+    with compressed.open('rb') as log:
+        with pytest.raises(InvalidFollowError):
+            analyzer.Analyzer(log, format='nginx').follow(interval=10,
+                                                          window=300)
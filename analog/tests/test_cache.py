@@ -0,0 +1,175 @@
+"""Test the analog.cache module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import datetime
+import gzip
+import os
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from analog import analyzer
+from analog.cache import ParseCache, from_seconds, to_seconds
+from analog.exceptions import InvalidCacheError
+from analog.statistics import _import_numpy
+
+
+LINE = ('123.123.123.123 - - [16/Jan/2014:13:{0:02d}:{1:02d} +0000] '
+        '"{2} /path/{3} HTTP/1.1" {4} {5} "-" "UA" "-" 0.{6:03d} 0.001\n')
+
+
+def lines(start, stop):
+    """Log lines of minutes ``start`` to ``stop - 1``, malformed ones too."""
+    return ''.join(
+        LINE.format(minute, second, ('GET', 'POST', 'PUT')[second % 3],
+                    minute % 4, (200, 404, 500)[minute % 3], minute * 10,
+                    minute + second) + ('malformed\n' if second == 40 else '')
+        for minute in range(start, stop) for second in (0, 20, 40))
+
+
+def analyze(logfile, **kwargs):
+    """Analyze ``logfile``, rendering the report with path stats."""
+    with logfile.open('rb') as log:
+        report = analyzer.Analyzer(log, format='nginx', **kwargs)()
+    return report.render(path_stats=True, output_format='plain')
+
+
+def test_cache_columns(tmpdir):
+    """Log entries are parsed into columns of a memory-mapped cache file."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10))
+    analyze(logfile, cache=True)
+    assert tmpdir.join('access.log.cache').check()
+
+    with logfile.open('rb') as log:
+        anginx = analyzer.Analyzer(log, format='nginx')
+        cache = ParseCache.load(str(tmpdir.join('access.log.cache')), log,
+                                anginx._format_key())
+        assert ParseCache.load(str(tmpdir.join('access.log.cache')), log,
+                               '{}') is None
+    try:
+        assert len(cache) == 30
+        assert cache.paths == ['/path/0', '/path/1', '/path/2', '/path/3']
+        assert cache.verbs == ['GET', 'PUT', 'POST']
+        assert list(cache.rows())[4] == (
+            to_seconds(datetime.datetime(2014, 1, 16, 13, 1, 20)), 1, 1, 404,
+            0.021, 0.001, 10)
+        assert from_seconds(cache.columns['timestamp'][0]) == (
+            datetime.datetime(2014, 1, 16, 13, 0, 0))
+    finally:
+        cache.close()
+    assert cache.columns == {}
+
+
+def test_cached_analysis(tmpdir):
+    """Reports from the cache equal reports from parsing the logfile."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 30))
+    options = (
+        {},
+        {'paths': ['/path/1', '/path/3']},
+        {'verbs': ['POST'], 'status_codes': [4]},
+        {'path_templates': [r'/path/(?P<number>\d+)']},
+        {'since': datetime.datetime(2014, 1, 16, 13, 5, 20),
+         'until': datetime.datetime(2014, 1, 16, 13, 7)},
+        {'bucket': 'minute'},
+    )
+    for kwargs in options:
+        assert analyze(logfile, cache=True, **kwargs) == analyze(logfile,
+                                                                 **kwargs)
+
+    # cached runs do not parse the logfile
+    with mock.patch('analog.cache.read_lines') as mock_read_lines:
+        analyze(logfile, cache=True)
+    assert not mock_read_lines.called
+    # nor add the log entries one by one
+    if _import_numpy():
+        with mock.patch('analog.report.BatchReport.add') as mock_add:
+            analyze(logfile, cache=True, since=datetime.datetime(2014, 1, 1))
+        assert not mock_add.called
+
+
+def test_cache_status_codes(tmpdir):
+    """Status codes beyond 16 bits are cached, invalid ones are not."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10) +
+                  LINE.format(10, 0, 'GET', 1, 70000, 1, 0) +
+                  LINE.format(10, 20, 'GET', 2, 2 ** 40, 1, 0))
+    options = {'status_codes': [2, 7]}
+    assert analyze(logfile, cache=True, **options) == analyze(logfile,
+                                                              **options)
+    with logfile.open('rb') as log:
+        anginx = analyzer.Analyzer(log, format='nginx')
+        cache = ParseCache.load(str(tmpdir.join('access.log.cache')), log,
+                                anginx._format_key())
+    try:
+        assert len(cache) == 31
+        assert cache.columns['status'][30] == 70000
+    finally:
+        cache.close()
+
+
+def test_cache_invalidation(tmpdir):
+    """Caches are recreated if the logfile changed."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10))
+    analyze(logfile, cache=True)
+
+    def parsed():
+        with mock.patch('analog.cache.read_lines',
+                        wraps=analyzer.read_lines) as mock_read_lines:
+            report = analyze(logfile, cache=True)
+        assert report == analyze(logfile)
+        return mock_read_lines.called
+
+    assert not parsed()
+    # grown
+    logfile.write(lines(10, 12), mode='a')
+    assert parsed()
+    assert not parsed()
+    # modified in place
+    stat = os.stat(str(logfile))
+    os.utime(str(logfile), (stat.st_atime, stat.st_mtime + 10))
+    assert parsed()
+    # replaced by logrotate
+    logfile.rename(tmpdir.join('access.log.1'))
+    logfile.write(lines(0, 12))
+    assert parsed()
+    assert not parsed()
+    # written for another log format
+    with logfile.open('rb') as log:
+        analyzer.Analyzer(
+            log, format='custom', pattern=analyzer.LogFormat.all_formats()[
+                'nginx'].pattern.pattern,
+            time_format='%d/%b/%Y:%H:%M:%S +0000', cache=True)()
+    assert parsed()
+
+
+def test_invalid_cache(tmpdir):
+    """Only regular, uncompressed logfiles can be cached."""
+    compressed = tmpdir.join('access.log.gz')
+    compressed.write_binary(gzip.compress(lines(0, 10).encode('utf-8')))
+    with pytest.raises(InvalidCacheError):
+        analyze(compressed, cache=True)
+    with pytest.raises(InvalidCacheError):
+        analyzer.Analyzer(lines(0, 10).splitlines(True), format='nginx',
+                          cache=True)()
+    with pytest.raises(InvalidCacheError):
+        analyzer.Analyzer([], format='nginx', cache=True,
+                          state=str(tmpdir.join('state')))
+
+    # unwritable cache files are skipped
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10))
+    with mock.patch.object(ParseCache, 'create', side_effect=IOError):
+        assert analyze(logfile, cache=True) == analyze(logfile)
+    # unreadable cache files are replaced
+    tmpdir.join('access.log.cache').write_binary(b'garbage')
+    assert analyze(logfile, cache=True) == analyze(logfile)
+    assert tmpdir.join('access.log.cache').read_binary() != b'garbage'
+    # no temporary files are left behind
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'access.log', 'access.log.cache', 'access.log.gz']
@@ -6,7 +6,8 @@ import datetime
 import pytest
 
 from analog.exceptions import InvalidFormatExpressionError
-from analog.formats import LogFormat, NGINX
+from analog.formats import (LogFormat, NGINX, time_parser, tokenize_nginx,
+                            tokenize_nginx_bytes)
 
 
 def test_predefined_valid_nginx():
@@ -62,3 +63,120 @@ def test_custom_logformat_invalid_regex():
     with pytest.raises(InvalidFormatExpressionError) as exc:
         LogFormat('invalid', pattern_regex, time_format)
     assert 'Invalid regex in format.' in str(exc)
+
+
+def test_time_parser():
+    """nginx timestamps are parsed by position, others with ``strptime``."""
+    parse_time = time_parser(NGINX.time_format)
+    assert parse_time.__name__ == 'parse_nginx_time'
+    assert (parse_time('16/Jan/2014:13:30:30 +0000') ==
+            datetime.datetime(2014, 1, 16, 13, 30, 30))
+    assert (parse_time('29/Feb/2016:00:00:59 +0000') ==
+            datetime.datetime(2016, 2, 29, 0, 0, 59))
+    # timestamps not matching the layout exactly fall back to strptime
+    assert (parse_time('6/Jan/2014:13:30:30 +0000') ==
+            datetime.datetime(2014, 1, 6, 13, 30, 30))
+    for invalid in ('16/Foo/2014:13:30:30 +0000', '16/Jan/2014:13:30:30 +0100',
+                    '30/Feb/2014:13:30:30 +0000', '16/Jan/2014 13:30:30 +0000',
+                    ''):
+        with pytest.raises(ValueError):
+            parse_time(invalid)
+
+    # timezone offsets are parsed for %z
+    time_format = '%d/%b/%Y:%H:%M:%S %z'
+    parse_time = time_parser(time_format)
+    for time_str in ('16/Jan/2014:13:30:30 +0000', '16/Jan/2014:13:30:30 -0130',
+                     '16/Jan/2014:13:30:30 +00:00'):
+        assert parse_time(time_str) == datetime.datetime.strptime(
+            time_str, time_format)
+    assert parse_time('16/Jan/2014:13:30:30 -0130').utcoffset() == (
+        -datetime.timedelta(hours=1, minutes=30))
+
+    # other formats are parsed with strptime
+    parse_time = time_parser('%Y-%m-%dT%H:%M:%S')
+    assert (parse_time('2014-01-16T13:30:30') ==
+            datetime.datetime(2014, 1, 16, 13, 30, 30))
+
+
+def test_extractor():
+    """``LogFormat.extractor`` only captures the requested fields."""
+    log_line = ('123.123.123.123 - test_client [16/Jan/2014:13:30:30 +0000] '
+                '"POST /auth/token?foo=bar HTTP/1.1" 200 174 "-" '
+                '"OAuthClient 0.2.3" "-" 0.633 0.633')
+    extract = NGINX.extractor(('status', 'path', 'request_time'))
+    assert extract(log_line) == ('200', '/auth/token', '0.633')
+    assert extract('malformatted entry') is None
+    # single fields are extracted as tuple too
+    extract = NGINX.extractor(('timestamp',))
+    assert extract(log_line) == ('16/Jan/2014:13:30:30 +0000',)
+
+    # undecoded lines only have their text fields decoded, invalid characters
+    # are replaced, numeric fields are left as bytes
+    extract = NGINX.extractor(('status', 'path', 'request_time'), 'utf-8')
+    binary_line = log_line.replace('token', 't\xf6ken').encode('latin-1')
+    assert extract(binary_line) == (b'200', '/auth/t\ufffdken', b'0.633')
+    assert extract(b'malformatted entry') is None
+    extract = NGINX.extractor(('path',), 'latin-1')
+    assert extract(binary_line) == ('/auth/t\xf6ken',)
+
+    # unused groups are not captured, unless referenced
+    log_format = LogFormat('backreference', r'''
+        (?P<timestamp>\S+)\s(?P<verb>\S+)\s(?P<path>\S+)\s(?P<status>\d+)\s
+        (?P<body_bytes_sent>\d+)\s(?P<request_time>\S+)\s
+        (?P<upstream_response_time>\S+)\s(?P<quote>["'])(?P<ua>.*)(?P=quote)
+        ''', time_format='%Y-%m-%dT%H:%M:%S')
+    extract = log_format.extractor(('path', 'ua'))
+    assert extract('2014-01-16T13:30:30 GET /foo 200 12 0.1 0.1 "UA"') == (
+        '/foo', 'UA')
+    assert extract('2014-01-16T13:30:30 GET /foo 200 12 0.1 0.1 "UA\'') is None
+
+
+@pytest.mark.parametrize('log_line', [
+    # well-formed lines are tokenized
+    '123.123.123.123 - test_client [16/Jan/2014:13:30:30 +0000] '
+    '"POST /auth/token HTTP/1.1" 200 174 "-" "OAuthClient 0.2.3" "-" '
+    '0.633 0.633\n',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /sub folder?q=a b&c HTTP/1.0" 404 0 "http://ref" "UA" "1.2.3.4" '
+    '0.001 0.000 .',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo HTTP/1.1" 200 12 "-" "UA" "-" 0.1 0.1 p',
+    # anything else is matched with the pattern or does not match at all
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo HTTP/1.1" 200 12 "-" "UA" "-" 0.1 - .',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo HTTP/1.1"\t200 12 "-" "UA" "-" 0.1 0.1',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo? HTTP/1.1" 200 12 "-" "UA" "-" 0.1 0.1',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"PROPFIND /foo HTTP/1.1" 200 12 "-" "UA" "-" 0.1 0.1',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo HTTP/1.1" 200 12 "-" "" "-" 0.1 0.1',
+    '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+    '"GET /foo HTTP/1.1" 200 12 "-" "UA" "-" 0.1 0.1x\r\n',
+    'malformatted entry',
+    '',
+])
+def test_tokenize_nginx(log_line):
+    """nginx log lines are tokenized exactly like the pattern matches them."""
+    match = NGINX.pattern.search(log_line)
+    tokens = tokenize_nginx(log_line)
+    if tokens is not None:
+        assert match is not None
+        assert tokens == match.groups()
+    extract = NGINX.extractor(('path', 'status', 'upstream_response_time'))
+    assert extract(log_line) == (
+        match.group('path', 'status', 'upstream_response_time')
+        if match else None)
+
+    # undecoded lines are tokenized the same way
+    binary_tokens = tokenize_nginx_bytes(log_line.encode('utf-8'))
+    assert binary_tokens == (tuple(
+        token.encode('utf-8') if token is not None else None
+        for token in tokens) if tokens is not None else None)
+    extract = NGINX.extractor(('path', 'status', 'upstream_response_time'),
+                              'utf-8')
+    assert extract(log_line.encode('utf-8')) == (
+        (match.group('path'), match.group('status').encode('utf-8'),
+         match.group('upstream_response_time').encode('utf-8'))
+        if match else None)
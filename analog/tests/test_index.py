@@ -0,0 +1,182 @@
+"""Test the analog.index module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import datetime
+import gzip
+import io
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from analog import analyzer
+from analog.exceptions import InvalidIndexError, InvalidTimeWindowError
+from analog.index import TimeIndex
+
+
+LINE = ('123.123.123.123 - - [16/Jan/2014:13:{0:02d}:{1:02d} +0000] '
+        '"GET /minute/{0} HTTP/1.1" 200 110 "-" "UA" "-" 0.100 0.001\n')
+
+
+def lines(start, stop):
+    """Log lines, three per minute from minute ``start`` to ``stop - 1``."""
+    return ''.join(LINE.format(minute, second)
+                   for minute in range(start, stop) for second in (0, 20, 40))
+
+
+def at(minute, second=0):
+    """Timestamp of ``minute`` and ``second`` of the logged hour."""
+    return datetime.datetime(2014, 1, 16, 13, minute, second)
+
+
+def build(logfile, index=None):
+    """Create or update the index of ``logfile``."""
+    with logfile.open('rb') as log:
+        return analyzer.build_index(log, format='nginx', index=index)
+
+
+def analyze(logfile, **kwargs):
+    """Analyze ``logfile`` with a time window."""
+    with logfile.open('rb') as log:
+        return analyzer.Analyzer(log, format='nginx', **kwargs)()
+
+
+def test_build_index(tmpdir):
+    """Indexes hold the offset of the first log entry of each minute."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10))
+    index = build(logfile)
+    assert tmpdir.join('access.log.index').check()
+    assert len(index) == 10
+    assert index.size == len(lines(0, 10))
+    assert list(index.offsets) == [len(lines(0, minute))
+                                   for minute in range(10)]
+
+    assert index.start(at(0)) == 0
+    assert index.start(at(5, 30)) == len(lines(0, 5))
+    assert index.start(at(0) - datetime.timedelta(days=1)) == 0
+    assert index.start(at(30)) == len(lines(0, 9))
+    assert index.end(at(5, 30)) == len(lines(0, 6))
+    assert index.end(at(9, 59)) is None
+
+    # saved indexes are loaded
+    loaded = TimeIndex.load(str(tmpdir.join('access.log.index')), index.key)
+    assert list(loaded.minutes) == list(index.minutes)
+    assert list(loaded.offsets) == list(index.offsets)
+    # indexes of other log formats are not
+    assert not len(TimeIndex.load(str(tmpdir.join('access.log.index')), '{}'))
+
+
+def test_update_index(tmpdir):
+    """Indexes are updated incrementally and rebuilt for other logfiles."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 5))
+    build(logfile)
+
+    # a partially written line is indexed once it is complete
+    partial = LINE.format(5, 0)
+    logfile.write(lines(5, 8) + partial[:20], mode='a')
+    with mock.patch('analog.index.read_lines',
+                    wraps=analyzer.read_lines) as mock_read_lines:
+        index = build(logfile)
+    _, start, end = mock_read_lines.call_args[0]
+    assert start == len(lines(0, 5))
+    assert end == len(lines(0, 8))
+    assert len(index) == 8
+    assert index.size == len(lines(0, 8))
+
+    # nothing new
+    with mock.patch('analog.index.read_lines') as mock_read_lines:
+        assert len(build(logfile)) == 8
+    assert not mock_read_lines.called
+
+    # logrotate moved the logfile and a new one was created
+    logfile.rename(tmpdir.join('access.log.1'))
+    logfile.write(lines(20, 22))
+    index = build(logfile)
+    assert list(index.offsets) == [0, len(lines(20, 21))]
+
+    # truncated and written past the indexed size since
+    logfile.write(lines(30, 40))
+    assert len(build(logfile)) == 10
+
+
+def test_time_window(tmpdir):
+    """Log entries are analyzed from ``since`` up to ``until``."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 60))
+
+    def requests(**kwargs):
+        report = analyze(logfile, **kwargs)
+        return report.requests, sorted(report._path_requests)
+
+    window = dict(since=at(10, 20), until=at(12, 20))
+    expected = (7, ['/minute/10', '/minute/11', '/minute/12'])
+    # bisected without an index
+    assert requests(**window) == expected
+    assert requests(until=at(1, 59)) == (6, ['/minute/0', '/minute/1'])
+    assert requests(since=at(59, 40))[0] == 1
+    assert not tmpdir.join('access.log.index').check()
+
+    build(logfile)
+    with mock.patch.object(analyzer, 'read_lines',
+                           wraps=analyzer.read_lines) as mock_read_lines:
+        assert requests(**window) == expected
+    # only the minutes of the window are read
+    _, start, end = mock_read_lines.call_args[0]
+    assert (start, end) == (len(lines(0, 10)), len(lines(0, 13)))
+    assert requests(since=at(58))[0] == 6
+    assert requests(until=at(0, 30))[0] == 2
+    # parallel jobs split the window only
+    assert requests(jobs=3, **window) == expected
+
+    # the index is updated when the logfile grows
+    logfile.write(lines(0, 3).replace('13:', '14:'), mode='a')
+    assert requests(since=at(59, 40))[0] == 10
+    assert len(TimeIndex.load(str(tmpdir.join('access.log.index')),
+                              build(logfile).key)) == 63
+
+
+def test_crlf_index(tmpdir):
+    """Offsets of logfiles with CRLF line endings are at their line starts."""
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(lines(0, 60).replace('\n', '\r\n').encode('utf-8'))
+    window = dict(since=at(10, 20), until=at(40, 58))
+    expected = analyze(logfile, **window).requests
+    assert expected == 92
+    index = build(logfile)
+    assert index.start(at(10, 20)) == len(lines(0, 10)) + 30
+    assert analyze(logfile, **window).requests == expected
+
+
+def test_invalid_index(tmpdir):
+    """Only regular, uncompressed logfiles can be indexed."""
+    logfile = tmpdir.join('access.log')
+    logfile.write(lines(0, 10))
+    compressed = tmpdir.join('access.log.gz')
+    compressed.write_binary(gzip.compress(lines(0, 10).encode('utf-8')))
+    with pytest.raises(InvalidIndexError):
+        build(compressed)
+    with pytest.raises(InvalidIndexError):
+        analyzer.build_index(lines(0, 10).splitlines(True), format='nginx')
+    # no index is derived for streams named like stdin
+    stdin = io.BytesIO(lines(0, 10).encode('utf-8'))
+    stdin.name = '<stdin>'
+    with tmpdir.as_cwd():
+        with pytest.raises(InvalidIndexError):
+            analyzer.build_index(stdin, format='nginx')
+    assert not tmpdir.join('<stdin>.index').check()
+    # compressed logfiles are analyzed without index
+    assert analyze(compressed, since=at(5), index=str(
+        tmpdir.join('gz.index'))).requests == 15
+
+    # unwritable index files are only used for this run
+    index = str(tmpdir.join('missing', 'access.log.index'))
+    assert analyze(logfile, since=at(5), index=index).requests == 15
+
+    with pytest.raises(InvalidTimeWindowError):
+        analyze(logfile, since=at(5), until=at(4))
+    with pytest.raises(InvalidTimeWindowError):
+        analyze(logfile, since=at(5), max_age=10)
@@ -1,6 +1,9 @@
 """Test the analog.main module and CLI."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import gzip
+import subprocess
+import sys
 try:
     from unittest import mock
 except ImportError:
@@ -43,6 +46,64 @@ def test_help(capsys):
         assert '--print-path-stats' in out
 
 
+def test_version(capsys):
+    """analog --version prints the package version."""
+    with pytest.raises(SystemExit):
+        analog.main(['analog', '--version'])
+    out, err = capsys.readouterr()
+    assert out == 'analog {0}\n'.format(analog.__version__)
+
+
+def test_lazy_imports():
+    """Slow optional modules are only imported when they are used."""
+    lazy = ('ctypes', 'csv', 'importlib.metadata', 'multiprocessing',
+            'numpy', 'pkg_resources', 'tabulate')
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import sys, analog; '
+        'print(" ".join(m for m in {0!r} if m in sys.modules))'.format(
+            lazy)])
+    assert output.split() == []
+
+
+def test_index(capsys, tmp_logfile):
+    """analog index creates the time index next to the logfile."""
+    tmp_logfile.write(
+        '123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        '"GET /path HTTP/1.1" 200 110 "-" "UA" "-" 0.100 0.001\n')
+    with pytest.raises(SystemExit) as exit:
+        analog.main(['analog', 'index', str(tmp_logfile)])
+    assert exit.value.code == 0
+    out, err = capsys.readouterr()
+    assert out == "103 bytes indexed, 1 minute checkpoints.\n"
+    assert tmp_logfile.dirpath().join('logmock.log.index').check()
+
+
+def test_index_custom_format(capsys, tmp_logfile):
+    """analog index requires a pattern and time format for custom logs."""
+    with pytest.raises(SystemExit) as exit:
+        analog.main(['analog', 'index', '-lf', 'custom', '-pr', '(?P<x>.*)',
+                     str(tmp_logfile)])
+    assert exit.value.code == 2
+    out, err = capsys.readouterr()
+    assert err.endswith("error: --log-format custom requires --pattern-regex "
+                        "and --time-format.\n")
+
+
+def test_corrupt_compressed_log(capsys, tmpdir):
+    """Truncated compressed logfiles are reported as errors."""
+    logfile = tmpdir.join('access.log.gz')
+    logfile.write_binary(gzip.compress(
+        b'123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        b'"GET /path HTTP/1.1" 200 110 "-" "UA" "-" 0.100 0.001\n')[:-10])
+    with pytest.raises(SystemExit) as exit:
+        analog.main(['analog', 'nginx', str(logfile)])
+    assert exit.value.code == 2
+    out, err = capsys.readouterr()
+    assert err.endswith(
+        "error: Compressed logfile ended before the end of stream.\n")
+
+
 def test_format_or_regex_required(capsys, tmp_logfile):
     """analog requires log --format or pattern --regex."""
     with pytest.raises(SystemExit) as exit:
@@ -0,0 +1,153 @@
+"""Test the analog.readers module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import bz2
+import gzip
+import io
+import lzma
+import threading
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from analog import readers
+from analog.exceptions import (CorruptCompressionError,
+                               UnsupportedCompressionError)
+from analog.readers import (ascii_compatible, binary_stream, compression,
+                            read_lines)
+
+
+LINES = [b'first line', b'', b'second \xff line', b'x' * 100, b'last line']
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 64, 1024])
+def test_read_lines(tmpdir, block_size):
+    """Regular files and streams are split into the same undecoded lines."""
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(b'\n'.join(LINES) + b'\n')
+    with logfile.open('rb') as log:
+        assert list(read_lines(log, block_size=block_size)) == LINES
+    stream = io.BytesIO(b'\n'.join(LINES) + b'\n')
+    assert list(read_lines(stream, block_size=block_size)) == LINES
+
+    # byte ranges at line ends, the last line may lack its line end
+    content = b'\n'.join(LINES)
+    logfile.write_binary(content)
+    start = len(LINES[0]) + 2
+    end = content.index(b'last')
+    with logfile.open('rb') as log:
+        assert list(read_lines(log, start, block_size=block_size)) == LINES[2:]
+        assert (list(read_lines(log, start, end, block_size=block_size)) ==
+                LINES[2:4])
+    stream = io.BytesIO(content)
+    assert (list(read_lines(stream, start, end, block_size=block_size)) ==
+            LINES[2:4])
+    stream.seek(start)
+    assert list(read_lines(stream, block_size=block_size)) == LINES[2:]
+
+    # empty files
+    logfile.write_binary(b'')
+    with logfile.open('rb') as log:
+        assert list(read_lines(log, block_size=block_size)) == []
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 64, 1024])
+def test_read_crlf_lines(tmpdir, block_size):
+    """Carriage returns of CRLF line endings are dropped."""
+    content = b'\r\n'.join(LINES) + b'\r\n'
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(content)
+    with logfile.open('rb') as log:
+        assert list(read_lines(log, block_size=block_size)) == LINES
+    stream = io.BytesIO(content)
+    assert list(read_lines(stream, block_size=block_size)) == LINES
+
+    # sizes include the line endings, also across block boundaries
+    sizes = [len(line) + 2 for line in LINES]
+    with logfile.open('rb') as log:
+        assert list(read_lines(log, block_size=block_size, sizes=True)) == (
+            list(zip(LINES, sizes)))
+    stream = io.BytesIO(content[:-2] + b'\r')
+    assert list(read_lines(stream, block_size=block_size, sizes=True)) == (
+        list(zip(LINES, sizes[:-1] + [sizes[-1] - 1])))
+
+
+def test_binary_stream(tmpdir):
+    """Files are read as bytes, unless in an ASCII incompatible encoding."""
+    assert ascii_compatible('utf-8')
+    assert ascii_compatible('latin-1')
+    assert not ascii_compatible('utf-16')
+    assert not ascii_compatible('no-such-encoding')
+
+    logfile = tmpdir.join('access.log')
+    logfile.write_binary(b'line\n')
+    with logfile.open('rb') as log:
+        assert binary_stream(log) == (log, 'utf-8')
+    with io.open(str(logfile), 'r', encoding='latin-1') as log:
+        assert binary_stream(log) == (log.buffer, 'latin-1')
+    with io.open(str(logfile), 'r', encoding='utf-16') as log:
+        assert binary_stream(log) is None
+    assert binary_stream(io.StringIO('line\n')) is None
+    assert binary_stream(['line\n']) is None
+
+
+@pytest.mark.parametrize('name, compress', [
+    ('gzip', gzip.compress),
+    ('bz2', bz2.compress),
+    ('xz', lzma.compress),
+])
+def test_read_compressed(tmpdir, name, compress):
+    """Compressed logfiles are decompressed in a background thread."""
+    content = b'\n'.join(LINES) + b'\n'
+    logfile = tmpdir.join('access.log.1')
+    # concatenated compressed streams are read completely
+    logfile.write_binary(compress(content) + compress(content))
+    with logfile.open('rb') as log:
+        assert compression(log) == name
+        assert list(read_lines(log, block_size=7)) == LINES + LINES
+    stream = io.BytesIO(compress(content))
+    assert compression(stream) == name
+    assert list(read_lines(stream)) == LINES
+
+    # the reader thread is stopped if reading ends early
+    with logfile.open('rb') as log:
+        lines = read_lines(log, block_size=1)
+        assert next(lines) == LINES[0]
+        lines.close()
+    assert not [thread for thread in threading.enumerate()
+                if thread.name == 'analog-reader']
+
+
+def test_read_zstd(tmpdir):
+    """zstd compressed logfiles require the zstandard module."""
+    logfile = tmpdir.join('access.log.1')
+    logfile.write_binary(b'\x28\xb5\x2f\xfd\x00')
+    with logfile.open('rb') as log:
+        assert compression(log) == 'zstd'
+        with mock.patch.object(readers, 'zstandard', None):
+            with pytest.raises(UnsupportedCompressionError):
+                read_lines(log)
+
+    zstandard = pytest.importorskip('zstandard')
+    content = b'\n'.join(LINES) + b'\n'
+    logfile.write_binary(zstandard.ZstdCompressor().compress(content))
+    with logfile.open('rb') as log:
+        assert list(read_lines(log)) == LINES
+
+
+@pytest.mark.parametrize('compress, corrupt', [
+    (gzip.compress, lambda data: data[:-10]),
+    (gzip.compress, lambda data: data[:10] + b'x' * 20 + data[30:]),
+    (bz2.compress, lambda data: data[:10] + b'x' * 20 + data[30:]),
+    (lzma.compress, lambda data: data[:20] + b'x' * 20 + data[40:]),
+])
+def test_read_compressed_error(tmpdir, compress, corrupt):
+    """Errors decompressing logfiles are raised in the reading thread."""
+    logfile = tmpdir.join('access.log.1')
+    logfile.write_binary(corrupt(compress(b'\n'.join(LINES))))
+    with logfile.open('rb') as log:
+        with pytest.raises(CorruptCompressionError):
+            list(read_lines(log))
@@ -1,6 +1,8 @@
 """Test the analog.renderers module."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import datetime
+import io
 import os
 try:
     from unittest import mock
@@ -22,7 +24,7 @@ class TestRendererBase():
         """For a list of available renderers, use ``Renderer.all_renderers``."""
         all_renderers = renderers.Renderer.all_renderers()
         assert sorted(all_renderers) == sorted(
-            ['plain', 'grid', 'table', 'csv', 'tsv'])
+            ['plain', 'grid', 'table', 'csv', 'tsv', 'series'])
 
     def test_renderer_by_name(self):
         """Use ``Renderer.by_name`` to retrieve a specific renderer."""
@@ -49,25 +51,38 @@ class TestRenderers():
     def setup(self):
         """Define report for renderer tests."""
         self.report = Report(verbs=['GET', 'POST', 'PATCH'],
-                             status_codes=['2', '4', '5'])
+                             status_codes=['2', '4', '5'], bucket='minute')
+        timestamps = [datetime.datetime(2014, 1, 16, 13, minute, second)
+                      for minute, second in [(30, 5), (30, 5), (30, 48),
+                                             (31, 2), (31, 2), (31, 30),
+                                             (33, 0), (33, 1), (33, 59)]]
         self.report.add(path='/foo/bar/1', verb='GET', status=200,
-                        time=0.1, upstream_time=0.09, body_bytes=255)
+                        time=0.1, upstream_time=0.09, body_bytes=255,
+                        timestamp=timestamps[0])
         self.report.add(path='/foo/bar/1', verb='GET', status=200,
-                        time=0.1, upstream_time=0.09, body_bytes=255)
+                        time=0.1, upstream_time=0.09, body_bytes=255,
+                        timestamp=timestamps[1])
         self.report.add(path='/foo/bar', verb='POST', status=200,
-                        time=0.12, upstream_time=0.12, body_bytes=402)
+                        time=0.12, upstream_time=0.12, body_bytes=402,
+                        timestamp=timestamps[2])
         self.report.add(path='/foo/bar', verb='POST', status=409,
-                        time=0.21, upstream_time=0.20, body_bytes=23)
+                        time=0.21, upstream_time=0.20, body_bytes=23,
+                        timestamp=timestamps[3])
         self.report.add(path='/foo/bar', verb='GET', status=200,
-                        time=0.23, upstream_time=0.22, body_bytes=212)
+                        time=0.23, upstream_time=0.22, body_bytes=212,
+                        timestamp=timestamps[4])
         self.report.add(path='/foo/bar/1', verb='PATCH', status=200,
-                        time=0.1, upstream_time=0.1, body_bytes=320)
+                        time=0.1, upstream_time=0.1, body_bytes=320,
+                        timestamp=timestamps[5])
         self.report.add(path='/foo/bar/1', verb='POST', status=404,
-                        time=0.1, upstream_time=0.1, body_bytes=0)
+                        time=0.1, upstream_time=0.1, body_bytes=0,
+                        timestamp=timestamps[6])
         self.report.add(path='/foo/bar/1', verb='POST', status=404,
-                        time=0.1, upstream_time=0.1, body_bytes=0)
+                        time=0.1, upstream_time=0.1, body_bytes=0,
+                        timestamp=timestamps[7])
         self.report.add(path='/foo/bar/1', verb='POST', status=200,
-                        time=0.2, upstream_time=0.2, body_bytes=123)
+                        time=0.2, upstream_time=0.2, body_bytes=123,
+                        timestamp=timestamps[8])
 
     def read(self, path):
         """Return should-be output from test output dir."""
@@ -85,6 +100,25 @@ class TestRenderers():
             expected = self.read(output_format)
             assert output == expected
 
+    def test_renderer_render_to(self):
+        """Renderers write the same output to streams, as it is rendered."""
+        for output_format in sorted(renderers.Renderer.all_renderers().keys()):
+            stream = io.StringIO()
+            self.report.render_to(stream, path_stats=True,
+                                  output_format=output_format)
+            assert stream.getvalue() == self.read(output_format) + '\n'
+
+        # rows are written one by one
+        for name in ('plain', 'csv'):
+            stream = mock.Mock()
+            renderers.Renderer.by_name(name).render_to(
+                self.report, stream, path_stats=True)
+            assert stream.write.call_count >= 3
+            assert ''.join(call[0][0] for call in
+                           stream.write.call_args_list) == (
+                self.report.render(path_stats=True, output_format=name) +
+                '\n')
+
     def test_svrenderer_py27_stringio(self):
         """Handle that StringIO does not accept newline arg on Python 2.7."""
         csvrenderer = renderers.CSVRenderer()
@@ -116,3 +150,50 @@ class TestRenderers():
                     'argument 1 must have a "write" method',
                     "'_SentinelObject' object has no attribute 'write'"):
                 raise
+
+
+def test_percentile_output():
+    """Requested percentiles are rendered after the mean and median."""
+    report = Report(verbs=['GET'], status_codes=['2'], percentiles=[90, 99.9])
+    for index in range(11):
+        report.add(path='/foo', verb='GET', status=200, time=index / 10,
+                   upstream_time=0.1, body_bytes=index)
+    assert renderers.percentile_name(99.9) == 'p99.9'
+    assert renderers.percentile_name(90.0) == 'p90'
+
+    output = report.render(path_stats=True, output_format='csv')
+    headers, path, total = output.splitlines()
+    assert headers.endswith(',body_bytes_mean,body_bytes_median,'
+                            'body_bytes_p90,body_bytes_p99.9')
+    assert path.startswith('/foo,11,')
+    body_bytes = total.split(',')[-4:]
+    assert body_bytes[:3] == ['5', '5', '9']
+    assert float(body_bytes[3]) == pytest.approx(9.99)
+
+    output = report.render(path_stats=False, output_format='plain')
+    assert '     0.900   p90\n' in output
+    assert '     0.999   p99.9\n' in output
+
+
+def test_top_paths_output():
+    """Approximate request counts of top paths are rendered with their error."""
+    report = Report(verbs=['GET'], status_codes=['2'], top_paths=1)
+    for path in ['/foo', '/bar', '/bar']:
+        report.add(path=path, verb='GET', status=200, time=0.1,
+                   upstream_time=0.1, body_bytes=1)
+
+    output = report.render(path_stats=True, output_format='csv')
+    headers, path, total = output.splitlines()
+    assert headers.startswith('path,requests,requests_error,GET,')
+    assert path.startswith('/bar,3,1,')
+    assert total.startswith('total,3,0,')
+    output = report.render(path_stats=False, output_format='csv')
+    assert output.startswith('path,requests,GET,')
+    for output_format in ('table', 'grid'):
+        output = report.render(path_stats=True, output_format=output_format)
+        path = next(line for line in output.splitlines() if '/bar' in line)
+        assert path.replace('|', ' ').split()[:3] == ['/bar', '3', '1']
+
+    output = report.render(path_stats=False, output_format='plain')
+    assert '         3   /bar (\u00b11)\n' in output
+    assert '         3   GET\n' in output
@@ -1,13 +1,20 @@
 """Test the analog.report module."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+from array import array
 from collections import Counter, defaultdict, OrderedDict
+import datetime
 import io
 import logging
+import pickle
 
 import pytest
 
-from analog.report import ListStats, Report
+from analog.exceptions import UnknownBucketError, UnknownStatsBackendError
+from analog.report import (BatchReport, ListStats, Report, bucket_start,
+                           create_report)
+from analog.statistics import _import_numpy
+from analog.sketches import ApproximateCount, DDSketch
 from analog.utils import PrefixMatchingCounter
 
 
@@ -16,12 +23,11 @@ def analog_log():
     """Temporarily switch ``analog.LOG`` to a stream handler."""
     stream = io.StringIO()
     log = logging.getLogger('analog')
-    log.removeHandler(logging.NullHandler)
-    log.addHandler(logging.StreamHandler(stream))
+    handler = logging.StreamHandler(stream)
+    log.addHandler(handler)
     log.setLevel('DEBUG')
     yield stream
-    log.removeHandler(logging.StreamHandler(stream))
-    log.addHandler(logging.NullHandler)
+    log.removeHandler(handler)
     log.setLevel(logging.NOTSET)
 
 
@@ -42,6 +48,51 @@ def test_liststats():
     assert stats.mean is None
     assert stats.median is None
 
+    # typed buffers are evaluated directly
+    stats = ListStats(array('d', [0.5, 0.1, 0.3, 0.2]))
+    assert stats.mean == pytest.approx(0.275)
+    assert stats.median == 0.25
+    stats = ListStats(array('q', [3, 1, 2]))
+    assert stats.mean == 2
+    assert stats.median == 2
+    assert isinstance(stats.mean, int)
+    assert isinstance(stats.median, int)
+    assert ListStats(array('q', [1, 2])).mean == 1.5
+
+    # means are exact, not rounded per summand
+    stats = ListStats(array('d', [0.028, 0.836, 0.433]))
+    assert stats.mean == 0.43233333333333335
+
+
+def test_liststats_percentiles():
+    """``ListStats`` selects the requested percentiles with the median."""
+    values = list(range(1, 101))
+    for elements in (values, array('q', values)):
+        stats = ListStats(elements, percentiles=[25, 90, 99.9])
+        assert stats.median == 50.5
+        assert list(stats.percentiles) == [25, 90, 99.9]
+        assert stats.percentiles[25] == pytest.approx(25.75)
+        assert stats.percentiles[90] == pytest.approx(90.1)
+        assert stats.percentiles[99.9] == pytest.approx(99.901)
+
+    # percentiles of single values are that value
+    stats = ListStats(array('d', [0.5]), percentiles=[0, 50, 100])
+    assert list(stats.percentiles.values()) == [0.5, 0.5, 0.5]
+
+    # without values no statistics
+    stats = ListStats([], percentiles=[90])
+    assert stats.percentiles == OrderedDict([(90, None)])
+
+    # sketches estimate percentiles
+    sketch = DDSketch()
+    for value in values:
+        sketch.append(value)
+    stats = ListStats(sketch, percentiles=[90])
+    assert stats.percentiles[90] == pytest.approx(90, rel=0.02)
+
+    # no percentiles by default
+    assert ListStats(values).percentiles == OrderedDict()
+
 
 def test_report_initial_data():
     """Initially ``Report`` objects have certain attribute values."""
@@ -59,10 +110,10 @@ def test_report_initial_data():
     assert isinstance(report._status, PrefixMatchingCounter)
     assert sorted(report._status.keys()) == ['20', '404']
     assert report._status['20'] == 0
-    # times and bytes to be collected in a list for ListStats evaluation
-    assert report._times == []
-    assert report._upstream_times == []
-    assert report._body_bytes == []
+    # times and bytes to be collected in typed buffers for ListStats evaluation
+    assert report._times == array('d')
+    assert report._upstream_times == array('d')
+    assert report._body_bytes == array('q')
     # requests per path to be recorded in Counter
     assert isinstance(report._path_requests, Counter)
     assert len(report._path_requests.keys()) == 0
@@ -70,13 +121,13 @@ def test_report_initial_data():
     assert isinstance(report._path_verbs, defaultdict)
     # status codes per path to be recorded in separate Counters
     assert isinstance(report._path_status, defaultdict)
-    # times and bytes per path to be collected in separate lists
+    # times and bytes per path to be collected in separate typed buffers
     assert isinstance(report._path_times, defaultdict)
-    assert report._path_times.default_factory is list
+    assert report._path_times.default_factory() == array('d')
     assert isinstance(report._path_upstream_times, defaultdict)
-    assert report._path_upstream_times.default_factory is list
+    assert report._path_upstream_times.default_factory() == array('d')
     assert isinstance(report._path_body_bytes, defaultdict)
-    assert report._path_body_bytes.default_factory is list
+    assert report._path_body_bytes.default_factory() == array('q')
 
 
 def test_report_add():
@@ -92,8 +143,8 @@ def test_report_add():
     assert report.requests == 1
     assert report._verbs['GET'] == 1
     assert report._status['20'] == 1
-    assert report._times == [0.1]
-    assert report._upstream_times == [0.09]
+    assert report._times == array('d', [0.1])
+    assert report._upstream_times == array('d', [0.09])
     for attribute in ('_path_requests', '_path_verbs', '_path_status',
                       '_path_times', '_path_upstream_times',
                       '_path_body_bytes'):
@@ -101,8 +152,8 @@ def test_report_add():
     assert report._path_requests['/foo/bar'] == 1
     assert report._path_verbs['/foo/bar']['GET'] == 1
     assert report._path_status['/foo/bar']['20'] == 1
-    assert report._path_times['/foo/bar'] == [0.1]
-    assert report._path_upstream_times['/foo/bar'] == [0.09]
+    assert report._path_times['/foo/bar'] == array('d', [0.1])
+    assert report._path_upstream_times['/foo/bar'] == array('d', [0.09])
 
 
 def test_report_add_verb_not_tracked(analog_log):
@@ -194,5 +245,270 @@ def test_report_render():
         'path,requests,GET,POST,status_20x,status_404,times_mean,times_median,'
         'upstream_times_mean,upstream_times_median,body_bytes_mean,'
         'body_bytes_median\n'
-        '/foo/bar,1,1,0,1,0,0.1,0.1,0.09,0.09,255.0,255\n'
-        'total,1,1,0,1,0,0.1,0.1,0.09,0.09,255.0,255')
+        '/foo/bar,1,1,0,1,0,0.1,0.1,0.09,0.09,255,255\n'
+        'total,1,1,0,1,0,0.1,0.1,0.09,0.09,255,255')
+
+
+def test_report_merge():
+    """Merging reports equals adding all their log entries to one report."""
+    entries = [
+        ('/foo/bar', 'GET', 205, 0.1, 0.09, 255),
+        ('/foo', 'POST', 404, 0.2, 0.19, 12),
+        ('/foo/bar', 'POST', 500, 0.3, 0.01, 0),
+        ('/baz', 'GET', 404, 0.4, 0.29, 1024),
+    ]
+    full = Report(verbs=['GET', 'POST'], status_codes=['20', 404])
+    first = Report(verbs=['GET', 'POST'], status_codes=['20', 404])
+    second = Report(verbs=['GET', 'POST'], status_codes=['20', 404])
+    for index, (path, verb, status, time, upstream_time,
+                body_bytes) in enumerate(entries):
+        for report in (full, first if index < 2 else second):
+            report.add(path=path, verb=verb, status=status, time=time,
+                       upstream_time=upstream_time, body_bytes=body_bytes)
+
+    assert first.merge(second) is first
+    assert first.requests == full.requests == 3
+    assert first.verbs == full.verbs
+    assert first.status == full.status
+    assert first.path_requests == full.path_requests
+    assert first.path_status == full.path_status
+    assert first._times == full._times
+    assert first._path_times == full._path_times
+    assert first._path_body_bytes == full._path_body_bytes
+
+
+def test_report_ddsketch_backend():
+    """Times and body sizes are estimated with the ``ddsketch`` backend."""
+    report = Report(verbs=['GET', 'POST'], status_codes=['20', 404],
+                    stats_backend='ddsketch')
+    for index in range(1, 102):
+        report.add(path='/foo/bar', verb='GET', status=200, time=index / 100,
+                   upstream_time=index / 200, body_bytes=index)
+    assert isinstance(report._times, DDSketch)
+    assert isinstance(report._path_times['/foo/bar'], DDSketch)
+    times = report.times
+    assert times.mean == pytest.approx(0.51)
+    assert abs(times.median - 0.51) <= 0.01 * 0.51
+    body_bytes = report.path_body_bytes['/foo/bar']
+    assert body_bytes.mean == pytest.approx(51)
+    assert abs(body_bytes.median - 51) <= 0.01 * 51
+
+    other = Report(verbs=['GET', 'POST'], status_codes=['20', 404],
+                   stats_backend='ddsketch')
+    other.add(path='/foo/bar', verb='GET', status=200, time=1.0,
+              upstream_time=1.0, body_bytes=0)
+    report.merge(other)
+    assert report.requests == 102
+    assert report._path_body_bytes['/foo/bar'].count == 102
+
+    with pytest.raises(UnknownStatsBackendError):
+        Report(verbs=['GET'], status_codes=[2], stats_backend='unknown')
+
+
+def test_report_status_lookup():
+    """Status codes are matched to tracked prefixes via a lookup table."""
+    report = Report(verbs=['GET'], status_codes=['20', 404, 9])
+    assert report._status_table[205] == '20'
+    assert report._status_table[404] == '404'
+    assert report._status_table[302] is None
+    for status in (205, 404, 302, 999):
+        report.add(path='/foo', verb='GET', status=status, time=0.1,
+                   upstream_time=0.1, body_bytes=1)
+    # status codes outside the table are matched by prefix
+    assert report.requests == 3
+    assert report.status == [('20', 1), ('404', 1), ('9', 1)]
+    assert report.path_status['/foo'] == [('20', 1), ('404', 1), ('9', 1)]
+
+
+def test_report_buckets():
+    """Reports with a bucket size collect a time series of log entries."""
+    def timestamp(minute, second=0):
+        return datetime.datetime(2014, 1, 16, 13, minute, second)
+
+    assert bucket_start(timestamp(7, 30), 60) == timestamp(7)
+    assert bucket_start(timestamp(7, 30), 300) == timestamp(5)
+    assert bucket_start(timestamp(59, 59), 3600) == timestamp(0)
+
+    report = Report(verbs=['GET', 'POST'], status_codes=['20', 404],
+                    bucket='minute')
+    other = Report(verbs=['GET', 'POST'], status_codes=['20', 404],
+                   bucket='minute')
+    for index, minute in enumerate([1, 1, 2, 0, 2, 2]):
+        (report if index < 4 else other).add(
+            path='/foo', verb=('GET', 'POST')[index % 2], status=200,
+            time=index / 10, upstream_time=0.1, body_bytes=index,
+            timestamp=timestamp(minute, index))
+    # entries without timestamp or not tracked are not counted in buckets
+    report.add(path='/foo', verb='GET', status=200, time=0.1,
+               upstream_time=0.1, body_bytes=1)
+    report.add(path='/foo', verb='PUT', status=200, time=0.1,
+               upstream_time=0.1, body_bytes=1, timestamp=timestamp(0))
+
+    assert report.merge(other) is report
+    buckets = report.buckets
+    assert list(buckets) == [timestamp(0), timestamp(1), timestamp(2)]
+    assert [bucket.requests for bucket in buckets.values()] == [1, 2, 3]
+    assert buckets[timestamp(1)].verbs == [('GET', 1), ('POST', 1)]
+    assert buckets[timestamp(2)].status == [('20', 3), ('404', 0)]
+    assert buckets[timestamp(2)].times.mean == pytest.approx(0.37, abs=0.01)
+    assert isinstance(buckets[timestamp(2)]._times, DDSketch)
+
+    # no time series without bucket size
+    report = Report(verbs=['GET'], status_codes=[2])
+    report.add(path='/foo', verb='GET', status=200, time=0.1,
+               upstream_time=0.1, body_bytes=1, timestamp=timestamp(0))
+    assert report.buckets == OrderedDict()
+
+    with pytest.raises(UnknownBucketError):
+        Report(verbs=['GET'], status_codes=[2], bucket='day')
+
+
+def test_report_memoized_properties():
+    """Derived statistics are cached until log entries are added or merged."""
+    report = Report(verbs=['GET', 'POST'], status_codes=['20', 404])
+    report.add(path='/foo', verb='GET', status=200, time=0.1,
+               upstream_time=0.1, body_bytes=1)
+    times = report.times
+    path_times = report.path_times
+    assert report.times is times
+    assert report.path_times is path_times
+    assert report.path_verbs is report.path_verbs
+
+    report.add(path='/bar', verb='POST', status=404, time=0.3,
+               upstream_time=0.3, body_bytes=3)
+    assert report.times is not times
+    assert report.times.mean == pytest.approx(0.2)
+    assert list(report.path_times) == ['/bar', '/foo']
+    assert list(report.path_status) == ['/bar', '/foo']
+
+    # ignored log entries keep the cache
+    path_verbs = report.path_verbs
+    report.add(path='/bar', verb='PUT', status=200, time=0.1,
+               upstream_time=0.1, body_bytes=1)
+    assert report.path_verbs is path_verbs
+
+    other = Report(verbs=['GET', 'POST'], status_codes=['20', 404])
+    other.add(path='/baz', verb='GET', status=200, time=0.5,
+              upstream_time=0.5, body_bytes=5)
+    report.merge(other)
+    assert report.requests == 3
+    assert list(report.path_body_bytes) == ['/bar', '/baz', '/foo']
+
+
+def test_report_top_paths():
+    """With ``top_paths``, statistics are only kept for the top paths."""
+    report = Report(verbs=['GET'], status_codes=[2], top_paths=3)
+    for index in range(100):
+        for path in ('/a', '/b') if index % 2 else ('/a',):
+            report.add(path=path, verb='GET', status=200, time=0.1,
+                       upstream_time=0.1, body_bytes=1)
+        report.add(path='/scan/{0}'.format(index), verb='GET', status=200,
+                   time=0.1, upstream_time=0.1, body_bytes=1)
+
+    assert report.requests == 250
+    assert len(report._path_requests) == 3
+    assert len(report._path_times) == 3
+    assert set(report.path_times) == set(report._path_requests)
+    path_requests = report.path_requests
+    assert [path for path, _ in path_requests[:2]] == ['/a', '/b']
+    assert all(isinstance(count, ApproximateCount)
+               for _, count in path_requests)
+    # /a was never replaced, /b was by scanned paths and overestimated
+    assert path_requests[0][1] == 100
+    assert path_requests[0][1].error == 0
+    count = path_requests[1][1]
+    assert count - count.error <= 50 < count
+    assert report.path_verbs['/a'] == [('GET', 100)]
+    assert report.render(path_stats=True, output_format='csv')
+
+    other = Report(verbs=['GET'], status_codes=[2], top_paths=3)
+    for path in ['/c'] * 200 + ['/b']:
+        other.add(path=path, verb='GET', status=200, time=0.2,
+                  upstream_time=0.2, body_bytes=2)
+    report.merge(other)
+    assert [path for path, _ in report.path_requests] == ['/c', '/a', '/b']
+    assert list(report.path_times) == ['/a', '/b', '/c']
+    assert report.path_times['/c'].mean == 0.2
+    assert report.path_verbs['/a'] == [('GET', 100)]
+
+
+@pytest.mark.skipif(not _import_numpy(), reason='requires NumPy')
+def test_batch_report():
+    """``BatchReport`` aggregates log entries to the same statistics."""
+    def timestamp(second):
+        return datetime.datetime(2014, 1, 16, 13, second // 60, second % 60)
+
+    entries = [
+        ('/foo/bar', 'GET', 205, 0.1, 0.09, 255),
+        ('/foo', 'POST', 404, 0.2, 0.19, 12),
+        ('/foo/bar', 'POST', 500, 0.3, 0.01, 0),
+        ('/baz', 'GET', 404, 0.4, 0.29, 1024),
+        ('/foo/bar', 'PUT', 200, 0.5, 0.5, 5),
+        ('/foo', 'GET', 999, 0.6, 0.59, 7),
+        ('/foo/bar', 'POST', 201, 0.7, 0.69, 70),
+    ] * 3
+    full = Report(verbs=['GET', 'POST'], status_codes=['20', 404, 9],
+                  bucket='minute')
+    first = BatchReport(verbs=['GET', 'POST'], status_codes=['20', 404, 9],
+                        bucket='minute', batch_size=3)
+    second = BatchReport(verbs=['GET', 'POST'], status_codes=['20', 404, 9],
+                         bucket='minute', batch_size=3)
+    for index, entry in enumerate(entries):
+        for report in (full, first if index < 10 else second):
+            report.add(*entry, timestamp=timestamp(index * 7))
+
+    # entries are buffered until statistics are read
+    assert len(second._batch_paths) == 2
+    assert first.merge(second) is first
+    assert not second._batch_paths
+    for name in ('requests', 'verbs', 'status', 'path_requests', 'path_verbs',
+                 'path_status', '_times', '_body_bytes', '_path_times',
+                 '_path_upstream_times', '_path_body_bytes'):
+        assert getattr(first, name) == getattr(full, name)
+    assert first.times.median == full.times.median
+    # counts are plain integers, not NumPy scalars
+    for counts in (first.verbs, first.status, first.path_requests,
+                   first.path_verbs['/foo/bar'],
+                   first.path_status['/foo/bar']):
+        assert all(type(count) is int for _, count in counts)
+    assert [bucket.requests for bucket in first.buckets.values()] == [
+        bucket.requests for bucket in full.buckets.values()]
+
+    # buffered entries are aggregated before pickling
+    report = BatchReport(verbs=['GET'], status_codes=[2])
+    report.add('/foo', 'GET', 200, 0.1, 0.1, 1)
+    restored = pickle.loads(pickle.dumps(report))
+    assert restored.path_requests == [('/foo', 1)]
+    assert restored._times == array('d', [0.1])
+
+
+def test_create_report():
+    """Reports aggregate in batches for exact statistics if NumPy is there."""
+    batches = BatchReport if _import_numpy() else Report
+    report = create_report(verbs=['GET'], status_codes=[2])
+    assert type(report) is batches
+    report = create_report(verbs=['GET'], status_codes=[2], bucket='hour')
+    assert type(report) is batches
+    report = create_report(verbs=['GET'], status_codes=[2],
+                           stats_backend='ddsketch')
+    assert type(report) is Report
+    report = create_report(verbs=['GET'], status_codes=[2], top_paths=10)
+    assert type(report) is Report
+    with pytest.raises(UnknownStatsBackendError):
+        create_report(verbs=['GET'], status_codes=[2], stats_backend='foo')
+
+
+def test_report_percentiles():
+    """Reports compute the percentiles they are created with."""
+    report = Report(verbs=['GET'], status_codes=[2], bucket='hour',
+                    percentiles=[90])
+    for index in range(11):
+        report.add(path='/foo', verb='GET', status=200, time=index / 10,
+                   upstream_time=0.1, body_bytes=index,
+                   timestamp=datetime.datetime(2014, 1, 16, 13, index))
+    assert report.times.percentiles[90] == pytest.approx(0.9)
+    assert report.path_body_bytes['/foo'].percentiles == {90: 9}
+    bucket, = report.buckets.values()
+    assert list(bucket.times.percentiles) == [90]
+    assert create_report(verbs=['GET'], status_codes=[2],
+                         percentiles=[90])._percentiles == (90,)
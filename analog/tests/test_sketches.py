@@ -0,0 +1,124 @@
+"""Test the analog.sketches module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import random
+
+import pytest
+
+from analog.sketches import ApproximateCount, DDSketch, SpaceSaving
+
+
+def test_ddsketch_quantiles():
+    """``DDSketch`` quantiles are within the relative accuracy bound."""
+    rand = random.Random(42)
+    values = sorted(rand.lognormvariate(-2, 1.5) for _ in range(10000))
+    values[:100] = [0] * 100
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.append(value)
+
+    assert len(sketch) == 10000
+    assert sketch.mean() == pytest.approx(sum(values) / len(values))
+    for q in (0.25, 0.5, 0.75, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+    assert sketch.quantile(0) == 0
+    assert sketch.quantile(1) == values[-1]
+
+
+def test_ddsketch_mean():
+    """``DDSketch`` means are exact, also of merged sketches."""
+    first, second = DDSketch(), DDSketch()
+    for _ in range(1000):
+        first.append(0.1)
+        second.append(0.1)
+    assert first.mean() == 0.1
+    first.merge(second)
+    assert first.mean() == 0.1
+    assert first.sum == 200.0
+
+
+def test_ddsketch_bounded():
+    """``DDSketch`` never keeps more than ``max_bins`` bins."""
+    sketch = DDSketch(max_bins=64)
+    for exponent in range(-300, 300):
+        sketch.append(10.0 ** (exponent / 10))
+    assert len(sketch._bins) <= 64
+    # collapsing only affects the lowest quantiles
+    assert sketch.quantile(1) == pytest.approx(10 ** 29.9, rel=0.01)
+
+
+def test_ddsketch_merge():
+    """Merged sketches equal one sketch of all values."""
+    first, second, full = DDSketch(), DDSketch(), DDSketch()
+    for value in range(1, 1000):
+        (first if value % 2 else second).append(value)
+        full.append(value)
+    first.merge(second)
+    assert first.count == full.count
+    assert first.sum == full.sum
+    assert first._bins == full._bins
+    assert first.quantile(0.5) == full.quantile(0.5)
+
+    with pytest.raises(ValueError):
+        first.merge(DDSketch(relative_accuracy=0.05))
+
+    # merging empty sketches does not change anything
+    first.merge(DDSketch())
+    assert first.count == full.count
+    empty = DDSketch()
+    assert empty.mean() is None
+    assert empty.quantile(0.5) is None
+
+
+def test_space_saving():
+    """``SpaceSaving`` counts heavy hitters within their error bounds."""
+    rand = random.Random(42)
+    keys = ['/hot/{0}'.format(index) for index in range(5) for _ in range(200)]
+    keys += ['/scan/{0}'.format(index) for index in range(2000)]
+    rand.shuffle(keys)
+    summary = SpaceSaving(capacity=20)
+    for key in keys:
+        summary.add(key)
+
+    assert len(summary) == 20
+    top = summary.most_common()
+    assert sorted(key for key, _ in top[:5]) == [
+        '/hot/{0}'.format(index) for index in range(5)]
+    for key, count in top:
+        assert isinstance(count, ApproximateCount)
+        assert count - count.error <= keys.count(key) <= count
+    assert summary['/hot/0'] == top[[key for key, _ in top].index(
+        '/hot/0')][1]
+    assert summary['/unknown'] == 0
+
+    # a new key replaces the lowest count
+    summary = SpaceSaving(capacity=2)
+    assert summary.add('a') is None
+    assert summary.add('a') is None
+    assert summary.add('b') is None
+    assert summary.add('c') == 'b'
+    assert summary.most_common() == [('a', 2), ('c', 2)]
+    assert summary['c'].error == 1
+    assert 'b' not in summary
+
+    with pytest.raises(ValueError):
+        SpaceSaving(capacity=0)
+
+
+def test_space_saving_merge():
+    """Merged ``SpaceSaving`` summaries keep the merged heavy hitters."""
+    first = SpaceSaving(capacity=2)
+    second = SpaceSaving(capacity=2)
+    for key in 'aaab':
+        first.add(key)
+    for key in 'cccd':
+        second.add(key)
+    assert first.merge(second) == {'b'}
+    assert sorted(first) == ['a', 'c']
+    # c was not counted in first, where it may have occurred once
+    assert first['a'] == 4
+    assert first['c'] == 4
+    assert first['c'].error == 1
+    # the merged summary keeps working
+    assert first.add('e') in ('a', 'c')
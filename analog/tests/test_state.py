@@ -0,0 +1,118 @@
+"""Test the analog.state module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import gzip
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from analog import analyzer
+from analog.exceptions import InvalidStateError
+from analog.state import State
+
+
+LINE = ('123.123.123.123 - - [16/Jan/2014:13:30:30 +0000] '
+        '"GET /path/{0} HTTP/1.1" 200 110 "-" "UA" "-" 0.{0:03d} 0.001\n')
+
+
+def lines(start, stop):
+    """Log lines for paths ``/path/<start>`` to ``/path/<stop - 1>``."""
+    return ''.join(LINE.format(number) for number in range(start, stop))
+
+
+def analyze(logfile, state, **kwargs):
+    """Analyze ``logfile`` incrementally with ``state`` file."""
+    with logfile.open('rb') as log:
+        return analyzer.Analyzer(log, format='nginx', state=str(state),
+                                 **kwargs)()
+
+
+def test_incremental_analysis(tmpdir):
+    """Only log entries added since the last run are analyzed."""
+    logfile = tmpdir.join('access.log')
+    state = tmpdir.join('analog.state')
+    logfile.write(lines(0, 10))
+    report = analyze(logfile, state)
+    assert report.requests == 10
+    assert State.load(str(state), None).offset == 0  # other configuration
+
+    # a partially written line is analyzed once it is complete
+    partial = LINE.format(12)
+    logfile.write(lines(10, 12) + partial[:20], mode='a')
+    with mock.patch.object(analyzer, 'read_lines',
+                           wraps=analyzer.read_lines) as mock_read_lines:
+        report = analyze(logfile, state)
+    _, start, end = mock_read_lines.call_args[0]
+    assert start == len(lines(0, 10))
+    assert end == len(lines(0, 12))
+    assert report.requests == 12
+    logfile.write(partial[20:], mode='a')
+    report = analyze(logfile, state)
+    assert report.requests == 13
+
+    # the report equals analyzing the complete logfile at once
+    with logfile.open('rb') as log:
+        full = analyzer.Analyzer(log, format='nginx')()
+    assert (report.render(path_stats=True, output_format='plain') ==
+            full.render(path_stats=True, output_format='plain'))
+
+    # nothing new
+    assert analyze(logfile, state).requests == 13
+    # parallel jobs only analyze new log entries too
+    logfile.write(lines(13, 30), mode='a')
+    assert analyze(logfile, state, jobs=3).requests == 30
+
+    # another configuration starts over
+    report = analyze(logfile, state, paths=['/path/1'])
+    assert report.requests == 11
+    assert analyze(logfile, state, paths=['/path/1']).requests == 11
+
+
+def test_rotated_logfile(tmpdir):
+    """Rotated, truncated or rewritten logfiles are analyzed from the start."""
+    logfile = tmpdir.join('access.log')
+    state = tmpdir.join('analog.state')
+    logfile.write(lines(0, 10))
+    assert analyze(logfile, state).requests == 10
+
+    # logrotate moved the logfile and a new one was created
+    logfile.rename(tmpdir.join('access.log.1'))
+    logfile.write(lines(0, 3))
+    assert analyze(logfile, state).requests == 3
+
+    # truncated
+    logfile.write(lines(0, 2))
+    assert analyze(logfile, state).requests == 2
+
+    # truncated and written past the last offset since
+    logfile.write(lines(100, 110))
+    assert analyze(logfile, state).requests == 10
+
+
+def test_state_file(tmpdir):
+    """State files are only usable for regular, uncompressed logfiles."""
+    logfile = tmpdir.join('access.log')
+    state = tmpdir.join('analog.state')
+    logfile.write(lines(0, 10))
+
+    with pytest.raises(InvalidStateError):
+        analyze(logfile, state, max_age=10)
+    with pytest.raises(InvalidStateError):
+        analyzer.Analyzer(lines(0, 10).splitlines(True), format='nginx',
+                          state=str(state))()
+    compressed = tmpdir.join('access.log.gz')
+    compressed.write_binary(gzip.compress(lines(0, 10).encode('utf-8')))
+    with pytest.raises(InvalidStateError):
+        analyze(compressed, state)
+    assert not state.check()
+
+    # unreadable state files are replaced
+    state.write_binary(b'garbage')
+    assert analyze(logfile, state).requests == 10
+    assert analyze(logfile, state).requests == 10
+    # no temporary files are left behind
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'access.log', 'access.log.gz', 'analog.state']
@@ -0,0 +1,70 @@
+"""Test the analog.tail module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import sys
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
+
+from analog import tail
+from analog.tail import InotifyWatcher, PollingWatcher, Tail, watch
+
+
+def test_tail(tmpdir):
+    """Lines appended to a logfile are read, following truncation and moves."""
+    logfile = tmpdir.join('access.log')
+    logfile.write('old line\n')
+    log_tail = Tail(str(logfile))
+    assert log_tail.read_lines() == []
+
+    logfile.write('first\nsecond\nthi', mode='a')
+    assert log_tail.read_lines() == [b'first', b'second']
+    logfile.write('rd\n', mode='a')
+    assert log_tail.read_lines() == [b'third']
+
+    # truncated
+    logfile.write('new\n')
+    assert log_tail.read_lines() == [b'new']
+
+    # moved away, the rest of the old logfile and the new one are read
+    logfile.write('rest\n', mode='a')
+    logfile.rename(tmpdir.join('access.log.1'))
+    assert log_tail.read_lines() == [b'rest']
+    tmpdir.join('access.log.1').write('more\n', mode='a')
+    logfile.write('created\n')
+    assert log_tail.read_lines() == [b'more', b'created']
+
+    # CRLF line endings, also split between reads
+    logfile.write(b'crlf\r\nsplit\r', mode='ab')
+    assert log_tail.read_lines(sizes=True) == [(b'crlf', 6)]
+    logfile.write(b'\n', mode='ab')
+    assert log_tail.read_lines(sizes=True) == [(b'split', 7)]
+    log_tail.close()
+
+
+def test_watch(tmpdir):
+    """Changes of logfiles are waited for with inotify or polling."""
+    logfile = tmpdir.join('access.log')
+    logfile.write('')
+
+    with mock.patch.object(tail, 'POLL_INTERVAL', 0.01):
+        watcher = PollingWatcher(str(logfile))
+        assert watcher.wait(1)
+        watcher.close()
+    with mock.patch.object(tail, '_libc', return_value=None):
+        assert isinstance(watch(str(logfile)), PollingWatcher)
+
+    if not sys.platform.startswith('linux'):
+        pytest.skip("inotify requires Linux.")
+    watcher = watch(str(logfile))
+    assert isinstance(watcher, InotifyWatcher)
+    assert not watcher.wait(0.01)
+    logfile.write('line\n', mode='a')
+    assert watcher.wait(1)
+    # changes of other files are ignored
+    tmpdir.join('other.log').write('line\n')
+    assert not watcher.wait(0.01)
+    watcher.close()
@@ -0,0 +1,65 @@
+"""Test the analog.timing module."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import json
+
+from analog.timing import STAGES, Timing
+
+
+def test_timing_measure():
+    """Time spent in ``measure`` blocks is added to stages."""
+    timing = Timing()
+    assert list(timing.stages) == list(STAGES)
+    with timing.measure('render'):
+        sum(range(1000))
+    first = timing.stages['render']
+    assert first > 0
+    with timing.measure('render'):
+        sum(range(1000))
+    assert timing.stages['render'] > first
+    assert timing.stages['stats'] == 0
+
+
+def test_timing_merge():
+    """Stage times and line counts of other timings are added up."""
+    timing, other = Timing(), Timing()
+    timing.stages['read'] = 1.0
+    timing.lines_read = 10
+    other.stages['read'] = 0.5
+    other.stages['add'] = 0.25
+    other.lines_read = 5
+    other.lines_matched = 4
+    other.lines_skipped = 1
+    other.bytes_read = 500
+    timing.merge(other)
+    assert timing.stages['read'] == 1.5
+    assert timing.stages['add'] == 0.25
+    assert timing.lines_read == 15
+    assert timing.lines_matched == 4
+    assert timing.lines_skipped == 1
+    assert timing.bytes_read == 500
+
+
+def test_timing_render():
+    """Timing information is rendered as text or JSON."""
+    timing = Timing()
+    timing.lines_read = 2000
+    timing.lines_matched = 1500
+    timing.lines_skipped = 100
+    timing.bytes_read = 4 * 10 ** 6
+    timing.stages['match'] = 1.0
+    timing.finish()
+    timing.seconds = 2.0
+
+    data = json.loads(timing.render('json'))
+    assert data['seconds'] == 2.0
+    assert data['lines_per_second'] == 1000
+    assert data['mb_per_second'] == 2
+    assert list(data['stages']) == list(STAGES)
+    assert data['stages']['match'] == 1.0
+
+    text = timing.render()
+    assert text.splitlines()[0] == (
+        "Analyzed 2,000 lines (4.0 MB) in 2.000s: 1,000 lines/s, 2.0 MB/s.")
+    assert "1,500   lines matched" in text
+    assert "       1.000s   50.0%   match" in text
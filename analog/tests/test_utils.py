@@ -1,12 +1,21 @@
 """Test the analog.utils module."""
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import argparse
 from collections import Counter
+import datetime
 import os
 import tempfile
 import textwrap
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import pytest
 
 from analog import utils
+from analog.exceptions import InvalidPathTemplateError
 
 
 def test_analog_argument_parser():
@@ -61,3 +70,101 @@ def test_prefix_matching_counter():
 
     assert pmc['2'] == 3
     assert pmc['40'] == 3
+
+
+def test_prefix_index():
+    """PrefixIndex finds the first matching prefix in order of precedence."""
+    prefixes = ['/foo/bar', '/auth', '/foo', '/foo/bar/baz', '/auth']
+    index = utils.PrefixIndex(prefixes)
+    assert index.prefixes is prefixes
+    for value in ('/foo/bar/baz', '/foo/bar', '/foo/ba', '/foo', '/fo',
+                  '/auth/token', '/authority', '', '/', '/baz'):
+        expected = next((prefix for prefix in prefixes
+                         if value.startswith(prefix)), None)
+        assert index.match(value) == expected
+
+    # the empty prefix matches everything
+    index = utils.PrefixIndex(['/foo', ''])
+    assert index.match('/foo/bar') == '/foo'
+    assert index.match('/bar') == ''
+    assert utils.PrefixIndex([]).match('/foo') is None
+
+
+def test_prefix_matching_counter_lookup_table():
+    """PrefixMatchingCounter lookup tables map integers to matched prefixes."""
+    pmc = utils.PrefixMatchingCounter({'2': 0, '40': 0, '404': 0})
+    table = pmc.lookup_table(600)
+    assert len(table) == 600
+    for status in range(600):
+        assert table[status] == pmc.match(status)
+    assert table[200] == table[299] == '2'
+    assert table[404] == table[400] == '40'
+    assert table[302] is None
+
+
+def test_path_templates():
+    """PathTemplates normalize paths with IDs to path templates."""
+    templates = utils.PathTemplates(ids=True)
+    for path, template in (
+            ('/users/123/orders', '/users/{id}/orders'),
+            ('/users/123', '/users/{id}'),
+            ('/users/123?page=2', '/users/{id}?page=2'),
+            ('/orders/550e8400-e29b-41d4-a716-446655440000', '/orders/{id}'),
+            ('/blobs/0123456789abcdef0123/raw', '/blobs/{id}/raw'),
+            ('/v2/users', '/v2/users'),
+            ('/cafe/beef', '/cafe/beef'),
+            ('/', '/')):
+        assert templates.apply(path) == template
+
+    # named groups of the first matching template pattern are replaced
+    templates = utils.PathTemplates([
+        r'/static/(?P<file>.*)',
+        r'/(?P<lang>[a-z]{2})/(?P<page>[^/]+)',
+        r'/mirror/(?P<name>\w+)/(?P=name)',
+        r'/static/',
+    ], ids=True)
+    assert templates.apply('/static/js/app.js') == '/static/{file}'
+    assert templates.apply('/de/about/7') == '/{lang}/{page}/{id}'
+    assert templates.apply('/mirror/foo/foo/3') == '/mirror/{name}/foo/{id}'
+    assert templates.apply('/mirror/foo/bar') == '/mirror/foo/bar'
+    assert utils.PathTemplates([r'/(?P<a>x(?P<b>y))']).apply('/xyz') == (
+        '/{a}z')
+
+    with pytest.raises(InvalidPathTemplateError):
+        utils.PathTemplates([r'/(?P<broken'])
+
+
+def test_path_templates_cache():
+    """Templates of recent paths are cached."""
+    templates = utils.PathTemplates(ids=True)
+    with mock.patch.object(templates, '_ids', wraps=templates._ids) as ids:
+        templates = utils.PathTemplates(ids=True)
+        templates._ids = ids
+        templates.apply.cache_clear()
+        for _ in range(3):
+            assert templates.apply('/users/1') == '/users/{id}'
+        assert ids.sub.call_count == 1
+
+    uncached = utils.PathTemplates(ids=True, cache_size=0)
+    assert uncached.apply == uncached._apply
+
+
+def test_parse_timestamp():
+    """Timestamp arguments may leave out seconds and the time of day."""
+    assert utils.parse_timestamp('2014-01-16T13:30:15') == datetime.datetime(
+        2014, 1, 16, 13, 30, 15)
+    assert utils.parse_timestamp('2014-01-16 13:30') == datetime.datetime(
+        2014, 1, 16, 13, 30)
+    assert utils.parse_timestamp('2014-01-16') == datetime.datetime(
+        2014, 1, 16)
+    with pytest.raises(argparse.ArgumentTypeError):
+        utils.parse_timestamp('16/Jan/2014')
+
+
+def test_parse_percentiles():
+    """Percentile arguments are comma separated numbers from 0 to 100."""
+    assert utils.parse_percentiles('50,90,99.9') == [50, 90, 99.9]
+    assert utils.parse_percentiles('0,100') == [0, 100]
+    for value in ('', '90,', 'p99', '101', '-1'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            utils.parse_percentiles(value)
@@ -0,0 +1,133 @@
+"""Analog timing of analysis stages."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import time
+
+
+#: High resolution clock for timing, wall clock time on Python 2.7.
+clock = getattr(time, 'perf_counter', time.time)
+#: Timed analysis stages in processing order.
+STAGES = ('read', 'match', 'timestamp', 'filter', 'entry', 'add', 'stats',
+          'render')
+#: Output formats of timing information.
+TIMING_FORMATS = ('text', 'json')
+
+
+class Timing(object):
+
+    """Cumulative time spent per analysis stage and line counts.
+
+    Stages are:
+
+    * ``read``: reading (and decompressing) lines from the logfile.
+    * ``match``: matching lines to the log format and extracting fields.
+    * ``timestamp``: parsing timestamps.
+    * ``filter``: checking max. age and normalizing and matching paths.
+    * ``entry``: converting extracted fields to numbers.
+    * ``add``: adding log entries to the report.
+    * ``stats``: computing statistics of the report.
+    * ``render``: rendering the report.
+
+    With parallel jobs, the stage times of all processes are added up and
+    may exceed the total time.
+
+    """
+
+    def __init__(self):
+        """Start timing analysis."""
+        self.stages = OrderedDict((stage, 0.0) for stage in STAGES)
+        #: number of lines read from the logfile
+        self.lines_read = 0
+        #: number of lines matching the log format
+        self.lines_matched = 0
+        #: number of matched lines not added to the report
+        self.lines_skipped = 0
+        #: number of bytes (characters for text input) read
+        self.bytes_read = 0
+        self._start = clock()
+        self.seconds = None
+
+    @contextmanager
+    def measure(self, stage):
+        """Add the time spent in the ``with`` block to ``stage``.
+
+        :param stage: name of the stage, one of
+            :py:data:`analog.timing.STAGES`.
+        :type stage: ``str``
+
+        """
+        start = clock()
+        try:
+            yield
+        finally:
+            self.stages[stage] += clock() - start
+
+    def merge(self, other):
+        """Add stage times and line counts of ``other`` timing.
+
+        :param other: timing of another process.
+        :type other: :py:class:`analog.timing.Timing`
+
+        """
+        for stage, seconds in other.stages.items():
+            self.stages[stage] += seconds
+        self.lines_read += other.lines_read
+        self.lines_matched += other.lines_matched
+        self.lines_skipped += other.lines_skipped
+        self.bytes_read += other.bytes_read
+
+    def finish(self):
+        """Stop timing analysis."""
+        self.seconds = clock() - self._start
+
+    def as_dict(self):
+        """Timing information as dictionary.
+
+        :returns: total time, line and byte counts, throughput and stage
+            times in seconds.
+        :rtype: ``dict``
+
+        """
+        seconds = self.seconds if self.seconds is not None else (
+            clock() - self._start)
+        return OrderedDict((
+            ('seconds', seconds),
+            ('lines_read', self.lines_read),
+            ('lines_matched', self.lines_matched),
+            ('lines_skipped', self.lines_skipped),
+            ('bytes_read', self.bytes_read),
+            ('lines_per_second', self.lines_read / seconds if seconds else 0),
+            ('mb_per_second',
+             self.bytes_read / 1e6 / seconds if seconds else 0),
+            ('stages', OrderedDict(self.stages)),
+        ))
+
+    def render(self, output_format='text'):
+        """Render timing information.
+
+        :param output_format: ``text`` or ``json``.
+        :type output_format: ``str``
+        :returns: output string
+        :rtype: ``str``
+
+        """
+        data = self.as_dict()
+        if output_format == 'json':
+            return json.dumps(data)
+        lines = [
+            "Analyzed {lines_read:,} lines ({megabytes:.1f} MB) in "
+            "{seconds:.3f}s: {lines_per_second:,.0f} lines/s, "
+            "{mb_per_second:.1f} MB/s.".format(
+                megabytes=self.bytes_read / 1e6, **data),
+            "{0:>12,}   lines matched".format(self.lines_matched),
+            "{0:>12,}   lines skipped".format(self.lines_skipped),
+            "",
+        ]
+        total = data['seconds'] or 1
+        for stage, seconds in self.stages.items():
+            lines.append("{0:>12.3f}s  {1:>5.1f}%   {2}".format(
+                seconds, 100 * seconds / total, stage))
+        return "\n".join(lines)
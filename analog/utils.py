@@ -3,8 +3,33 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import argparse
 from collections import Counter
+import datetime
+try:
+    from functools import lru_cache
+except ImportError:  # Python 2.7
+    lru_cache = None
 import re
 
+from analog.exceptions import InvalidPathTemplateError
+
+
+#: Path segment patterns of IDs: numbers, UUIDs and long hex strings.
+ID_SEGMENTS = (
+    r'[0-9]+',
+    r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-'
+    r'[0-9a-fA-F]{12}',
+    r'[0-9a-fA-F]{16,}',
+)
+#: Placeholder replacing ID path segments.
+ID_PLACEHOLDER = '{id}'
+#: Number of paths with their templates cached by ``PathTemplates``.
+TEMPLATE_CACHE_SIZE = 65536
+#: Accepted layouts of timestamp arguments, see :py:func:`parse_timestamp`.
+TIMESTAMP_FORMATS = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S',
+                     '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+#: Named groups and their back references in path template patterns.
+_GROUP_NAME = re.compile(r'\(\?P(<(\w+)>|=(\w+)\))')
+
 
 class AnalogArgumentParser(argparse.ArgumentParser):
 
@@ -85,6 +110,72 @@ class AnalogArgumentParser(argparse.ArgumentParser):
             yield key
 
 
+def parse_timestamp(value):
+    """Parse timestamp argument ``value`` like ``2014-01-16T13:30:00``.
+
+    Seconds and the time of day may be left out, see
+    :py:data:`analog.utils.TIMESTAMP_FORMATS`.
+
+    :param value: timestamp argument.
+    :type value: ``str``
+    :returns: timestamp.
+    :rtype: :py:class:`datetime.datetime`
+    :raises: :py:class:`argparse.ArgumentTypeError` for other layouts.
+
+    """
+    for layout in TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, layout)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(
+        "invalid timestamp: '{0}', use YYYY-MM-DD[THH:MM[:SS]]".format(value))
+
+
+def parse_percentiles(value):
+    """Parse percentiles argument ``value`` like ``50,90,99.9``.
+
+    :param value: comma separated percentiles between 0 and 100.
+    :type value: ``str``
+    :returns: percentiles.
+    :rtype: ``list`` of ``float``
+    :raises: :py:class:`argparse.ArgumentTypeError` for invalid percentiles.
+
+    """
+    try:
+        percentiles = [float(percent) for percent in value.split(',')]
+    except ValueError:
+        percentiles = None
+    if not percentiles or not all(0 <= percent <= 100
+                                  for percent in percentiles):
+        raise argparse.ArgumentTypeError(
+            "invalid percentiles: '{0}', use comma separated numbers from 0 "
+            "to 100 like 50,90,99".format(value))
+    return percentiles
+
+
+class VersionAction(argparse.Action):
+
+    """Print the analog version and exit.
+
+    Unlike the ``version`` action of ``argparse``, the version is only looked
+    up when the option is given, reading package metadata is slow.
+
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS,
+                 default=argparse.SUPPRESS,
+                 help="show program's version number and exit"):
+        super(VersionAction, self).__init__(
+            option_strings=option_strings, dest=dest, default=default,
+            nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from analog import __version__
+        print("analog {v}".format(v=__version__))
+        parser.exit()
+
+
 class PrefixMatchingCounter(Counter):
 
     """Counter-like object that increments a field if it has a common prefix.
@@ -106,6 +197,20 @@ class PrefixMatchingCounter(Counter):
                 return prefix
         return None
 
+    def lookup_table(self, size):
+        """Precompute the matched prefix of every integer field below ``size``.
+
+        Looking up the prefix of e.g. a status code in this table avoids
+        converting it to a string and comparing it to every prefix.
+
+        :param size: number of integer fields to match.
+        :type size: ``int``
+        :returns: list of matched prefix (or ``None``) by field value.
+        :rtype: ``list``
+
+        """
+        return [self.match(field) for field in range(size)]
+
     def inc(self, field):
         """Increment every field that starts with field by one.
 
@@ -115,3 +220,169 @@ class PrefixMatchingCounter(Counter):
         prefix = self.match(field)
         if prefix is not None:
             self[prefix] += 1
+
+
+class PrefixIndex(object):
+
+    """Index of prefixes to find the first one a value starts with.
+
+    Prefixes are grouped into hash tables by their length. Looking up a value
+    takes one table lookup per distinct prefix length up to the length of the
+    value, instead of comparing the value to every single prefix.
+
+    Example::
+
+        >>> index = PrefixIndex(['/foo/bar', '/auth', '/foo'])
+        >>> index.match('/foo/bar/baz')
+        '/foo/bar'
+        >>> index.match('/baz') is None
+        True
+
+    """
+
+    def __init__(self, prefixes):
+        """Build index of ``prefixes``.
+
+        :param prefixes: prefixes in order of precedence.
+        :type prefixes: ``list`` of ``str``
+
+        """
+        self.prefixes = prefixes
+        tables = {}
+        for position, prefix in enumerate(prefixes):
+            tables.setdefault(len(prefix), {}).setdefault(prefix, position)
+        #: (length, {prefix: position}) tuples ordered by prefix length
+        self._tables = sorted(tables.items())
+
+    def match(self, value):
+        """Find the first prefix (in order of precedence) ``value`` starts with.
+
+        :param value: value to match.
+        :type value: ``str``
+        :returns: matched prefix or ``None``.
+        :rtype: ``str``
+
+        """
+        best = None
+        max_length = len(value)
+        for length, table in self._tables:
+            if length > max_length:
+                break
+            position = table.get(value[:length])
+            if position is not None and (best is None or position < best):
+                best = position
+                if best == 0:
+                    break
+        return None if best is None else self.prefixes[best]
+
+
+class PathTemplates(object):
+
+    """Rules normalizing request paths to path templates.
+
+    Paths that only differ in IDs, like ``/users/123/orders`` and
+    ``/users/456/orders``, are analyzed as one path template. With ``ids``,
+    path segments that look like IDs (see :py:data:`analog.utils.ID_SEGMENTS`)
+    are replaced by ``{id}``. Template patterns are regular expressions matched
+    at the start of paths. The first template pattern that matches replaces
+    the text of each of its named groups by ``{<group name>}``.
+
+    All template patterns are compiled into one combined pattern and the
+    templates of the most recent paths are cached, so frequent paths are
+    normalized by a single cache lookup.
+
+    Example::
+
+        >>> templates = PathTemplates([r'/static/(?P<file>.*)'], ids=True)
+        >>> templates.apply('/users/123/orders')
+        '/users/{id}/orders'
+        >>> templates.apply('/static/js/app.js')
+        '/static/{file}'
+
+    """
+
+    def __init__(self, templates=(), ids=False,
+                 cache_size=TEMPLATE_CACHE_SIZE):
+        """Compile path template rules.
+
+        :param templates: template patterns in order of precedence.
+        :type templates: ``list`` of ``str``
+        :param ids: replace ID path segments by ``{id}``.
+        :type ids: ``bool``
+        :param cache_size: number of paths to cache templates for.
+        :type cache_size: ``int``
+        :raises: :py:class:`analog.exceptions.InvalidPathTemplateError` for
+            invalid template patterns.
+
+        """
+        self.templates = list(templates)
+        self.ids = ids
+        #: named groups of each template pattern by its group in the
+        #: combined pattern, as (combined group name, group name) tuples
+        self._groups = {}
+        rules = []
+        for index, template in enumerate(self.templates):
+            try:
+                names = re.compile(template).groupindex
+            except re.error as exc:
+                raise InvalidPathTemplateError(
+                    "Invalid path template {0!r}: {1}.".format(template, exc))
+            prefix = '_t{0}_'.format(index)
+            # rename named groups to be unique in the combined pattern
+            pattern = _GROUP_NAME.sub(
+                lambda match: ('(?P<{0}{1}>'.format(prefix, match.group(2))
+                               if match.group(2) else
+                               '(?P={0}{1})'.format(prefix, match.group(3))),
+                template)
+            rule = '_t{0}'.format(index)
+            rules.append('(?P<{0}>{1})'.format(rule, pattern))
+            self._groups[rule] = [(prefix + name, name) for name in names]
+        self._pattern = None
+        if rules:
+            try:
+                self._pattern = re.compile('|'.join(rules))
+            except re.error as exc:
+                raise InvalidPathTemplateError(
+                    "Cannot combine path templates: {0}.".format(exc))
+        self._ids = None
+        if ids:
+            self._ids = re.compile(r'(?<=/)(?:{0})(?=[/?;#]|$)'.format(
+                '|'.join(ID_SEGMENTS)))
+        if lru_cache is not None and cache_size:
+            self.apply = lru_cache(cache_size)(self._apply)
+        else:
+            self.apply = self._apply
+
+    def _apply(self, path):
+        """Normalize ``path`` to its path template.
+
+        :param path: request path.
+        :type path: ``str``
+        :returns: path template.
+        :rtype: ``str``
+
+        """
+        if self._pattern is not None:
+            match = self._pattern.match(path)
+            if match is not None:
+                path = self._fill(path, match)
+        if self._ids is not None:
+            path = self._ids.sub(ID_PLACEHOLDER, path)
+        return path
+
+    def _fill(self, path, match):
+        """Replace the named groups of the template pattern ``match``."""
+        spans = []
+        for group, name in self._groups[match.lastgroup]:
+            start, end = match.span(group)
+            if start >= 0:
+                spans.append((start, end, name))
+        parts = []
+        position = 0
+        for start, end, name in sorted(spans):
+            if start < position:  # nested group
+                continue
+            parts += [path[position:start], '{' + name + '}']
+            position = end
+        parts.append(path[position:])
+        return ''.join(parts)
@@ -0,0 +1,12 @@
+"""Analog benchmarks.
+
+Benchmarks are not part of the analog package. Run them from a source checkout,
+e.g. ``python -m benchmarks.parsers``.
+
+* :py:mod:`benchmarks.generator` generates nginx logs for benchmarking.
+* :py:mod:`benchmarks.parsers` compares log line parsers.
+* :py:mod:`benchmarks.stages` measures every analysis stage on its own.
+* :py:mod:`benchmarks.end_to_end` measures complete ``analog`` runs.
+* :py:mod:`benchmarks.startup` measures the ``analog`` startup time.
+
+"""
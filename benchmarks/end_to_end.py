@@ -0,0 +1,132 @@
+"""Benchmark complete ``analog`` runs on generated logs of increasing size.
+
+Every run analyzes a generated log (see :py:mod:`benchmarks.generator`) in a
+separate ``analog`` process and reports the lines analyzed per second and the
+peak resident set size (RSS) of that process. Generated logs are kept in the
+work directory and reused by later runs with the same arguments.
+
+Options after ``--`` are passed to ``analog``, e.g. to compare statistics
+backends. Record results to compare runs over time with ``--record``.
+
+Usage::
+
+    python -m benchmarks.end_to_end [--sizes 1M,10M,100M] [--paths N]
+                                    [--workdir DIR] [--record FILE]
+                                    [-- analog options]
+
+Peak RSS is measured with ``os.wait4`` and is only available on Unix.
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import write_log
+
+
+#: Default numbers of log lines to analyze.
+DEFAULT_SIZES = '1M,10M,100M'
+#: Multipliers of size suffixes.
+SIZE_SUFFIXES = {'k': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9}
+#: Python code running ``analog`` in the benchmarked process.
+ANALOG = 'import sys, analog; analog.main(sys.argv)'
+
+
+def parse_size(size):
+    """Convert ``size`` like ``10M`` to a number of lines."""
+    if size[-1:] in SIZE_SUFFIXES:
+        return int(size[:-1]) * SIZE_SUFFIXES[size[-1]]
+    return int(size)
+
+
+def peak_rss(rusage):
+    """Peak RSS in bytes from ``rusage`` of a child process."""
+    # kilobytes on Linux, bytes on macOS
+    factor = 1 if sys.platform == 'darwin' else 1024
+    return rusage.ru_maxrss * factor
+
+
+def logfile(workdir, lines, paths, span):
+    """Find or generate the log of ``lines`` lines in ``workdir``."""
+    path = os.path.join(workdir, 'analog-bench-{0}-{1}-{2}.log'.format(
+        lines, paths, span))
+    if not os.path.exists(path):
+        print("Generating {0:,} log lines to {1} ...".format(lines, path))
+        partial = path + '.partial'
+        with io.open(partial, 'w', encoding='utf-8') as log:
+            write_log(log, lines, paths=paths, span=span)
+        os.rename(partial, path)
+    return path
+
+
+def run(path, options):
+    """Analyze log at ``path`` in an ``analog`` process.
+
+    :returns: tuple of wall clock seconds and peak RSS in bytes.
+    :rtype: ``tuple``
+
+    """
+    command = [sys.executable, '-c', ANALOG, 'nginx'] + options + [path]
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        process = subprocess.Popen(command, stdout=devnull)
+        # reap the process with its resource usage instead of Popen.wait()
+        _, status, rusage = os.wait4(process.pid, 0)
+        seconds = time.time() - start
+        process.returncode = status
+    if status:
+        raise RuntimeError("analog failed: {0}".format(' '.join(command)))
+    return seconds, peak_rss(rusage)
+
+
+def main(argv=None):
+    """Run ``analog`` on generated logs of all sizes and report throughput."""
+    argv = sys.argv if argv is None else argv
+    options = []
+    if '--' in argv:
+        argv, options = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help="comma separated numbers of log lines, "
+                             "e.g. 1M,10M")
+    parser.add_argument('--paths', type=int, default=1000,
+                        help="number of distinct request paths")
+    parser.add_argument('--span', type=int, default=86400,
+                        help="seconds between first and last log entry")
+    parser.add_argument('--workdir', default=tempfile.gettempdir(),
+                        help="directory to keep generated logs in")
+    parser.add_argument('--record', default=None,
+                        help="file to append results to as JSON lines")
+    args = parser.parse_args(argv[1:])
+
+    print("{0:>12} {1:>10} {2:>14} {3:>12}".format(
+        'lines', 'seconds', 'lines/s', 'peak RSS'))
+    for size in args.sizes.split(','):
+        lines = parse_size(size)
+        path = logfile(args.workdir, lines, args.paths, args.span)
+        seconds, rss = run(path, options)
+        print("{0:>12,} {1:>10.2f} {2:>14,.0f} {3:>9.1f} MB".format(
+            lines, seconds, lines / seconds, rss / 2 ** 20))
+        if args.record:
+            with io.open(args.record, 'a', encoding='utf-8') as record:
+                record.write(json.dumps({
+                    'date': datetime.datetime.now().isoformat(),
+                    'lines': lines,
+                    'paths': args.paths,
+                    'options': options,
+                    'seconds': seconds,
+                    'lines_per_second': lines / seconds,
+                    'peak_rss': rss,
+                }, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
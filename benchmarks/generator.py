@@ -0,0 +1,145 @@
+"""Generate synthetic logs in the nginx ``combined_timed`` format.
+
+The same arguments always generate the same log, so benchmark runs on
+generated logs can be compared.
+
+Usage::
+
+    python -m benchmarks.generator [--lines N] [--paths N] [--span SECONDS]
+                                   [--seed N] [logfile]
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import datetime
+import io
+import random
+import sys
+
+from analog.formats import NGINX
+
+
+#: Timestamp of the first generated log entry.
+START = datetime.datetime(2014, 1, 16, 13, 0, 0)
+#: Path prefixes of generated request paths.
+RESOURCES = ('/api/v1/items', '/api/v1/users', '/api/v2/orders', '/static',
+             '/auth/token', '/search')
+#: HTTP verbs and their relative frequency.
+VERBS = (('GET', 70), ('POST', 15), ('PUT', 8), ('PATCH', 4), ('DELETE', 3))
+#: Response status codes and their relative frequency.
+STATUS_CODES = ((200, 80), (201, 5), (204, 3), (301, 2), (304, 3), (404, 4),
+                (409, 1), (500, 1), (503, 1))
+#: Log line layout of the nginx ``combined_timed`` format.
+LOG_LINE = ('{ip} - - [{timestamp}] "{verb} {path}{query} HTTP/1.1" {status} '
+            '{size} "-" "{agent}" "-" {time:.3f} {upstream_time:.3f} .\n')
+#: User agents of generated requests.
+AGENTS = (
+    'Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_1) AppleWebKit/605.1.15',
+    'curl/8.4.0',
+)
+#: Number of lines written at once.
+WRITE_LINES = 10000
+
+
+def _weighted(rand, choices):
+    """Create function picking one of ``choices`` by relative frequency."""
+    values = []
+    for value, weight in choices:
+        values.extend([value] * weight)
+    return lambda: values[int(rand.random() * len(values))]
+
+
+def generate_lines(lines, paths=1000, span=3600, seed=0, start=START):
+    """Generate log lines.
+
+    Paths are picked log-uniformly from ``paths`` distinct paths, so a few
+    paths are very frequent and most are rare, like in real logs. Timestamps
+    increase evenly over ``span`` seconds.
+
+    :param lines: number of log lines.
+    :type lines: ``int``
+    :param paths: number of distinct request paths.
+    :type paths: ``int``
+    :param span: seconds between the first and the last log entry.
+    :type span: ``int``
+    :param seed: seed of the random number generator.
+    :type seed: ``int``
+    :param start: timestamp of the first log entry.
+    :type start: :py:class:`datetime.datetime`
+    :returns: generator of log lines.
+    :rtype: ``generator`` of ``str``
+
+    """
+    rand = random.Random(seed)
+    verb = _weighted(rand, VERBS)
+    status = _weighted(rand, STATUS_CODES)
+    time_layout = NGINX.time_format
+    second = None
+    timestamp = None
+    for index in range(lines):
+        offset = span * index // lines
+        if offset != second:
+            second = offset
+            timestamp = (start + datetime.timedelta(seconds=offset)).strftime(
+                time_layout)
+        rank = int(paths ** rand.random()) - 1
+        time = rand.lognormvariate(-3, 1)
+        yield LOG_LINE.format(
+            ip='10.{0}.{1}.{2}'.format(rank % 256, index % 251, index % 13),
+            timestamp=timestamp,
+            verb=verb(),
+            path='{0}/{1}'.format(RESOURCES[rank % len(RESOURCES)], rank),
+            query='?page={0}'.format(index % 7) if index % 5 == 0 else '',
+            status=status(),
+            size=int(rand.expovariate(1 / 2000)),
+            agent=AGENTS[index % len(AGENTS)],
+            time=time,
+            upstream_time=time * 0.9)
+
+
+def write_log(log, lines, **kwargs):
+    """Write generated log lines to text file handle ``log``.
+
+    :param log: text file handle.
+    :param lines: number of log lines.
+    :type lines: ``int``
+    :param kwargs: arguments of :py:func:`generate_lines`.
+
+    """
+    buffered = []
+    for line in generate_lines(lines, **kwargs):
+        buffered.append(line)
+        if len(buffered) == WRITE_LINES:
+            log.write(''.join(buffered))
+            buffered = []
+    log.write(''.join(buffered))
+
+
+def main(argv=None):
+    """Write a generated log to a file or ``stdout``."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=1000000,
+                        help="number of log lines")
+    parser.add_argument('--paths', type=int, default=1000,
+                        help="number of distinct request paths")
+    parser.add_argument('--span', type=int, default=3600,
+                        help="seconds between first and last log entry")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random number generator seed")
+    parser.add_argument('logfile', nargs='?', default=None,
+                        help="file to write, defaults to stdout")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv[1:])
+
+    kwargs = dict(lines=args.lines, paths=args.paths, span=args.span,
+                  seed=args.seed)
+    if args.logfile is None:
+        write_log(sys.stdout, **kwargs)
+    else:
+        with io.open(args.logfile, 'w', encoding='utf-8') as log:
+            write_log(log, **kwargs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark log line parsing: regex pattern vs. tokenizer.
+
+Usage::
+
+    python -m benchmarks.parsers [lines]
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import sys
+import timeit
+
+from analog.analyzer import ENTRY_FIELDS
+from analog.formats import NGINX
+
+
+LOG_LINE = (
+    '{ip} - - [16/Jan/2014:13:{minute:02d}:{second:02d} +0000] '
+    '"{verb} /api/v1/items/{item}?page={page} HTTP/1.1" {status} {size} '
+    '"https://example.com/items/{item}" '
+    '"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/120.0 Safari/537.36" "-" 0.{time:03d} 0.{time:03d} .\n')
+
+
+def sample_lines(count):
+    """Generate ``count`` varying nginx log lines."""
+    return [LOG_LINE.format(
+        ip='10.0.{0}.{1}'.format(index % 256, index % 7),
+        minute=index // 60 % 60, second=index % 60,
+        verb=('GET', 'POST', 'PUT')[index % 3], item=index % 1000,
+        page=index % 10, status=(200, 201, 404, 500)[index % 4],
+        size=index % 5000, time=index % 1000) for index in range(count)]
+
+
+def bench(name, extract, lines, repeat=5):
+    """Print best lines/sec of extracting all ``lines``."""
+    def run():
+        for line in lines:
+            extract(line)
+    seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+    print("{0:<12} {1:>12,.0f} lines/s".format(name, len(lines) / seconds))
+
+
+def main(argv=None):
+    """Compare regex pattern and tokenizer throughput for the nginx format."""
+    argv = sys.argv if argv is None else argv
+    count = int(argv[1]) if len(argv) > 1 else 100000
+    lines = sample_lines(count)
+
+    tokenizer = NGINX.tokenizer
+    NGINX.tokenizer = None
+    try:
+        regex = NGINX.extractor(ENTRY_FIELDS)
+    finally:
+        NGINX.tokenizer = tokenizer
+    tokens = NGINX.extractor(ENTRY_FIELDS)
+    assert all(regex(line) == tokens(line) for line in lines)
+
+    print("nginx format, {0:,} lines".format(count))
+    bench('regex', regex, lines)
+    bench('tokenizer', tokens, lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark the stages of log analysis one by one.
+
+Measures log line matching, log entry creation, timestamp parsing, adding log
+entries to reports, list statistics and rendering with every renderer on
+generated log lines (see :py:mod:`benchmarks.generator`).
+
+Usage::
+
+    python -m benchmarks.stages [lines]
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+from array import array
+import sys
+import timeit
+
+from analog.analyzer import ENTRY_FIELDS, Analyzer
+from analog.formats import NGINX
+from analog.renderers import Renderer
+from analog.report import BatchReport, ListStats, Report
+from analog.sketches import DDSketch
+
+from benchmarks.generator import generate_lines
+
+
+def bench(name, run, count, unit='lines', repeat=3):
+    """Print the best rate of ``count`` items processed per call of ``run``."""
+    seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+    print("{0:<28} {1:>14,.0f} {2}/s".format(name, count / seconds, unit))
+
+
+def main(argv=None):
+    """Benchmark all analysis stages on generated nginx log lines."""
+    argv = sys.argv if argv is None else argv
+    count = int(argv[1]) if len(argv) > 1 else 100000
+    lines = [line.rstrip('\n') for line in generate_lines(count, paths=1000)]
+    print("nginx format, {0:,} lines".format(count))
+
+    search = NGINX.pattern.search
+    bench('LogFormat.pattern.search',
+          lambda: [search(line) for line in lines], count)
+
+    matches = [search(line) for line in lines]
+    entry = NGINX.entry
+    bench('LogFormat.entry', lambda: [entry(match) for match in matches],
+          count)
+
+    # timestamps in log order, consecutive entries often share one
+    time_strs = [match.group('timestamp') for match in matches]
+
+    def timestamps():
+        analyzer = Analyzer(log=[], format='nginx')
+        for time_str in time_strs:
+            analyzer._timestamp(time_str)
+    bench('Analyzer._timestamp', timestamps, count)
+
+    extract = NGINX.extractor(ENTRY_FIELDS)
+    entries = [(values[0], values[1], int(values[2]), float(values[3]),
+                float(values[4]), int(values[5]))
+               for values in map(extract, lines)]
+    for backend in ('exact', 'ddsketch'):
+        def add():
+            report = Report(verbs=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+                            status_codes=[1, 2, 3, 4, 5],
+                            stats_backend=backend)
+            for path, verb, status, time, upstream_time, body_bytes in entries:
+                report.add(path, verb, status, time, upstream_time,
+                           body_bytes)
+        bench('Report.add ({0})'.format(backend), add, count)
+
+    # every path distinct, like unnormalized paths of scanners
+    distinct = [('{0}/{1}'.format(path, index),) + values
+                for index, (path, values) in enumerate(
+                    (entry[0], entry[1:]) for entry in entries)]
+    for name, report_class, rows in (
+            ('BatchReport.add', BatchReport, entries),
+            ('Report.add (distinct paths)', Report, distinct),
+            ('BatchReport.add (distinct)', BatchReport, distinct)):
+        def add_batches():
+            report = report_class(
+                verbs=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+                status_codes=[1, 2, 3, 4, 5])
+            for path, verb, status, time, upstream_time, body_bytes in rows:
+                report.add(path, verb, status, time, upstream_time,
+                           body_bytes)
+            report.finish()
+        bench(name, add_batches, count)
+
+    times = array(str('d'), (time for _, _, _, time, _, _ in entries))
+    sketch = DDSketch()
+    for time in times:
+        sketch.append(time)
+    bench('ListStats (exact)', lambda: ListStats(times), count, 'values')
+    bench('ListStats (exact, p90-p99)',
+          lambda: ListStats(times, (90, 95, 99)), count, 'values')
+    bench('ListStats (ddsketch)', lambda: ListStats(sketch), count, 'values')
+
+    report = Report(verbs=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+                    status_codes=[1, 2, 3, 4, 5])
+    for values in entries:
+        report.add(*values)
+    paths = len(report.path_requests)
+    for name in sorted(Renderer.all_renderers()):
+        renderer = Renderer.by_name(name)
+
+        def render():
+            # recompute statistics for every render
+            report._cache.clear()
+            renderer.render(report, path_stats=True)
+        bench('render {0}'.format(name), render, paths, 'paths')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark the startup time of the ``analog`` command.
+
+Runs ``python -X importtime -m analog --version`` repeatedly and reports the
+best wall clock time, the cumulative import time of the ``analog`` package and
+its slowest imports. With ``--max-ms``, exits with an error if the import time
+exceeds the limit, to catch slow imports added to the CLI startup path.
+
+Usage::
+
+    python -m benchmarks.startup [--runs N] [--top N] [--max-ms MS]
+                                 [--record FILE]
+
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import datetime
+import io
+import json
+import subprocess
+import sys
+import time
+
+
+#: Command printing the version, which imports the whole CLI.
+COMMAND = [sys.executable, '-X', 'importtime', '-m', 'analog', '--version']
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` output.
+
+    :param output: ``stderr`` of a Python process run with ``-X importtime``.
+    :type output: ``str``
+    :returns: list of module name and cumulative import time in microseconds
+        tuples, in import order.
+    :rtype: ``list``
+
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header
+        imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def run():
+    """Print the analog version in a new process.
+
+    :returns: tuple of wall clock seconds and ``-X importtime`` imports.
+    :rtype: ``tuple``
+
+    """
+    start = time.time()
+    process = subprocess.Popen(COMMAND, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    _, err = process.communicate()
+    seconds = time.time() - start
+    if process.returncode:
+        raise RuntimeError("analog failed: {0}".format(' '.join(COMMAND)))
+    return seconds, parse_importtime(err.decode('utf-8', 'replace'))
+
+
+def main(argv=None):
+    """Measure ``analog`` startup and report the slowest imports."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help="number of runs, the fastest is reported")
+    parser.add_argument('--top', type=int, default=10,
+                        help="number of slowest imports to list")
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="fail if importing analog takes longer")
+    parser.add_argument('--record', default=None,
+                        help="file to append results to as JSON lines")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv[1:])
+
+    seconds, imports = min(run() for _ in range(args.runs))
+    analog = dict(imports).get('analog', 0) / 1000
+    print("{0:<40} {1:>10.1f} ms".format('wall clock', seconds * 1000))
+    print("{0:<40} {1:>10.1f} ms".format('import analog', analog))
+    print()
+    for name, cumulative in sorted(imports, key=lambda item: -item[1])[
+            :args.top]:
+        print("{0:<40} {1:>10.1f} ms".format(name, cumulative / 1000))
+
+    if args.record:
+        with io.open(args.record, 'a', encoding='utf-8') as record:
+            record.write(json.dumps({
+                'date': datetime.datetime.now().isoformat(),
+                'seconds': seconds,
+                'import_ms': analog,
+            }, sort_keys=True) + '\n')
+    if args.max_ms is not None and analog > args.max_ms:
+        sys.exit("Importing analog took {0:.1f} ms, more than {1:.1f} ms."
+                 .format(analog, args.max_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -57,7 +57,7 @@ setup(
     entry_points={'console_scripts': ['analog=analog:main']},
     classifiers=classifiers,
     install_requires=requirements,
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     py_modules=['analog'],
     zip_safe=False,
 )